@@ -1,15 +1,29 @@
 import os
 import calendar
-import base64
-from flask import Flask, redirect, url_for, session, render_template, request
+from flask import Flask, redirect, url_for, session, render_template, request, abort, make_response, jsonify, g
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import Flow
 from googleapiclient.discovery import build
 from google.auth.transport.requests import Request
 import pandas as pd
-from pdf_processor import process_email_attachments, extract_pdf_content, extract_pdf_order_details
-from visualization import generate_pie_chart, generate_line_chart
-from web_scraping import list_emails_with_month, extract_order_details, get_deepest_text_payload
+from chart_cache import get_chart_cache
+from gmail_fetch import build_gmail_service, close_gmail_service
+from gmail_scheduler import get_gmail_scheduler
+from mailbox_sync import MailboxSync, get_user_id
+from message_cache import get_message_cache
+from metrics import (
+    TIMING_HEADER, instrumented, render_metrics, server_timing_header, start_request_timing, finish_request_timing
+)
+from ingest_jobs import get_ingest_job_manager
+from expense_report import build_month_report, build_range_report, summary_payload, month_span, trailing_months
+from order_store import get_order_store
+from pdf_cache import get_pdf_cache
+from pdf_workers import get_pdf_worker_pool
+from prefilter import build_prefilter
+from query_planner import build_query_plan
+from visualization import (
+    render_pie_chart, render_line_chart, render_trend_chart, render_cached_charts, get_chart_render_pool
+)
 
 app = Flask(__name__, static_folder='static')
 app.secret_key = os.environ.get("SECRET_KEY", "your_secret_key")
@@ -18,12 +32,56 @@ os.environ["OAUTHLIB_INSECURE_TRANSPORT"] = "1"
 CLIENT_SECRETS_FILE = "credentials.json"
 SCOPES = ["https://www.googleapis.com/auth/gmail.readonly"]
 
+# Grafik PNG'leri içerik özetiyle adreslendiği için tarayıcıda süresiz önbelleklenebilir.
+CHART_MAX_AGE = 365 * 24 * 60 * 60
+
+# "client": grafikler tarayıcıda JSON özetinden çizilir; "server": matplotlib PNG'leri.
+CHART_RENDERING = os.environ.get("EXPENSELESS_CHART_RENDERING", "client")
+
+KEYWORDS = ['sipariş', 'siparişini aldık', 'e-ticket', 'fatura']
+# "1": aylar bilinen göndericiler, PDF ekleri ve anahtar kelimelerden kurulan sorgu planıyla taranır.
+QUERY_PLANNER = os.environ.get("EXPENSELESS_QUERY_PLANNER", "1") == "1"
+# "1": listelenen mesajlar tam çekilmeden önce başlık ve snippet ile ön filtreden geçirilir.
+# "0" ile yapılan ilk senkronizasyon, ön filtreyle taranmış ayları atlananlar dahil yeniden tarar.
+PREFILTER = os.environ.get("EXPENSELESS_PREFILTER", "1") == "1"
+YEARS_BACK = 5
+
+# Aralık modunda sunulan hazır seçenekler (ay sayısı); "custom" başlangıç/bitiş ayı ister.
+RANGE_OPTIONS = [1, 3, 6, 12, 24]
+# Özel aralıklar en fazla bu kadar ay kapsar; daha uzun seçimlerde son aylar tutulur.
+MAX_RANGE_MONTHS = 12 * YEARS_BACK
+
 flow = Flow.from_client_secrets_file(
     CLIENT_SECRETS_FILE,
     scopes=SCOPES,
     redirect_uri='http://localhost:5000/callback'
 )
 
+@app.before_request
+def begin_timing():
+    g.timing_token = start_request_timing()
+
+
+@app.after_request
+def add_server_timing(response):
+    token = g.pop('timing_token', None)
+    if token is None:
+        return response
+    timings = finish_request_timing(token)
+    if timings and (TIMING_HEADER or request.args.get('timing') == '1'):
+        response.headers['Server-Timing'] = server_timing_header(timings)
+    return response
+
+
+@app.route('/metrics')
+def metrics():
+    """Aşama gecikmeleri ve Gmail zamanlayıcı sayaçları, Prometheus metin biçiminde."""
+    counters = {f'expenseless_gmail_{name}_total': value for name, value in get_gmail_scheduler().stats().items()}
+    response = make_response(render_metrics(counters))
+    response.mimetype = 'text/plain; version=0.0.4'
+    return response
+
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -57,141 +115,223 @@ def callback():
 
 @app.route('/dashboard', methods=['GET', 'POST'])
 def dashboard():
-    if "credentials" not in session:
+    creds = get_gmail_credentials()
+    if creds is None:
         return redirect(url_for('index'))
 
+    user = get_session_user(creds)
+    selection = read_selection(request.values)
+    start, end = selected_period(selection)
+
+    # Senkronizasyon arka planda yürür; sayfa defterdeki mevcut verilerle hemen döner
+    # ve iş bitene kadar /jobs/<id> üzerinden güncellenir.
+    job = start_sync_job(creds, user, start, end)
+    report, period_name = build_report(user, start, end)
+    selection.update(
+        all_months=[{"number": i, "name": calendar.month_name[i]} for i in range(1, 13)],
+        all_years=list(range(selection['current_year'], selection['current_year'] - YEARS_BACK - 1, -1)),
+        range_options=RANGE_OPTIONS,
+        job_id=job.id if job.running else None
+    )
+
+    # Grafikler varsayılan olarak tarayıcıda çizilir; PNG yolu yedek/dışa aktarım içindir.
+    pie_chart_url = line_chart_url = summary = None
+    if request.values.get('charts', CHART_RENDERING) != 'server':
+        summary = summary_payload(report, period_name)
+    elif report['orders']:
+        if 'monthly' in report:
+            line_job = ('trend', render_trend_chart, (report['monthly'], report['source_trend']))
+        else:
+            line_job = ('line', render_line_chart, (report['daily'], period_name))
+        digests = render_cached_charts(
+            get_chart_cache(), get_chart_render_pool(),
+            [('pie', render_pie_chart, (report['senders'],)), line_job]
+        )
+        pie_chart_url, line_chart_url = (chart_url(digest) for digest in digests)
+
+    # Template'e Veri Gönderimi
+    return render_template(
+        'dashboard.html',
+        emails=report['orders'],
+        **selection,
+        month_name=period_name,
+        pie_chart_url=pie_chart_url,
+        line_chart_url=line_chart_url,
+        summary=summary,
+        monthly_total=report['total'],
+        transaction_count=report['count'],
+        daily_average=report['daily_average'],
+        **({
+            'monthly_average': report['monthly_average'],
+            'source_totals': report['sources'].to_dict()
+        } if 'monthly' in report else {})
+    )
+
+
+@app.route('/api/summary')
+def api_summary():
+    """Seçilen ay veya aralık için günlük/aylık seri, gönderici dağılımı ve KPI'ları JSON olarak döndür.
+
+    Senkronizasyon işi başlatılır (veya çalışan işe bağlanılır); yanıt defterdeki
+    mevcut verileri ve işin durumunu içerir.
+    """
+    creds = get_gmail_credentials()
+    if creds is None:
+        return jsonify(error="Oturum açılmamış."), 401
+
+    user = get_session_user(creds)
+    start, end = selected_period(read_selection(request.values))
+    job = start_sync_job(creds, user, start, end)
+    report, period_name = build_report(user, start, end)
+    return jsonify({**summary_payload(report, period_name), 'job': job.to_dict()})
+
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """Senkronizasyon işinin ilerlemesini ve dönemin o ana kadarki özetini döndür."""
+    job = get_ingest_job_manager().get(job_id)
+    if job is None or job.key[0] != session.get("user_email"):
+        abort(404)
+
+    user, start, end = job.key
+    report, period_name = build_report(user, start, end)
+    return jsonify(job=job.to_dict(), summary=summary_payload(report, period_name), gmail=get_gmail_scheduler().stats())
+
+
+def get_gmail_credentials():
+    if "credentials" not in session:
+        return None
+
     # Google Credentials
     creds = Credentials(**session["credentials"])
     if creds.expired and creds.refresh_token:
         creds.refresh(Request())
-    service = build('gmail', 'v1', credentials=creds)
+    return creds
+
 
-    # Tarih Seçimi
+def get_session_user(creds):
+    if "user_email" not in session:
+        session["user_email"] = get_user_id(build('gmail', 'v1', credentials=creds))
+    return session["user_email"]
+
+
+def read_selection(values):
+    """Form veya sorgu parametrelerinden ay/yıl ve aralık seçimini oku."""
     today = pd.Timestamp.now()
-    selected_year = today.year
-    selected_month = today.month
+    selected = parse_month(f"{values.get('year', today.year)}-{values.get('month', today.month)}")
+    selected_year, selected_month = selected or (today.year, today.month)
+    return dict(
+        current_year=today.year,
+        selected_month=selected_month,
+        selected_year=selected_year,
+        selected_range=values.get('range', '1'),
+        custom_start=values.get('start') or None,
+        custom_end=values.get('end') or None
+    )
+
 
-    if request.method == 'POST':
-        selected_month = int(request.form.get('month', today.month))
-        selected_year = int(request.form.get('year', today.year))
+def selected_period(selection):
+    """Seçimi ((yıl, ay), (yıl, ay)) başlangıç/bitiş çiftine çevir; tek ay için ikisi aynıdır."""
+    selected_year, selected_month = selection['selected_year'], selection['selected_month']
+    period = parse_range_selection(
+        selection['selected_range'], selection['custom_start'], selection['custom_end'],
+        selected_year, selected_month
+    )
+    if period is None:
+        return (selected_year, selected_month), (selected_year, selected_month)
+    return period
 
-    # Tüm Yıllar ve Aylar
-    current_year = today.year
-    years_back = 5
-    all_years = list(range(current_year, current_year - years_back - 1, -1))
-    all_months = [{"number": i, "name": calendar.month_name[i]} for i in range(1, 13)]
 
-    # Anahtar Kelimeler ve E-posta Çekme
-    keywords = ['sipariş', 'siparişini aldık', 'e-ticket', 'fatura']
-    emails, month_name = list_emails_with_month(service, keywords, selected_year, selected_month)
+def start_sync_job(creds, user, start, end):
+    """Dönemin aylarını arka planda senkronize eden işi başlat; aynı kullanıcı ve dönem için çalışan iş varsa ona bağlan."""
+    months = month_span(*start, *end)
+    store = get_order_store()
 
-    monthly_total = 0
-    transaction_count = 0
-    daily_average = 0
+    def run(job):
+        # Plan, iş başladığında defterdeki güncel göndericilerden kurulur.
+        plan = build_query_plan(store, user, KEYWORDS) if QUERY_PLANNER else None
+        if plan is not None:
+            job.attach('query_plan', plan.report)
+        prefilter = build_prefilter(store, user) if PREFILTER else None
+        if prefilter is not None:
+            job.attach('prefilter', prefilter.stats.report)
 
-    enriched_emails = []
-    for email in emails:
+        # Gmail servisi (httplib2) thread'ler arasında paylaşılamadığından iş kendi servisini kurar.
+        service = build_gmail_service(creds)
         try:
-            # E-posta Detaylarını Al
-            msg_data = service.users().messages().get(userId='me', id=email['id']).execute()
-            payload = msg_data.get('payload', {})
-            body_content = get_deepest_text_payload(payload)
-            extracted = extract_order_details(body_content)
-
-            # PDF İşleme (Eklenti)
-            if not extracted.get('order_id'):
-                attachment_ids = process_email_attachments(msg_data)
-                for att_id in attachment_ids:
-                    attachment = service.users().messages().attachments().get(
-                        userId='me', messageId=email['id'], id=att_id
-                    ).execute()
-
-                    pdf_data = attachment.get('data', '')
-                    if pdf_data:
-                        pdf_data = base64.urlsafe_b64decode(pdf_data)
-                        pdf_text = extract_pdf_content(pdf_data)
-                        pdf_extracted = extract_pdf_order_details(pdf_text)
-                        if pdf_extracted['order_id']:
-                            extracted = pdf_extracted
-
-            # Tutar İşleme
-            total_amount = 0
-            try:
-                amount_str = extracted.get('total_amount', "0").strip()
-                if ',' in amount_str and '.' in amount_str:
-                    amount_str = amount_str.replace('.', '').replace(',', '.')
-                elif ',' in amount_str:
-                    amount_str = amount_str.replace(',', '.')
-                total_amount = float(amount_str)
-            except ValueError:
-                print(f"Total Amount Parsing Error: {amount_str}")
-                total_amount = 0
-
-            # Enriched Email Listesi
-            enriched_emails.append({
-                'subject': email.get('subject', '(Başlık Yok)'),
-                'sender': email.get('sender', '(Bilinmeyen Gönderici)'),
-                'date': email.get('date', '(Bilinmeyen Tarih)'),
-                'total_amount': total_amount,
-                'order_id': extracted.get('order_id', '(Sipariş Numarası Yok)'),
-                'source': 'Bershka' if "Bershka" in email.get('sender', '') else 'Other'
-            })
-        except Exception as e:
-            print(f"E-posta {email['id']} işlenirken hata oluştu: {e}")
-            continue
-
-    # Eşsiz E-posta Verileri
-    seen_order_ids = set()
-    unique_emails = []
-    for email in enriched_emails:
-        if email['order_id'] not in seen_order_ids and email['order_id'] != "(Sipariş Numarası Yok)":
-            seen_order_ids.add(email['order_id'])
-            unique_emails.append(email)
-
-    # Toplam ve Ortalama Hesaplama
-    if unique_emails:
-        monthly_total = sum(email['total_amount'] for email in unique_emails if email['total_amount'])
-        transaction_count = len(unique_emails)
-        days_in_month = calendar.monthrange(selected_year, selected_month)[1]
-        daily_average = monthly_total / days_in_month if days_in_month > 0 else 0
-
-    # Grafik için Veri Hazırlama
-    data_for_charts = pd.DataFrame(unique_emails)
-    if data_for_charts.empty:
-        return render_template(
-            'dashboard.html',
-            message="Seçilen dönem için veri mevcut değil.",
-            all_months=all_months,
-            all_years=all_years,
-            selected_month=selected_month,
-            selected_year=selected_year,
-            monthly_total=0,
-            transaction_count=0,
-            daily_average=0
-        )
+            sync = MailboxSync(
+                service, store, user, KEYWORDS,
+                cache=get_message_cache(), pool=get_pdf_worker_pool(), pdf_cache=get_pdf_cache(),
+                progress=job.progress, plan=plan, prefilter=prefilter
+            )
+            # Aralık Modu: birden fazla ay eşzamanlı senkronize edilir.
+            sync.sync_months(months)
+        finally:
+            close_gmail_service(service)
 
-    data_for_charts['date'] = pd.to_datetime(data_for_charts['date'], errors='coerce')
-    daily_expenses = data_for_charts.groupby(data_for_charts['date'].dt.day)['total_amount'].sum()
+    return get_ingest_job_manager().start((user, start, end), run, months=len(months))
 
-    pie_chart_url = generate_pie_chart(data_for_charts)
-    line_chart_url = generate_line_chart(daily_expenses, calendar.month_name[selected_month])
 
-    # Template'e Veri Gönderimi
-    return render_template(
-        'dashboard.html',
-        emails=unique_emails,
-        all_months=all_months,
-        all_years=all_years,
-        selected_month=selected_month,
-        selected_year=selected_year,
-        month_name=month_name,
-        pie_chart_url=pie_chart_url,
-        line_chart_url=line_chart_url,
-        monthly_total=monthly_total,
-        transaction_count=transaction_count,
-        daily_average=daily_average
-    )
+@instrumented('report_build')
+def build_report(user, start, end):
+    """Defterden dönemin raporunu ve görünen adını oluştur."""
+    store = get_order_store()
+    if start == end:
+        return build_month_report(store, user, *start), calendar.month_name[start[1]]
+    return build_range_report(store, user, start, end), f"{start[0]}-{start[1]:02d} / {end[0]}-{end[1]:02d}"
+
+
+def chart_url(digest):
+    return url_for('chart', digest=digest) if digest else None
+
+
+@app.route('/charts/<digest>.png')
+def chart(digest):
+    png = get_chart_cache().get(digest)
+    if png is None:
+        abort(404)
 
+    response = make_response(png)
+    response.mimetype = 'image/png'
+    response.set_etag(digest)
+    response.cache_control.public = True
+    response.cache_control.max_age = CHART_MAX_AGE
+    response.cache_control.immutable = True
+    return response.make_conditional(request)
+
+
+def parse_month(value):
+    """'YYYY-MM' biçimindeki değeri (yıl, ay) olarak döndür; geçersizse None."""
+    try:
+        year, month = (int(part) for part in value.split('-'))
+    except (AttributeError, ValueError):
+        return None
+    if not (1 <= month <= 12 and 1970 <= year <= 9999):
+        return None
+    return year, month
+
+
+def parse_range_selection(selected_range, custom_start, custom_end, selected_year, selected_month):
+    """Aralık seçimini ((yıl, ay), (yıl, ay)) olarak döndür; tek ay görünümü için None.
+
+    Aralıklar MAX_RANGE_MONTHS ayla sınırlanır; daha uzun seçimlerde bitiş ayından geriye sayılır.
+    """
+    if selected_range == 'custom':
+        start, end = parse_month(custom_start), parse_month(custom_end)
+        if start is None or end is None:
+            return None
+        start, end = (start, end) if start <= end else (end, start)
+        if (end[0] - start[0]) * 12 + end[1] - start[1] >= MAX_RANGE_MONTHS:
+            start = trailing_months(*end, MAX_RANGE_MONTHS)[0]
+        return start, end
+
+    try:
+        count = int(selected_range)
+    except (TypeError, ValueError):
+        return None
+    if count <= 1:
+        return None
+    return trailing_months(selected_year, selected_month, min(count, MAX_RANGE_MONTHS))
 
 
 if __name__ == '__main__':
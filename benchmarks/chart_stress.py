@@ -0,0 +1,78 @@
+"""Grafikleri çok sayıda thread'de eşzamanlı çizip çıktının deterministik olduğunu doğrular.
+
+Kullanım: python benchmarks/chart_stress.py [--charts 200] [--workers 8]
+Aynı girdiyle çizilen her PNG, tek thread'de çizilen referansla bayt bayt aynı olmalıdır.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from visualization import ChartRenderPool, render_pie_chart, render_line_chart, render_trend_chart  # noqa: E402
+
+
+def build_inputs(variants):
+    """Her varyant için farklı ama tekrarlanabilir grafik girdileri üret."""
+    rng = np.random.default_rng(42)
+    inputs = []
+    for i in range(variants):
+        senders = pd.DataFrame({
+            'sender': [f"Mağaza {j}" for j in range(8)],
+            'total_amount': rng.uniform(1, 1000, 8).round(2)
+        })
+        daily = pd.Series(rng.uniform(0, 500, 28).round(2), index=range(1, 29))
+        periods = pd.period_range('2024-01', periods=12, freq='M')
+        monthly = pd.DataFrame({'total': rng.uniform(0, 5000, 12), 'count': rng.integers(0, 30, 12)}, index=periods)
+        source_trend = pd.DataFrame({'Bershka': rng.uniform(0, 900, 12), 'Other': rng.uniform(0, 900, 12)},
+                                    index=periods)
+        inputs.append([
+            (render_pie_chart, (senders,)),
+            (render_line_chart, (daily, f"Ay {i}")),
+            (render_trend_chart, (monthly, source_trend)),
+        ])
+    return inputs
+
+
+def digest(png):
+    return hashlib.sha256(png).hexdigest() if png is not None else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--charts', type=int, default=200)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--variants', type=int, default=4)
+    args = parser.parse_args()
+
+    variants = build_inputs(args.variants)
+    expected = [[digest(render(*inputs)) for render, inputs in jobs] for jobs in variants]
+    if any(value is None for row in expected for value in row):
+        print("FAIL: reference render failed")
+        return 1
+
+    jobs, keys = [], []
+    for n in range(args.charts):
+        variant, kind = divmod(n, 3)
+        variant %= args.variants
+        jobs.append(variants[variant][kind])
+        keys.append((variant, kind))
+
+    pool = ChartRenderPool(max_workers=args.workers)
+    started = time.perf_counter()
+    pngs = pool.map(jobs)
+    elapsed = time.perf_counter() - started
+    pool.shutdown()
+
+    mismatches = sum(digest(png) != expected[variant][kind] for png, (variant, kind) in zip(pngs, keys))
+    print(f"{args.charts} charts on {args.workers} threads in {elapsed:.2f}s, {mismatches} mismatches")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+"""Ölçümler için tekrarlanabilir, sentetik sipariş e-postası derlemi.
+
+Trendyol HTML, Bershka ve Amazon tarzı sipariş e-postaları, metin katmanlı
+e-fatura PDF'leri (Boyner), metin katmanı olmayan taranmış PDF'ler ve sipariş
+içermeyen bülten/kampanya postaları üretir. Her mesaj için beklenen sipariş
+numarası ve tutar truth sözlüğünde tutulur. Derlem JSON olarak kaydedilip
+yüklenebilir; böylece gerçek posta kutusundan kaydedilmiş mesajlar da aynı
+ölçümlerden geçirilebilir.
+"""
+import base64
+import io
+import json
+import random
+from datetime import datetime, timedelta
+
+import matplotlib
+from matplotlib import font_manager
+from matplotlib.backends.backend_pdf import FigureCanvasPdf
+from matplotlib.figure import Figure
+from PIL import Image, ImageDraw, ImageFont
+
+from fake_gmail_server import make_message
+
+# Ölçek 1 için mesaj sayıları.
+DEFAULT_COUNTS = {
+    'trendyol': 120,
+    'bershka': 80,
+    'amazon': 40,
+    'efatura': 40,
+    'scanned': 6,
+    'newsletter': 160,
+}
+
+PERIOD_START = datetime(2024, 1, 1)
+PERIOD_DAYS = 182
+
+PRODUCTS = [
+    'Basic Oversize T-Shirt', 'Yüksek Bel Mom Jean', 'Deri Görünümlü Ceket', 'Spor Ayakkabı',
+    'Örme Kazak', 'Keten Gömlek', 'Kargo Pantolon', 'Sırt Çantası', 'Kapüşonlu Sweatshirt', 'Triko Hırka',
+]
+
+NEWSLETTERS = [
+    ('Trendyol <kampanya@trendyolmail.com>', 'Siparişlerinde kargo bedava fırsatı!',
+     'Bu hafta tüm siparişlerinde kargo bedava. Kampanya detayları için tıkla.'),
+    ('Bershka <news@bershka.com>', 'Yeni sezon geldi',
+     'Yeni koleksiyonu keşfet. İlk siparişine özel %15 indirim kodu: YENI15'),
+    ('Turkcell <bilgi@turkcell.com.tr>', 'Faturalı hatlara özel kampanya',
+     'Faturalı hattına ek 10 GB internet hediye. Fatura döneminde otomatik tanımlanır.'),
+    ('Hepsiburada <kampanya@hepsiburada.com>', 'Sepetinde unuttuğun ürünler var',
+     'Sepetindeki ürünler tükenmeden siparişini tamamla.'),
+    ('Medium Daily Digest <noreply@medium.com>', 'Stories for you',
+     'How we cut our invoice processing time in half, and other stories.'),
+]
+
+STYLE = """<style>
+body { font-family: Arial, sans-serif; color: #333; } table { border-collapse: collapse; width: 100%; }
+td { padding: 8px; border-bottom: 1px solid #eee; } .product-name { font-weight: bold; }
+.footer { color: #999; font-size: 11px; } .button { background: #f27a1a; color: #fff; padding: 12px; }
+</style>"""
+
+
+def turkish_amount(value):
+    """1234.5 -> '1.234,50'"""
+    return f"{value:,.2f}".replace(',', 'X').replace('.', ',').replace('X', '.')
+
+
+def _product_rows(rng, count):
+    rows = []
+    for _ in range(count):
+        name = rng.choice(PRODUCTS)
+        price = rng.uniform(99, 1499)
+        rows.append(
+            f'<tr><td><img src="https://cdn.example.com/{rng.randrange(10 ** 8)}.jpg" width="80"></td>'
+            f'<td class="product-name">{name}</td><td>Beden: {rng.choice("SML")}</td>'
+            f'<td>Adet: 1</td><td>{turkish_amount(price)} TL</td></tr>'
+        )
+    return '\n'.join(rows)
+
+
+def _footer():
+    return (
+        '<p class="footer">Bu e-posta otomatik olarak gönderilmiştir, lütfen yanıtlamayınız. '
+        'Kişisel verilerin korunması hakkında bilgi için gizlilik politikamızı inceleyebilirsiniz.</p>'
+    )
+
+
+def trendyol_html(rng, order_id, amount):
+    return f"""<html><head>{STYLE}</head><body>
+<table><tr><td><h2>Merhaba,</h2><p>#{order_id} numaralı siparişini aldık. Siparişin hazırlandığında seni bilgilendireceğiz.</p></td></tr></table>
+<table class="products">{_product_rows(rng, rng.randint(2, 8))}</table>
+<table><tr><td class="order-number">Sipariş Numarası: {order_id}</td></tr>
+<tr><td>Kargo: Ücretsiz</td></tr>
+<tr><td class="total-amount">Toplam Tutar: {turkish_amount(amount)} TL</td></tr></table>
+<a class="button" href="https://www.trendyol.com/hesabim/siparislerim">Siparişlerim</a>
+{_footer()}</body></html>"""
+
+
+def bershka_html(rng, order_id, amount):
+    return f"""<html><head>{STYLE}</head><body>
+<h1>BERSHKA</h1><p>Siparişin için teşekkürler!</p>
+<p>Sipariş Numarası: {order_id}</p>
+<table>{_product_rows(rng, rng.randint(1, 5))}</table>
+<table><tr><td>Kargo</td><td>0,00 TL</td></tr>
+<tr><td>Toplam</td><td>{turkish_amount(amount)} TL</td></tr></table>
+<p>Fatura bilgilerin siparişin kargoya verildiğinde e-posta ile iletilecektir.</p>
+{_footer()}</body></html>"""
+
+
+def amazon_html(rng, order_id, amount):
+    return f"""<html><head>{STYLE}</head><body>
+<p>Merhaba, siparişiniz için teşekkür ederiz.</p>
+<p>Sipariş #{order_id}</p>
+<table>{_product_rows(rng, rng.randint(1, 4))}</table>
+<p>Sipariş Toplamı: ₺{turkish_amount(amount)}</p>
+<p>Siparişinizi Siparişlerim bölümünden takip edebilirsiniz.</p>
+{_footer()}</body></html>"""
+
+
+def attachment_html():
+    # Gövdede sipariş/tutar bilgisi yoktur; bilgiler yalnızca PDF ekindedir.
+    return f"<html><head>{STYLE}</head><body><p>Sayın müşterimiz,</p><p>e-Arşiv belgeniz ektedir.</p>{_footer()}</body></html>"
+
+
+def newsletter_html(rng, text):
+    return f"""<html><head>{STYLE}</head><body><h1>{text}</h1>
+<table>{_product_rows(rng, rng.randint(4, 10))}</table>{_footer()}</body></html>"""
+
+
+def _invoice_lines(order_id, amount):
+    subtotal = amount / 1.2
+    return [
+        'BOYNER BÜYÜK MAĞAZACILIK A.Ş.',
+        'e-Arşiv Fatura',
+        f'Fatura No: BE0{order_id}',
+        f'Sipariş No: {order_id}',
+        'Ürün Adı                      Miktar    Birim Fiyat',
+        f'{PRODUCTS[order_id % len(PRODUCTS)]}          1 Adet    {turkish_amount(subtotal)} TL',
+        f'Mal Hizmet Toplam Tutarı: {turkish_amount(subtotal)} TL',
+        f'Hesaplanan KDV: {turkish_amount(amount - subtotal)} TL',
+        f'Ödenecek Tutar: {turkish_amount(amount)} TL',
+    ]
+
+
+def text_pdf(order_id, amount):
+    """Metin katmanlı, tek sayfalık e-fatura PDF'i."""
+    with matplotlib.rc_context({'pdf.fonttype': 42}):
+        figure = Figure(figsize=(8.27, 11.69))
+        for index, line in enumerate(_invoice_lines(order_id, amount)):
+            figure.text(0.08, 0.92 - index * 0.03, line, fontsize=11)
+        buffer = io.BytesIO()
+        FigureCanvasPdf(figure).print_pdf(buffer)
+    return buffer.getvalue()
+
+
+def scanned_pdf(order_id, amount):
+    """Yalnızca görüntüden oluşan (OCR gerektiren) tek sayfalık PDF."""
+    font = ImageFont.truetype(font_manager.findfont('DejaVu Sans'), 28)
+    image = Image.new('L', (1240, 1754), 255)
+    draw = ImageDraw.Draw(image)
+    for index, line in enumerate(_invoice_lines(order_id, amount)):
+        draw.text((100, 120 + index * 50), line, font=font, fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PDF', resolution=150)
+    return buffer.getvalue()
+
+
+class Corpus:
+    """messages (Gmail 'full' mesajları), attachments {(mesaj id, ek id): base64} ve truth.
+
+    truth[mesaj id] = {'kind', 'order_id', 'total_amount'}; sipariş içermeyen
+    mesajlarda order_id ve total_amount None'dır.
+    """
+
+    def __init__(self, messages, attachments, truth):
+        self.messages = messages
+        self.attachments = attachments
+        self.truth = truth
+
+    @property
+    def orders(self):
+        return {msg_id: expected for msg_id, expected in self.truth.items() if expected['order_id'] is not None}
+
+    def pdfs(self):
+        """(mesaj id, ek id, tür, pdf baytları) dörtlüleri."""
+        for (msg_id, attachment_id), data in self.attachments.items():
+            yield msg_id, attachment_id, self.truth[msg_id]['kind'], base64.urlsafe_b64decode(data)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'messages': self.messages,
+                'attachments': {f"{msg_id}/{att_id}": data for (msg_id, att_id), data in self.attachments.items()},
+                'truth': self.truth,
+            }, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            raw = json.load(f)
+        attachments = {tuple(key.split('/', 1)): data for key, data in raw['attachments'].items()}
+        return cls(raw['messages'], attachments, raw['truth'])
+
+
+def build_corpus(scale=1.0, seed=7, counts=None):
+    rng = random.Random(seed)
+    counts = {kind: max(1, round(count * scale)) for kind, count in (counts or DEFAULT_COUNTS).items()}
+
+    messages, attachments, truth = [], {}, {}
+    plan = [kind for kind, count in counts.items() for _ in range(count)]
+    rng.shuffle(plan)
+
+    for index, kind in enumerate(plan):
+        msg_id = f"m{index:06x}"
+        received = PERIOD_START + timedelta(seconds=rng.randrange(PERIOD_DAYS * 24 * 3600))
+        date = received.strftime('%a, %d %b %Y %H:%M:%S +0300')
+        internal_date = int(received.timestamp() * 1000)
+        amount = round(rng.uniform(49.9, 4999.9), 2)
+        message_attachments = []
+        order_id = None
+
+        if kind == 'trendyol':
+            order_id = str(rng.randrange(10 ** 9, 10 ** 10))
+            sender, subject = 'Trendyol <info@trendyolmail.com>', 'Siparişini aldık ✅'
+            html = trendyol_html(rng, order_id, amount)
+        elif kind == 'bershka':
+            order_id = str(rng.randrange(10 ** 7, 10 ** 8))
+            sender, subject = 'Bershka <noreply@bershka.com>', f'Sipariş özeti - {order_id}'
+            html = bershka_html(rng, order_id, amount)
+        elif kind == 'amazon':
+            order_id = f"{rng.randrange(400, 410)}-{rng.randrange(10 ** 7):07d}-{rng.randrange(10 ** 7):07d}"
+            sender, subject = 'Amazon.com.tr <siparis-onayi@amazon.com.tr>', 'Amazon.com.tr siparişiniz'
+            html = amazon_html(rng, order_id, amount)
+        elif kind in ('efatura', 'scanned'):
+            number = rng.randrange(10 ** 8, 10 ** 9)
+            order_id = str(number)
+            sender = 'BOYNER <efatura@boyner.com.tr>' if kind == 'efatura' else 'FLO <fatura@flo.com.tr>'
+            subject = 'Siparişiniz için E-FATURA HESABI | BOYNER' if kind == 'efatura' else 'Siparişinize ait e-Arşiv fatura'
+            html = attachment_html()
+            pdf = text_pdf(number, amount) if kind == 'efatura' else scanned_pdf(number, amount)
+            attachment_id = f"a{index:06x}"
+            attachments[(msg_id, attachment_id)] = base64.urlsafe_b64encode(pdf).decode('ascii')
+            message_attachments.append((attachment_id, f"BE0{number}.pdf"))
+        else:
+            sender, subject, text = rng.choice(NEWSLETTERS)
+            html = newsletter_html(rng, text)
+
+        message = make_message(msg_id, subject, sender, date, html, internal_date, 1000 + index, message_attachments)
+        if kind == 'newsletter':
+            message['labelIds'] = ['INBOX', 'CATEGORY_PROMOTIONS']
+        else:
+            message['labelIds'] = ['INBOX', 'CATEGORY_UPDATES']
+        messages.append(message)
+        truth[msg_id] = {
+            'kind': kind,
+            'order_id': order_id,
+            'total_amount': amount if order_id is not None else None,
+        }
+
+    # Gmail listeleri en yeniden eskiye döndürür.
+    messages.sort(key=lambda message: int(message['internalDate']), reverse=True)
+    return Corpus(messages, attachments, truth)
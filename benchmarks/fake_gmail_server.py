@@ -0,0 +1,212 @@
+"""Gmail REST API'nin çevrimdışı test ve ölçümler için küçük bir taklidi.
+
+messages.list / messages.get / attachments.get / history.list / getProfile uç
+noktalarını bellekteki bir mesaj listesinden sunar; aramalar gmail_query ile
+sorguya göre süzülür. AsyncGmailClient doğrudan base_url=server.url ile bu
+sunucuya bağlanabilir.
+"""
+import base64
+import html as html_lib
+import json
+import re
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+from gmail_query import SearchableMessage, parse_query
+
+API_PREFIX = '/gmail/v1/users/me'
+SNIPPET_LENGTH = 200
+HIDDEN_HTML = re.compile(r'<(style|script|head)\b.*?</\1>', re.S | re.I)
+HTML_TAG = re.compile(r'<[^>]+>')
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # Yüzlerce eşzamanlı bağlantı için varsayılan (5) dinleme kuyruğu yetmez.
+    request_queue_size = 1024
+
+
+def encode_body(text):
+    return base64.urlsafe_b64encode(text.encode('utf-8')).decode('ascii')
+
+
+def make_snippet(html):
+    """Gmail'deki gibi gövdenin görünen metninin ilk karakterleri."""
+    text = HTML_TAG.sub(' ', HIDDEN_HTML.sub(' ', html))
+    return ' '.join(html_lib.unescape(text).split())[:SNIPPET_LENGTH]
+
+
+def make_message(message_id, subject, sender, date, html, internal_date, history_id, attachments=None):
+    """Gmail 'full' biçiminde bir mesaj sözlüğü oluştur; attachments [(ek id, dosya adı)] listesidir."""
+    parts = [{'mimeType': 'text/html', 'body': {'data': encode_body(html)}}]
+    for attachment_id, filename in attachments or []:
+        parts.append({
+            'mimeType': 'application/pdf',
+            'filename': filename,
+            'body': {'attachmentId': attachment_id}
+        })
+    return {
+        'id': message_id,
+        'threadId': message_id,
+        'historyId': str(history_id),
+        'internalDate': str(internal_date),
+        'labelIds': ['INBOX'],
+        'snippet': make_snippet(html),
+        'payload': {
+            'mimeType': 'multipart/mixed',
+            'headers': [
+                {'name': 'Subject', 'value': subject},
+                {'name': 'From', 'value': sender},
+                {'name': 'Date', 'value': date},
+            ],
+            'parts': parts,
+        },
+    }
+
+
+class FakeGmailServer:
+    """Arka plan thread'inde çalışan, yerel porttan Gmail API'si sunan HTTP sunucusu.
+
+    latency her isteğe eklenen gecikmedir (saniye); rate_limit_every > 0 ise her
+    n'inci istek 429 rateLimitExceeded ile reddedilir. requests sayacı uç nokta
+    türüne göre yapılan istek sayısını tutar.
+    """
+
+    def __init__(self, messages, attachments=None, email='user@example.com', latency=0.0, page_size=100,
+                 rate_limit_every=0):
+        self.messages = list(messages)
+        self.by_id = {message['id']: message for message in self.messages}
+        self.searchable = [SearchableMessage(message) for message in self.messages]
+        self._query_cache = {}
+        self.attachments = dict(attachments or {})
+        self.email = email
+        self.latency = latency
+        self.page_size = page_size
+        self.rate_limit_every = rate_limit_every
+        self._request_count = 0
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', 0), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def history_id(self):
+        return max((int(message['historyId']) for message in self.messages), default=1)
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def count(self, kind):
+        with self._lock:
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+
+    def matching(self, query):
+        """Sorguyla eşleşen mesajlar (sorgu başına bir kez hesaplanır)."""
+        with self._lock:
+            matched = self._query_cache.get(query)
+        if matched is None:
+            node = parse_query(query)
+            matched = [item.message for item in self.searchable if item.matches(node)]
+            with self._lock:
+                self._query_cache[query] = matched
+        return matched
+
+    def handle(self, path, params):
+        """(durum kodu, JSON gövdesi) döndür."""
+        with self._lock:
+            self._request_count += 1
+            limited = self.rate_limit_every and self._request_count % self.rate_limit_every == 0
+        if limited:
+            self.count('rate_limited')
+            return 429, {'error': {'code': 429, 'message': 'Too many requests',
+                                   'errors': [{'reason': 'rateLimitExceeded'}]}}
+
+        parts = path[len(API_PREFIX):].strip('/').split('/')
+        if parts == ['profile']:
+            self.count('profile')
+            return 200, {'emailAddress': self.email, 'historyId': str(self.history_id)}
+
+        if parts == ['messages']:
+            self.count('list')
+            offset = int(params.get('pageToken', ['0'])[0])
+            size = min(int(params.get('maxResults', [self.page_size])[0]), 500)
+            matched = self.matching(params.get('q', [''])[0])
+            page = matched[offset:offset + size]
+            body = {'messages': [{'id': m['id'], 'threadId': m['threadId']} for m in page]}
+            if offset + size < len(matched):
+                body['nextPageToken'] = str(offset + size)
+            return 200, body
+
+        if len(parts) == 2 and parts[0] == 'messages':
+            self.count('get')
+            message = self.by_id.get(parts[1])
+            if message is None:
+                return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+            if params.get('format', ['full'])[0] == 'metadata':
+                wanted = set(params.get('metadataHeaders', []))
+                headers = [h for h in message['payload']['headers'] if not wanted or h['name'] in wanted]
+                return 200, {**message, 'payload': {'mimeType': message['payload']['mimeType'], 'headers': headers}}
+            return 200, message
+
+        if len(parts) == 4 and parts[0] == 'messages' and parts[2] == 'attachments':
+            self.count('attachment')
+            data = self.attachments.get((parts[1], parts[3]))
+            if data is None:
+                return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+            return 200, {'data': data, 'size': len(data)}
+
+        if parts == ['history']:
+            self.count('history')
+            start = int(params['startHistoryId'][0])
+            added = [m for m in self.messages if int(m['historyId']) > start]
+            return 200, {
+                'history': [
+                    {'id': m['historyId'], 'messagesAdded': [{'message': {'id': m['id'], 'labelIds': m['labelIds']}}]}
+                    for m in added
+                ],
+                'historyId': str(self.history_id),
+            }
+
+        return 404, {'error': {'code': 404, 'message': 'Not Found'}}
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if server.latency:
+                    time.sleep(server.latency)
+                url = urlparse(self.path)
+                status, body = server.handle(url.path, parse_qs(url.query))
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
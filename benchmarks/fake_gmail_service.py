@@ -0,0 +1,183 @@
+"""googleapiclient Gmail servisinin (service.users().messages() ...) süreç içi taklidi.
+
+gmail_fetch ve web_scraping yardımcıları bu nesneyi gerçek discovery servisi gibi
+kullanır: list/get/attachments.get/history.list/getProfile istekleri ve
+new_batch_http_request ile batch çalıştırma desteklenir. Ağ yoktur; isteğe bağlı
+latency her execute() çağrısına (batch için bir kez) eklenir. Aramalar
+gmail_query ile sorguya göre süzülür.
+"""
+import threading
+import time
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+from gmail_query import SearchableMessage, parse_query
+
+
+def _http_error(status, message):
+    return HttpError(httplib2.Response({'status': status, 'reason': message}), message.encode('utf-8'))
+
+
+class FakeRequest:
+    def __init__(self, service, kind, handler):
+        self.service = service
+        self.kind = kind
+        self.handler = handler
+
+    def execute(self, http=None, num_retries=0):
+        self.service.wait()
+        return self.service.call(self.kind, self.handler)
+
+
+class FakeBatch:
+    def __init__(self, service, callback=None):
+        self.service = service
+        self.callback = callback
+        self._requests = []
+
+    def add(self, request, callback=None, request_id=None):
+        request_id = request_id if request_id is not None else str(len(self._requests))
+        self._requests.append((request_id, request, callback or self.callback))
+
+    def execute(self, http=None):
+        # Gerçek batch gibi tek gidiş-dönüş: gecikme bir kez eklenir.
+        self.service.wait()
+        for request_id, request, callback in self._requests:
+            try:
+                response = self.service.call(request.kind, request.handler)
+            except HttpError as e:
+                callback(request_id, None, e)
+            else:
+                callback(request_id, response, None)
+
+
+class _Resource:
+    """users() / messages() / attachments() / history() kaynak nesnesi."""
+
+    def __init__(self, service, methods):
+        self._service = service
+        for name, method in methods.items():
+            setattr(self, name, method)
+
+
+class FakeGmailService:
+    """Bellekteki mesajlardan Gmail API'sini sunan, googleapiclient servisiyle aynı arayüzlü nesne.
+
+    messages Gmail 'full' biçiminde mesajlar, attachments {(mesaj id, ek id): base64 veri}
+    sözlüğüdür. rate_limit_every > 0 ise her n'inci alt istek 429 ile reddedilir.
+    requests sayacı çağrı türüne göre istek sayısını tutar.
+    """
+
+    def __init__(self, messages, attachments=None, email='user@example.com', latency=0.0, rate_limit_every=0):
+        self.messages = list(messages)
+        self.by_id = {message['id']: message for message in self.messages}
+        self.searchable = [SearchableMessage(message) for message in self.messages]
+        self.attachments = dict(attachments or {})
+        self.email = email
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.requests = {}
+        self._request_count = 0
+        self._lock = threading.Lock()
+        self._query_cache = {}
+
+    @property
+    def history_id(self):
+        return max((int(message['historyId']) for message in self.messages), default=1)
+
+    def wait(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def call(self, kind, handler):
+        with self._lock:
+            self._request_count += 1
+            self.requests[kind] = self.requests.get(kind, 0) + 1
+            limited = self.rate_limit_every and self._request_count % self.rate_limit_every == 0
+        if limited:
+            raise _http_error(429, 'rateLimitExceeded')
+        return handler()
+
+    def new_batch_http_request(self, callback=None):
+        return FakeBatch(self, callback)
+
+    def users(self):
+        return _Resource(self, {
+            'messages': self._messages_resource,
+            'history': self._history_resource,
+            'getProfile': lambda userId='me': FakeRequest(self, 'profile', self._profile),
+        })
+
+    def _messages_resource(self):
+        return _Resource(self, {
+            'list': lambda userId='me', q=None, maxResults=None, pageToken=None, **_: FakeRequest(
+                self, 'list', lambda: self._list(q, maxResults, pageToken)
+            ),
+            'get': lambda userId='me', id=None, format='full', metadataHeaders=None, **_: FakeRequest(
+                self, 'get', lambda: self._get(id, format, metadataHeaders)
+            ),
+            'attachments': lambda: _Resource(self, {
+                'get': lambda userId='me', messageId=None, id=None: FakeRequest(
+                    self, 'attachment', lambda: self._attachment(messageId, id)
+                ),
+            }),
+        })
+
+    def _history_resource(self):
+        return _Resource(self, {
+            'list': lambda userId='me', startHistoryId=None, historyTypes=None, pageToken=None, **_: FakeRequest(
+                self, 'history', lambda: self._history(startHistoryId)
+            ),
+        })
+
+    def matching_ids(self, query):
+        """Sorguyla eşleşen mesaj id'leri (sorgu başına bir kez hesaplanır)."""
+        with self._lock:
+            ids = self._query_cache.get(query)
+        if ids is None:
+            node = parse_query(query)
+            ids = [item.message['id'] for item in self.searchable if item.matches(node)]
+            with self._lock:
+                self._query_cache[query] = ids
+        return ids
+
+    def _list(self, query, max_results, page_token):
+        ids = self.matching_ids(query)
+        offset = int(page_token or 0)
+        size = min(int(max_results or 100), 500)
+        body = {'messages': [{'id': msg_id, 'threadId': msg_id} for msg_id in ids[offset:offset + size]],
+                'resultSizeEstimate': len(ids)}
+        if offset + size < len(ids):
+            body['nextPageToken'] = str(offset + size)
+        return body
+
+    def _get(self, message_id, message_format, metadata_headers):
+        message = self.by_id.get(message_id)
+        if message is None:
+            raise _http_error(404, 'Not Found')
+        if message_format == 'metadata':
+            wanted = set(metadata_headers or [])
+            headers = [h for h in message['payload']['headers'] if not wanted or h['name'] in wanted]
+            return {**message, 'payload': {'mimeType': message['payload']['mimeType'], 'headers': headers}}
+        return message
+
+    def _attachment(self, message_id, attachment_id):
+        data = self.attachments.get((message_id, attachment_id))
+        if data is None:
+            raise _http_error(404, 'Not Found')
+        return {'data': data, 'size': len(data)}
+
+    def _history(self, start_history_id):
+        start = int(start_history_id)
+        added = [m for m in self.messages if int(m['historyId']) > start]
+        return {
+            'history': [
+                {'id': m['historyId'], 'messagesAdded': [{'message': {'id': m['id'], 'labelIds': m['labelIds']}}]}
+                for m in added
+            ],
+            'historyId': str(self.history_id),
+        }
+
+    def _profile(self):
+        return {'emailAddress': self.email, 'historyId': str(self.history_id)}
@@ -0,0 +1,174 @@
+"""Sahte Gmail servisleri için Gmail arama sözdiziminin küçük bir alt kümesi.
+
+Desteklenenler: from:, to:, subject:, after:/before: (YYYY-MM-DD veya YYYY/MM/DD),
+has:attachment, filename:, category:, label:, tırnaklı ifadeler, parantez, "-" ile
+olumsuzlama ve OR. Gmail'de olduğu gibi OR, boşlukla yazılan VE'den sıkı bağlanır:
+"a OR b c" sorgusu "(a OR b) c" demektir. Serbest kelimeler konu, gönderici,
+snippet ve gövdede büyük/küçük harf duyarsız alt dizgi olarak aranır.
+"""
+import base64
+import re
+from datetime import datetime
+
+TOKEN = re.compile(r"""\s*(?:(\()|(\))|(-)?(?:([A-Za-z_]+):)?("[^"]*"|'[^']*'|[^\s()]+))""")
+
+
+def _tokenize(query):
+    tokens = []
+    position = 0
+    query = query.strip()
+    while position < len(query):
+        match = TOKEN.match(query, position)
+        if match is None or match.end() == position:
+            break
+        position = match.end()
+        opening, closing, negated, key, value = match.groups()
+        if opening:
+            tokens.append('(')
+        elif closing:
+            tokens.append(')')
+        elif value == 'OR' and not key and not negated:
+            tokens.append('OR')
+        else:
+            tokens.append((bool(negated), (key or '').lower(), value.strip('"\'')))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.position = 0
+
+    def peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.position += 1
+        return token
+
+    def parse_and(self):
+        terms = []
+        while self.peek() not in (None, ')'):
+            terms.append(self.parse_or())
+        return ('and', terms)
+
+    def parse_or(self):
+        terms = [self.parse_unary()]
+        while self.peek() == 'OR':
+            self.take()
+            if self.peek() in (None, ')'):
+                break
+            terms.append(self.parse_unary())
+        return terms[0] if len(terms) == 1 else ('or', terms)
+
+    def parse_unary(self):
+        token = self.take()
+        if token == '(':
+            node = self.parse_and()
+            if self.peek() == ')':
+                self.take()
+            return node
+        if token == 'OR':
+            # Başta veya art arda gelen OR Gmail'de kelime olarak aranır.
+            return ('term', False, '', 'OR')
+        negated, key, value = token
+        return ('term', negated, key, value)
+
+
+def parse_query(query):
+    """Sorguyu ('and'|'or', [düğümler]) / ('term', olumsuz, anahtar, değer) ağacına çevir."""
+    parser = _Parser(_tokenize(query or ''))
+    node = parser.parse_and()
+    # Eşlenmemiş ')' kalırsa geri kalanı yine VE olarak okunur.
+    while parser.peek() is not None:
+        parser.take()
+        node = ('and', [node, parser.parse_and()])
+    return node
+
+
+def _header(message, name):
+    for header in message.get('payload', {}).get('headers', []):
+        if header['name'].lower() == name:
+            return header['value']
+    return ''
+
+
+def _iter_parts(payload):
+    yield payload
+    for part in payload.get('parts', []):
+        yield from _iter_parts(part)
+
+
+def _body_text(message):
+    texts = []
+    for part in _iter_parts(message.get('payload', {})):
+        data = part.get('body', {}).get('data')
+        if data and part.get('mimeType', '').startswith('text/'):
+            texts.append(base64.urlsafe_b64decode(data.encode('ascii')).decode('utf-8', 'replace'))
+    return '\n'.join(texts)
+
+
+def _parse_date(value):
+    for date_format in ('%Y-%m-%d', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    return None
+
+
+class SearchableMessage:
+    """Bir mesajın arama alanlarını bir kez hazırlar; aynı mesaj birçok sorguyla eşlenebilir."""
+
+    def __init__(self, message):
+        self.message = message
+        self.sender = _header(message, 'from').lower()
+        self.to = _header(message, 'to').lower()
+        self.subject = _header(message, 'subject').lower()
+        self.text = '\n'.join((self.subject, self.sender, message.get('snippet', ''), _body_text(message))).lower()
+        self.filenames = [
+            part['filename'].lower() for part in _iter_parts(message.get('payload', {})) if part.get('filename')
+        ]
+        self.labels = {label.upper() for label in message.get('labelIds', [])}
+        internal_date = message.get('internalDate')
+        self.received = datetime.fromtimestamp(int(internal_date) / 1000) if internal_date else None
+
+    def matches_term(self, key, value):
+        value = value.lower()
+        if key == 'from':
+            return value in self.sender
+        if key == 'to':
+            return value in self.to
+        if key == 'subject':
+            return value in self.subject
+        if key in ('after', 'before'):
+            limit = _parse_date(value)
+            if limit is None or self.received is None:
+                return False
+            return self.received >= limit if key == 'after' else self.received < limit
+        if key == 'has':
+            return value == 'attachment' and bool(self.filenames)
+        if key == 'filename':
+            return any(filename == value or filename.endswith('.' + value) or value in filename
+                       for filename in self.filenames)
+        if key == 'category':
+            return f'CATEGORY_{value.upper()}' in self.labels
+        if key in ('label', 'in'):
+            return value.upper() in self.labels
+        return value in self.text
+
+    def matches(self, node):
+        kind = node[0]
+        if kind == 'and':
+            return all(self.matches(child) for child in node[1])
+        if kind == 'or':
+            return any(self.matches(child) for child in node[1])
+        _, negated, key, value = node
+        return self.matches_term(key, value) != negated
+
+
+def matches_query(message, query):
+    """Mesaj Gmail sorgusuyla eşleşiyor mu? (SearchableMessage üzerinden de çağrılabilir.)"""
+    searchable = message if isinstance(message, SearchableMessage) else SearchableMessage(message)
+    return searchable.matches(parse_query(query))
@@ -0,0 +1,62 @@
+"""Zaman aşımına uğrayan bir iş havuzu yeniledikten sonra kuyruktaki işlerin de bittiğini doğrular.
+
+Kullanım: python benchmarks/pdf_pool_check.py [--workers 2] [--jobs 12] [--timeout 1]
+İşçi sayısından fazla iş gönderilir; biri zaman aşımına kadar takılır. Takılan işin
+sonucu None, diğer her işin sonucu kendi girdisi olmalı ve map() süre sınırında dönmelidir.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_workers  # noqa: E402
+from pdf_workers import PdfWorkerPool  # noqa: E402
+
+HANG = b'hang'
+
+
+def fake_job(token, pdf_bytes):
+    """process_pdf_job yerine işçide çalışır: başlangıcı bildirir, 'hang' girdisinde takılır."""
+    if pdf_workers._started_queue is not None:
+        pdf_workers._started_queue.put((token, os.getpid(), time.time()))
+    time.sleep(600 if pdf_bytes == HANG else 0.3)
+    return (pdf_bytes.decode(), 'check', {}), []
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--jobs', type=int, default=12)
+    parser.add_argument('--timeout', type=float, default=1.0)
+    args = parser.parse_args()
+
+    pdf_workers.process_pdf_job = fake_job
+    pool = PdfWorkerPool(max_workers=args.workers, timeout=args.timeout)
+    jobs = {'hang': HANG, **{f'job{i}': f'job{i}'.encode() for i in range(args.jobs - 1)}}
+
+    results = {}
+    runner = threading.Thread(target=lambda: results.update(pool.map(jobs)), daemon=True)
+    started = time.perf_counter()
+    runner.start()
+    # Her iş en fazla bir zaman aşımı ve bir yenileme sürer; sınır bunun bol üstündedir.
+    runner.join(args.timeout * 4 + 0.3 * args.jobs + 30)
+    elapsed = time.perf_counter() - started
+    pool.shutdown(wait=False)
+
+    if runner.is_alive():
+        print(f"FAIL: map() did not return within {elapsed:.1f} s")
+        return 1
+    expected = {key: None if data == HANG else (data.decode(), 'check', {}) for key, data in jobs.items()}
+    wrong = sorted(key for key in jobs if results.get(key, 'missing') != expected[key])
+    if wrong:
+        print(f"FAIL: wrong results for {', '.join(wrong)}: {[results.get(key, 'missing') for key in wrong]}")
+        return 1
+    print(f"OK: {len(jobs) - 1} jobs finished and 1 timed out in {elapsed:.1f} s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,520 @@
+"""Sahte Gmail servisi ve sentetik derlemle çevrimdışı uçtan uca ölçüm takımı.
+
+Senaryolar:
+  pdf        extract_pdf_content + extract_pdf_order_details (e-fatura ve OCR varsa taranmış PDF'ler)
+  list       web_scraping.list_emails_with_details (dashboard anahtar kelimeleri, dönem sorgusu)
+  orders     web_scraping.process_all_orders (tüm posta kutusu, PDF işçi havuzuyla)
+  dashboard  app.dashboard: ilk istek + arka plan senkronizasyonu, ardından ılık istekler
+             (sorgu planı cümle katkıları ve ön filtre isabeti /jobs/<id> yanıtından)
+
+Her senaryo için verim (öğe/s), doğruluk (derlemin beklenen sipariş numarası ve
+tutarıyla eşleşme oranı) ve metrics kaydından aşama dökümü raporlanır.
+
+Kullanım:
+  python benchmarks/pipeline_bench.py [--scale 1] [--repeat 3] [--client discovery|async]
+      [--only pdf,list,orders,dashboard] [--corpus kayıt.json] [--json sonuç.json]
+      [--threshold 0.25] [--gate-throughput] [--update-baseline]
+
+Verim metrikleri makineden bağımsız olsun diye aynı çalıştırmada ölçülen sabit bir
+referans iş yüküne (BeautifulSoup + regex + json + SQLite, uygulama kodu kullanmaz)
+oranlanır; baseline.json bu oranları saklar, ham sayıları değil. Yine de paylaşılan
+makinelerde oranlar turdan tura %25'i aşan oynaklık gösterir; bu yüzden varsayılan
+olarak yalnızca deterministik metrikler (doğruluk, recall) kapılanır ve düşerse çıkış
+kodu 1 olur; CI bu betiği doğrudan çalıştırabilir. Eşikten (varsayılan %25) fazla düşen
+verim oranları uyarı olarak raporlanır; --gate-throughput bunları da hata sayar ve
+aynı makinede --update-baseline ile kaydedilmiş bir referansla kullanılmalıdır.
+--update-baseline referansı yeniler. Derlem, istemci veya
+gecikme farklıysa karşılaştırma yapılamaz; yalnızca OCR farklıysa OCR'dan etkilenen
+metrikler (pdf, verimler) atlanır ve doğruluk metrikleri yine karşılaştırılır.
+
+Uygulama modülleri geçici bir dizinde (boş önbellekler, sahte credentials.json)
+ve Gmail kota kovası devre dışı bırakılarak yüklenir; ölçülen, yerel işlem
+maliyetidir. --latency ile her Gmail isteğine ağ gecikmesi eklenebilir.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, REPO_DIR)
+
+from corpus import Corpus, build_corpus  # noqa: E402
+from fake_gmail_server import FakeGmailServer  # noqa: E402
+from fake_gmail_service import FakeGmailService  # noqa: E402
+
+BASELINE_PATH = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_THRESHOLD = float(os.environ.get("EXPENSELESS_BENCH_THRESHOLD", 0.25))
+# Doğruluk deterministiktir; küçük bir pay yalnızca yuvarlama içindir.
+ACCURACY_TOLERANCE = 0.005
+SCENARIOS = ('pdf', 'list', 'orders', 'dashboard')
+# Referans iş yükü değişirse eski baseline oranları geçersiz olur.
+REFERENCE_VERSION = 1
+REFERENCE_ROUNDS = 5
+REFERENCE_MESSAGES = 20
+
+PERIOD = ((2024, 1), (2024, 6))
+PERIOD_QUERY = "after:2024-01-01 before:2024-07-01"
+WARM_REQUESTS = 20
+# Listeleme tek turda milisaniyeler sürer; ölçüm gürültüsünü azaltmak için tur başına birkaç kez yapılır.
+LIST_ROUNDS = 10
+
+USER_EMAIL = 'bench@example.com'
+CLIENT_SECRETS = {
+    'web': {
+        'client_id': 'bench', 'client_secret': 'bench',
+        'auth_uri': 'https://accounts.google.com/o/oauth2/auth', 'token_uri': 'https://oauth2.googleapis.com/token',
+        'redirect_uris': ['http://localhost:5000/callback'],
+    }
+}
+
+
+def ocr_available():
+    return shutil.which('tesseract') is not None and shutil.which('pdftoppm') is not None
+
+
+def amount_value(value):
+    """Çıkarılan tutarı (dizge veya sayı) float'a çevir; build_email_order ile aynı kurallar."""
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace('₺', '').replace('TL', '').strip()
+    if ',' in text and '.' in text:
+        text = text.replace('.', '').replace(',', '.')
+    elif ',' in text:
+        text = text.replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def is_correct(expected, order_id, amount):
+    value = amount_value(amount)
+    return (
+        str(order_id) == expected['order_id']
+        and value is not None
+        and abs(value - expected['total_amount']) < 0.01
+    )
+
+
+def stage_delta(before, after):
+    """İki metrics anlık görüntüsü arasındaki {aşama: (çağrı, saniye, hata)} farkı."""
+    delta = {}
+    for stage, (count, seconds, errors) in after.items():
+        previous = before.get(stage, (0, 0.0, 0))
+        if count - previous[0]:
+            delta[stage] = (count - previous[0], seconds - previous[1], errors - previous[2])
+    return delta
+
+
+def measure(repeat, run):
+    """run()'ı repeat kez çalıştır; en hızlı turun (süre, sonuç, aşama dökümü) üçlüsünü döndür."""
+    from metrics import snapshot
+
+    best = None
+    for _ in range(repeat):
+        before = snapshot()
+        started = time.perf_counter()
+        result = run()
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, result, stage_delta(before, snapshot()))
+    return best
+
+
+def reference_rate(corpus, rounds=REFERENCE_ROUNDS):
+    """Sabit referans iş yükünün en hızlı turdaki saniyedeki tekrar sayısı.
+
+    Derlemin ilk mesajları BeautifulSoup ile ayrıştırılır, metinde regex aranır,
+    sonuç JSON'a çevrilip bellek içi SQLite'a yazılır ve okunur. Uygulama kodu
+    kullanılmaz; böylece uygulamadaki bir gerileme referansı da yavaşlatıp gizlemez.
+    """
+    import sqlite3
+    from bs4 import BeautifulSoup
+
+    from gmail_query import _body_text
+
+    bodies = [_body_text(message) for message in corpus.messages[:REFERENCE_MESSAGES]]
+    pattern = re.compile(r'(?:Sipariş|Order)[^0-9]*?(\d+)|([\d.,]+)\s*(?:TL|₺)', re.IGNORECASE)
+
+    def workload():
+        conn = sqlite3.connect(':memory:')
+        conn.execute("CREATE TABLE t (k TEXT PRIMARY KEY, v TEXT)")
+        for index, body in enumerate(bodies):
+            text = BeautifulSoup(body, 'html.parser').get_text(' ', strip=True)
+            found = [match.groups() for match in pattern.finditer(text)]
+            conn.execute("INSERT INTO t VALUES (?, ?)", (str(index), json.dumps(found)))
+        rows = conn.execute("SELECT v FROM t").fetchall()
+        conn.close()
+        return sum(len(json.loads(value)) for value, in rows)
+
+    best = None
+    for _ in range(rounds):
+        started = time.perf_counter()
+        iterations = 0
+        while time.perf_counter() - started < 0.2:
+            workload()
+            iterations += 1
+        rate = iterations / (time.perf_counter() - started)
+        best = rate if best is None else max(best, rate)
+    return best
+
+
+def relative_metrics(results, reference):
+    """Kapılanan metrikler: verimler referans oranına bölünür, doğruluklar olduğu gibi kalır."""
+    return {
+        name: value / reference if name.endswith('_per_s') else value
+        for name, value in results.items() if is_gated(name)
+    }
+
+
+def bench_pdf(corpus, args):
+    from pdf_processor import extract_pdf_content, extract_pdf_order_details
+
+    pdfs = [pdf for pdf in corpus.pdfs() if args.ocr or pdf[2] != 'scanned']
+    if not pdfs:
+        return {}, {}
+
+    def run():
+        correct = 0
+        for msg_id, _, _, data in pdfs:
+            details = extract_pdf_order_details(extract_pdf_content(data))
+            correct += is_correct(corpus.truth[msg_id], details['order_id'], details['total_amount'])
+        return correct
+
+    elapsed, correct, stages = measure(args.repeat, run)
+    return {
+        'pdf.pdfs_per_s': len(pdfs) / elapsed,
+        'pdf.accuracy': correct / len(pdfs),
+    }, stages
+
+
+def gmail_service(corpus, server, args):
+    """Senaryonun kullanacağı servis ve mesaj çekme sayacı."""
+    if args.client == 'async':
+        from gmail_client import AsyncGmailClient
+
+        client = AsyncGmailClient(base_url=server.url)
+        return client, lambda: server.requests.get('get', 0)
+
+    service = FakeGmailService(corpus.messages, corpus.attachments, email=USER_EMAIL, latency=args.latency)
+    return service, lambda: service.requests.get('get', 0)
+
+
+def bench_list(corpus, server, args):
+    from app import KEYWORDS
+    from web_scraping import list_emails_with_details
+
+    service, _ = gmail_service(corpus, server, args)
+    elapsed, emails, stages = measure(args.repeat, lambda: [
+        list_emails_with_details(service, KEYWORDS, max_results=None, query=PERIOD_QUERY)
+        for _ in range(LIST_ROUNDS)
+    ][-1])
+    return {
+        'list.messages': len(emails),
+        'list.messages_per_s': len(emails) * LIST_ROUNDS / elapsed,
+    }, stages
+
+
+def bench_orders(corpus, server, args):
+    from pdf_workers import get_pdf_worker_pool
+    from web_scraping import process_all_orders
+
+    service, fetched = gmail_service(corpus, server, args)
+    pool = get_pdf_worker_pool()
+
+    def run():
+        before = fetched()
+        orders = process_all_orders(service, max_results=None, pool=pool)
+        return orders, fetched() - before
+
+    elapsed, (orders, messages), stages = measure(args.repeat, run)
+    by_order_id = {str(order['order_id']): order for order in orders}
+    expected = corpus.orders.values()
+    correct = sum(
+        1 for truth in expected
+        if truth['order_id'] in by_order_id
+        and is_correct(truth, truth['order_id'], by_order_id[truth['order_id']]['amount'])
+    )
+    return {
+        'orders.messages': messages,
+        'orders.messages_per_s': messages / elapsed,
+        'orders.orders_per_s': len(orders) / elapsed,
+        'orders.recall': correct / len(expected),
+    }, stages
+
+
+def bench_dashboard(corpus, server, args):
+    import app as webapp
+    from metrics import snapshot
+    from order_store import get_order_store, month_bounds
+
+    client = webapp.app.test_client()
+    with client.session_transaction() as session:
+        session['credentials'] = {
+            'token': 'bench', 'refresh_token': None, 'token_uri': CLIENT_SECRETS['web']['token_uri'],
+            'client_id': 'bench', 'client_secret': 'bench', 'scopes': webapp.SCOPES,
+        }
+        session['user_email'] = USER_EMAIL
+
+    (start_year, start_month), (end_year, end_month) = PERIOD
+    url = f"/dashboard?range=custom&start={start_year}-{start_month:02d}&end={end_year}-{end_month:02d}"
+
+    # Soğuk istek: sayfa defterdeki (boş) verilerle hemen döner, senkronizasyon arka planda yürür.
+    before = snapshot()
+    started = time.perf_counter()
+    response = client.get(url)
+    first_response = time.perf_counter() - started
+    match = re.search(r'/jobs/([0-9a-f]{32})', response.get_data(as_text=True))
+    job = {'emails_processed': 0}
+    if match:
+        while True:
+            job = client.get(f'/jobs/{match[1]}').get_json()['job']
+            if job['status'] != 'running':
+                break
+            time.sleep(0.05)
+    sync_elapsed = time.perf_counter() - started
+    stages = stage_delta(before, snapshot())
+
+    warm_elapsed, _, warm_stages = measure(args.repeat, lambda: [client.get(url) for _ in range(WARM_REQUESTS)])
+    server_elapsed, _, _ = measure(
+        args.repeat, lambda: [client.get(url + '&charts=server') for _ in range(WARM_REQUESTS)]
+    )
+    for stage, values in warm_stages.items():
+        stages[f'{stage} (warm)'] = values
+
+    stored = {
+        row['message_id']: row
+        for row in get_order_store().orders_between(
+            USER_EMAIL, month_bounds(start_year, start_month)[0], month_bounds(end_year, end_month)[1]
+        )
+    }
+    expected = corpus.orders
+    correct = sum(
+        1 for msg_id, truth in expected.items()
+        if msg_id in stored and is_correct(truth, stored[msg_id]['order_id'], stored[msg_id]['total_amount'])
+    )
+    # Sorgu planı açıksa her cümlenin listeye kattığı ve sipariş çıkan mesaj sayıları.
+    clauses = {
+        f'dashboard.plan_{clause}_{field}': counts[field]
+        for clause, counts in job.get('query_plan', {}).items() for field in ('listed', 'orders')
+    }
+    # Eski anahtar kelime sorgusu ile planın ve her cümlenin (dışlamalarıyla, tek başına) derlemde
+    # eşleştiği mesaj ve sipariş sayıları; listeleme çağrısı yapılmadan yerel olarak hesaplanır.
+    volumes = query_volumes(corpus, get_order_store(), webapp.KEYWORDS)
+    # Ön filtre açıksa kararlarının defterdeki siparişlere göre isabeti ve atlanan tam çekimler.
+    prefilter = {
+        f'dashboard.prefilter_{field}': value
+        for field, value in job.get('prefilter', {}).items()
+        if field in ('precision', 'recall', 'audit_miss_rate', 'ledger_missed', 'skipped', 'audited')
+        and value is not None
+    }
+    # Ön filtrenin atladığı mesajlar da listelenmiş sayılır; oran filtreyle karşılaştırılabilir kalır.
+    listed = job['emails_processed'] + job.get('prefilter', {}).get('skipped', 0)
+    return {
+        'dashboard.first_response_ms': first_response * 1000,
+        'dashboard.sync_seconds': sync_elapsed,
+        'dashboard.sync_messages_per_s': listed / sync_elapsed,
+        'dashboard.warm_requests_per_s': WARM_REQUESTS / warm_elapsed,
+        'dashboard.server_chart_requests_per_s': WARM_REQUESTS / server_elapsed,
+        'dashboard.messages_listed': listed,
+        'dashboard.recall': correct / len(expected),
+        **clauses,
+        **volumes,
+        **prefilter,
+    }, stages
+
+
+def query_volumes(corpus, store, keywords):
+    from gmail_query import SearchableMessage, matches_query
+    from query_planner import EXCLUDED_SENDERS, build_query_plan
+
+    plan = build_query_plan(store, USER_EMAIL, keywords)
+    legacy = f"{' OR '.join(keywords)} {PERIOD_QUERY} -from:{EXCLUDED_SENDERS[0]}"
+    queries = {'legacy': legacy, 'plan': plan.query(PERIOD_QUERY)}
+    for clause in plan.clauses:
+        queries[clause.name] = ' '.join([f"({clause.query})", PERIOD_QUERY] + plan.exclusions)
+
+    messages = [SearchableMessage(message) for message in corpus.messages]
+    orders = corpus.orders
+    volumes = {}
+    for name, query in queries.items():
+        matched = [message for message in messages if matches_query(message, query)]
+        volumes[f'dashboard.volume_{name}'] = len(matched)
+        volumes[f'dashboard.volume_{name}_orders'] = sum(1 for message in matched if message.message['id'] in orders)
+    return volumes
+
+
+def is_gated(name):
+    return name.endswith(('_per_s', 'accuracy', 'recall'))
+
+
+def ocr_dependent(name):
+    """OCR varlığı iş yükünü değiştiren metrikler: pdf senaryosu ve taranmış PDF'leri işleyen verimler."""
+    return name.startswith('pdf.') or name.endswith('_per_s')
+
+
+def is_deterministic(name):
+    """Makine yükünden etkilenmeyen, her zaman kapılanan metrikler."""
+    return name.endswith(('accuracy', 'recall'))
+
+
+def compare(results, baseline, threshold, skip=lambda name: False):
+    """Gerileyen metriklerin açıklamalarını döndür; results ve baseline referansa oranlanmıştır."""
+    failures = []
+    for name, expected in sorted(baseline['metrics'].items()):
+        actual = results.get(name)
+        if actual is None or skip(name):
+            continue
+        if is_deterministic(name):
+            limit = expected - ACCURACY_TOLERANCE
+        else:
+            limit = expected * (1 - threshold)
+        if actual < limit:
+            failures.append(f"{name}: {actual:.3f} < {limit:.3f} (baseline {expected:.3f})")
+    return failures
+
+
+def print_report(results, stages):
+    for scenario in SCENARIOS:
+        names = [name for name in results if name.startswith(scenario + '.')]
+        if not names:
+            continue
+        print(f"\n[{scenario}]")
+        for name in names:
+            print(f"  {name.split('.', 1)[1]:<32} {results[name]:>12.3f}")
+        for stage, (count, seconds, errors) in sorted(stages.get(scenario, {}).items()):
+            suffix = f", {errors} errors" if errors else ""
+            print(f"    stage {stage:<28} {count:>6}x {seconds * 1000 / count:>9.2f} ms avg{suffix}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.0, help="sentetik derlem ölçeği")
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--corpus', help="kaydedilmiş derlem (Corpus.save) JSON dosyası")
+    parser.add_argument('--save-corpus', help="üretilen derlemi bu dosyaya kaydet")
+    parser.add_argument('--client', choices=('discovery', 'async'), default='discovery')
+    parser.add_argument('--latency', type=float, default=0.0, help="Gmail isteği başına gecikme (saniye)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--only', default=','.join(SCENARIOS))
+    parser.add_argument('--json', help="sonuçları JSON olarak yaz")
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument('--gate-throughput', action='store_true',
+                        help="verim oranlarındaki düşüşü de hata say (yerel baseline ile)")
+    parser.add_argument('--update-baseline', action='store_true')
+    args = parser.parse_args()
+    args.ocr = ocr_available()
+    scenarios = [name for name in args.only.split(',') if name]
+
+    corpus = Corpus.load(args.corpus) if args.corpus else build_corpus(args.scale, args.seed)
+    if args.save_corpus:
+        corpus.save(args.save_corpus)
+    config = {
+        'corpus': os.path.basename(args.corpus) if args.corpus else f"synthetic:{args.scale}:{args.seed}",
+        'client': args.client,
+        'latency': args.latency,
+        'ocr': args.ocr,
+        'reference': REFERENCE_VERSION,
+    }
+
+    server = FakeGmailServer(corpus.messages, corpus.attachments, email=USER_EMAIL, latency=args.latency).start()
+    workdir = tempfile.mkdtemp(prefix='expenseless-bench-')
+    os.chdir(workdir)
+    with open('credentials.json', 'w') as f:
+        json.dump(CLIENT_SECRETS, f)
+    # Uygulama modülleri bu ayarları import sırasında okur.
+    os.environ['EXPENSELESS_GMAIL_QUOTA_PER_SECOND'] = '1e9'
+    os.environ['EXPENSELESS_GMAIL_CLIENT'] = 'async'
+    os.environ['EXPENSELESS_GMAIL_API_ROOT'] = server.url
+
+    results, stages = {}, {}
+    reference_rates = [reference_rate(corpus)]
+    try:
+        for scenario in scenarios:
+            print(f"running {scenario}...", file=sys.stderr)
+            with open(os.devnull, 'w') as sink, contextlib.redirect_stdout(sink):
+                if scenario == 'pdf':
+                    metrics, scenario_stages = bench_pdf(corpus, args)
+                elif scenario == 'list':
+                    metrics, scenario_stages = bench_list(corpus, server, args)
+                elif scenario == 'orders':
+                    metrics, scenario_stages = bench_orders(corpus, server, args)
+                else:
+                    metrics, scenario_stages = bench_dashboard(corpus, server, args)
+            results.update(metrics)
+            stages[scenario] = scenario_stages
+        # Makinenin hızı çalıştırma boyunca değişebilir; referans sonda yeniden ölçülür, en hızlısı alınır.
+        reference_rates.append(reference_rate(corpus))
+    finally:
+        server.stop()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"corpus {config['corpus']}: {len(corpus.messages)} messages, {len(corpus.orders)} orders, "
+          f"{len(corpus.attachments)} PDFs; client={args.client}, ocr={'on' if args.ocr else 'off'}")
+    reference = max(reference_rates)
+    print(f"reference workload {reference:.1f}/s")
+    print_report(results, stages)
+    relative = relative_metrics(results, reference)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'config': config, 'reference_per_s': reference, 'metrics': results, 'relative': relative},
+                      f, indent=2)
+
+    if args.update_baseline:
+        baseline = {'config': config, 'metrics': relative}
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"\nbaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("\nno baseline; run with --update-baseline to create one")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    recorded = dict(baseline.get('config', {}))
+    skip = lambda name: False  # noqa: E731
+    if recorded.get('ocr') != config['ocr']:
+        print(f"\nnote: baseline ocr={recorded.get('ocr')}, this run ocr={config['ocr']}; "
+              "skipping pdf and throughput metrics")
+        skip = ocr_dependent
+    recorded['ocr'] = config['ocr']
+    if recorded != config:
+        print(f"\nFAIL: baseline was recorded with {baseline.get('config')}, this run is {config}")
+        return 1
+
+    regressions = compare(relative, baseline, args.threshold, skip)
+    if args.gate_throughput:
+        failures, warnings = regressions, []
+    else:
+        failures = [failure for failure in regressions if is_deterministic(failure.split(':', 1)[0])]
+        warnings = [failure for failure in regressions if failure not in failures]
+    if warnings:
+        print(f"\nwarning: throughput below baseline by more than {args.threshold:.0%} "
+              "(relative to reference; not gated, use --gate-throughput):")
+        for warning in warnings:
+            print(f"  {warning}")
+    if failures:
+        print(f"\nFAIL: {len(failures)} regression(s) beyond tolerance:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+    print("\nOK: no gated regressions")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
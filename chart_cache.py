@@ -0,0 +1,85 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from sqlite_lru import SqliteLru
+
+CHART_CACHE_PATH = os.environ.get("EXPENSELESS_CHART_CACHE_PATH", os.path.join("cache", "charts.db"))
+MAX_CHART_CACHE_BYTES = int(os.environ.get("EXPENSELESS_CHART_CACHE_MAX_BYTES", 32 * 1024 * 1024))
+MAX_MEMORY_CHARTS = int(os.environ.get("EXPENSELESS_CHART_MEMORY_ENTRIES", 64))
+
+# Grafik çizim kodu değiştiğinde eski PNG'lerin kullanılmaması için anahtara eklenir.
+CHART_VERSION = 2
+
+
+def chart_key(kind, *inputs):
+    """Grafik türü ve girdilerinden (Series/DataFrame veya düz değerler) kararlı bir SHA-256 anahtar üret."""
+    digest = hashlib.sha256(f"{kind}:{CHART_VERSION}".encode('utf-8'))
+    for value in inputs:
+        if isinstance(value, (pd.Series, pd.DataFrame)):
+            # Değerler ve index birlikte özetlenir; sütun adları ayrıca eklenir.
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+            names = value.columns if isinstance(value, pd.DataFrame) else [value.name]
+            digest.update(repr(list(names)).encode('utf-8'))
+        else:
+            digest.update(repr(value).encode('utf-8'))
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class ChartCache(SqliteLru):
+    """Çizilmiş grafik PNG'leri için bellek + SQLite iki katmanlı önbellek.
+
+    Bellek katmanı en son kullanılan max_entries grafiği tutar; disk katmanı toplam
+    boyut max_bytes'ı aşınca en uzun süredir kullanılmayan kayıtları siler (LRU).
+    """
+
+    def __init__(self, path=CHART_CACHE_PATH, max_bytes=MAX_CHART_CACHE_BYTES, max_entries=MAX_MEMORY_CHARTS):
+        super().__init__(path, 'charts', ('digest',), {'png': 'BLOB NOT NULL'}, max_bytes)
+        self.max_entries = max_entries
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    def get(self, digest):
+        """PNG baytlarını döndür; önce bellek, sonra disk katmanına bakılır."""
+        with self._memory_lock:
+            png = self._memory.get(digest)
+            if png is not None:
+                self._memory.move_to_end(digest)
+        if png is not None:
+            self.touch((digest,))
+            return png
+
+        row = self.lookup((digest,))
+        if row is None:
+            return None
+        png = bytes(row[0])
+        self._remember(digest, png)
+        return png
+
+    def put(self, digest, png):
+        self._remember(digest, png)
+        self.store((digest,), (png,), len(png))
+
+    def _remember(self, digest, png):
+        with self._memory_lock:
+            self._memory[digest] = png
+            self._memory.move_to_end(digest)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_chart_cache():
+    """Uygulama genelinde paylaşılan grafik önbelleğini döndür (ilk kullanımda oluşturulur)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ChartCache()
+        return _default_cache
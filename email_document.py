@@ -0,0 +1,101 @@
+import base64
+from importlib.util import find_spec
+
+from bs4 import BeautifulSoup
+
+from extraction_engine import WHITESPACE
+from metrics import instrumented, timed
+
+SOUP_PARSER = 'lxml' if find_spec('lxml') is not None else 'html.parser'
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+@instrumented('html_parse')
+def html_to_text(html):
+    """HTML'i tek boşluklu düz metne çevir; selectolax kuruluysa onu kullan."""
+    if LexborHTMLParser is not None:
+        tree = LexborHTMLParser(html)
+        root = tree.body or tree.root
+        text = root.text(separator=' ', strip=True) if root is not None else ''
+    else:
+        text = BeautifulSoup(html, SOUP_PARSER).get_text(separator=' ', strip=True)
+    return WHITESPACE.sub(' ', text).strip()
+
+
+class EmailDocument:
+    """Bir mesaj için bir kez üretilen, çıkarım aşamalarının paylaştığı belge.
+
+    text normalize edilmiş düz metindir; soup yalnızca sınıf tabanlı aramalar
+    (ör. Trendyol order.*number yedeği) gerektiğinde HTML gövdeden ayrıştırılır.
+    """
+
+    def __init__(self, payload, text=None):
+        self.payload = payload or {}
+        self._text = text
+        self._parts = None
+        self._soup = None
+
+    @classmethod
+    def from_html(cls, html):
+        """Gmail payload'u olmadan, doğrudan bir HTML (veya düz metin) dizgesinden belge oluştur."""
+        document = cls(None)
+        document._parts = [('text/html', html)] if html else []
+        return document
+
+    def _collect_parts(self):
+        if self._parts is not None:
+            return self._parts
+
+        parts = []
+
+        def extract_text(part):
+            if 'parts' in part:
+                for subpart in part['parts']:
+                    extract_text(subpart)
+            else:
+                mime_type = part.get('mimeType')
+                data = part.get('body', {}).get('data')
+                if mime_type in ['text/plain', 'text/html'] and data:
+                    try:
+                        decoded = base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
+                        parts.append((mime_type, decoded))
+                    except Exception:
+                        pass
+
+        extract_text(self.payload)
+        self._parts = parts
+        return parts
+
+    @property
+    def html(self):
+        return next((text for mime, text in self._collect_parts() if mime == 'text/html'), None)
+
+    @property
+    def text(self):
+        if self._text is None:
+            parts = self._collect_parts()
+            plain_texts = [text for mime, text in parts if mime == 'text/plain']
+            html = self.html
+
+            if plain_texts:
+                self._text = WHITESPACE.sub(' ', ' '.join(plain_texts)).strip()
+            elif html:
+                self._text = html_to_text(html)
+            else:
+                self._text = ""
+        return self._text
+
+    @property
+    def soup(self):
+        """HTML gövdenin ayrıştırılmış ağacı; HTML yoksa düz metinden oluşturulur."""
+        if self._soup is None:
+            with timed('html_parse'):
+                self._soup = BeautifulSoup(self.html or self.text, SOUP_PARSER)
+        return self._soup
+
+    def __str__(self):
+        return self.text
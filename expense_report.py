@@ -0,0 +1,138 @@
+import calendar
+import os
+
+import pandas as pd
+
+from order_store import month_bounds
+
+# Aralık görünümünde listelenen en yeni sipariş sayısı; KPI'lar ve grafikler tüm aralığı kapsar.
+RANGE_ORDER_LIMIT = int(os.environ.get("EXPENSELESS_RANGE_ORDER_LIMIT", 200))
+
+
+def month_span(start_year, start_month, end_year, end_month):
+    """[başlangıç, bitiş] aralığındaki ayları (yıl, ay) listesi olarak döndür."""
+    periods = pd.period_range(f"{start_year}-{start_month:02d}", f"{end_year}-{end_month:02d}", freq='M')
+    return [(period.year, period.month) for period in periods]
+
+
+def trailing_months(end_year, end_month, count):
+    """end ayı dahil geriye doğru count ayın ilk ve son (yıl, ay) değerlerini döndür."""
+    start = pd.Period(f"{end_year}-{end_month:02d}", freq='M') - (count - 1)
+    return (start.year, start.month), (end_year, end_month)
+
+
+def build_month_report(store, user, year, month):
+    """Tek ay için tekil siparişleri, günlük seriyi, gönderici dağılımını ve KPI'ları ay toplam tablolarından oku."""
+    month_start, month_end = month_bounds(year, month)
+    month_summary = store.month_rollup(user, year, month)
+    daily_totals = store.daily_rollup(user, year, month)
+    days_in_month = calendar.monthrange(year, month)[1]
+    return {
+        'orders': store.unique_orders(user, month_start, month_end),
+        'daily': pd.Series(
+            [total for _, total in daily_totals],
+            index=[day for day, _ in daily_totals],
+            dtype=float
+        ),
+        'senders': pd.DataFrame(store.sender_rollup(user, year, month), columns=['sender', 'total_amount']),
+        'total': month_summary['total'],
+        'count': month_summary['count'],
+        'daily_average': month_summary['total'] / days_in_month if days_in_month > 0 else 0,
+    }
+
+
+def build_range_report(store, user, start, end, order_limit=RANGE_ORDER_LIMIT):
+    """(yıl, ay) start..end aralığı için aylık trend, gönderici ve kaynak dağılımlarını hesapla.
+
+    Tüm toplamlar ay toplam tablolarından okunur (maliyet ay sayısıyla orantılı); defter
+    siparişleri en yeni kayıtlarının ayında saydığından aylar toplanınca çift sayım olmaz.
+    Sipariş listesi en yeni order_limit kayıtla sınırlıdır.
+    """
+    (start_year, start_month), (end_year, end_month) = start, end
+    periods = pd.period_range(f"{start_year}-{start_month:02d}", f"{end_year}-{end_month:02d}", freq='M')
+
+    monthly = pd.DataFrame(
+        store.monthly_rollups(user, start_year, start_month, end_year, end_month),
+        columns=['year', 'month', 'total', 'count']
+    )
+    monthly.index = pd.PeriodIndex.from_fields(year=monthly['year'], month=monthly['month'], freq='M')
+    monthly = monthly[['total', 'count']].reindex(periods, fill_value=0)
+
+    senders = pd.DataFrame(
+        store.sender_rollups(user, start_year, start_month, end_year, end_month),
+        columns=['sender', 'total_amount']
+    )
+
+    source_months = pd.DataFrame(
+        store.source_rollups(user, start_year, start_month, end_year, end_month),
+        columns=['year', 'month', 'source', 'total']
+    )
+    if source_months.empty:
+        sources = pd.Series(dtype=float)
+        source_trend = pd.DataFrame(index=periods)
+    else:
+        source_months['period'] = pd.PeriodIndex.from_fields(
+            year=source_months['year'], month=source_months['month'], freq='M'
+        )
+        sources = source_months.groupby('source')['total'].sum().sort_values(ascending=False)
+        source_trend = source_months.pivot_table(
+            index='period', columns='source', values='total', aggfunc='sum', fill_value=0
+        ).reindex(periods, fill_value=0)
+
+    range_start = month_bounds(start_year, start_month)[0]
+    range_end = month_bounds(end_year, end_month)[1]
+    total = float(monthly['total'].sum())
+    days = (periods[-1].end_time.normalize() - periods[0].start_time).days + 1
+    return {
+        'orders': store.unique_orders(user, range_start, range_end, limit=order_limit),
+        'monthly': monthly,
+        'senders': senders,
+        'sources': sources,
+        'source_trend': source_trend,
+        'total': total,
+        'count': int(monthly['count'].sum()),
+        'monthly_average': total / len(periods),
+        'daily_average': total / days if days > 0 else 0,
+    }
+
+
+def _number(value):
+    """JSON için None ve NaN değerlerini 0.0'a çevir."""
+    return 0.0 if value is None or pd.isna(value) else float(value)
+
+
+def summary_payload(report, period_name):
+    """build_month_report / build_range_report çıktısını JSON'a çevrilebilir sözlüğe dönüştür."""
+    payload = {
+        'period': period_name,
+        'kpis': {
+            'total': float(report['total']),
+            'count': int(report['count']),
+            'daily_average': float(report['daily_average']),
+        },
+        'senders': [
+            {'sender': sender, 'total_amount': _number(total)}
+            for sender, total in zip(report['senders']['sender'], report['senders']['total_amount'])
+        ],
+        'orders': [
+            {key: order[key] for key in ('order_id', 'sender', 'date', 'total_amount', 'source')}
+            for order in report['orders']
+        ],
+    }
+
+    if 'daily' in report:
+        payload['daily'] = [{'day': int(day), 'total': _number(total)} for day, total in report['daily'].items()]
+
+    if 'monthly' in report:
+        labels = [period.strftime('%Y-%m') for period in report['monthly'].index]
+        payload['kpis']['monthly_average'] = float(report['monthly_average'])
+        payload['monthly'] = [
+            {'month': label, 'total': float(total), 'count': int(count)}
+            for label, total, count in zip(labels, report['monthly']['total'], report['monthly']['count'])
+        ]
+        payload['sources'] = {source: float(total) for source, total in report['sources'].items()}
+        payload['source_trend'] = {
+            source: [float(value) for value in report['source_trend'][source]]
+            for source in report['source_trend'].columns
+        }
+    return payload
@@ -0,0 +1,164 @@
+import re
+
+
+class PatternSet:
+    """Öncelik sırası korunan, import sırasında derlenmiş regex kümesi.
+
+    Tüm desenler tek bir lookahead alternasyonunda birleştirilir; metin bir kez
+    taranır ve en yüksek öncelikli desenin en soldaki eşleşmesi döndürülür.
+    Bu, desenleri sırayla re.search ile denemekle aynı sonucu verir.
+    """
+
+    def __init__(self, patterns, flags=0):
+        self.patterns = [re.compile(pattern, flags) for pattern in patterns]
+
+        # Birleşik desende her desen bir sarmalayıcı grupla işaretlenir; iç grupların
+        # numaraları bu sarmalayıcının numarasından itibaren kayar.
+        self._wrapper_groups = {}
+        group_index = 1
+        wrapped = []
+        for index, compiled in enumerate(self.patterns):
+            self._wrapper_groups[group_index] = (index, compiled.groups)
+            wrapped.append(f"({compiled.pattern})")
+            group_index += compiled.groups + 1
+
+        self._scanner = re.compile(f"(?=(?:{'|'.join(wrapped)}))", flags)
+
+    def search(self, text):
+        """En yüksek öncelikli eşleşmeyi (desen sırası, grup değerleri) olarak döndür."""
+        best = None
+        for match in self._scanner.finditer(text):
+            # Sarmalayıcı grup iç gruplardan sonra kapandığı için lastindex onu gösterir.
+            wrapper = match.lastindex
+            index, group_count = self._wrapper_groups[wrapper]
+            if best is None or index < best[0]:
+                best = (index, match.groups()[wrapper:wrapper + group_count])
+                if index == 0:
+                    break
+        return best
+
+    def iter_searches(self, text, start=0):
+        """start sırasından itibaren her desenin ilk eşleşmesini sırayla üret (re.search döngüsü)."""
+        for index in range(start, len(self.patterns)):
+            match = self.patterns[index].search(text)
+            if match:
+                yield index, match.groups()
+
+    def iter_finditer(self, text, start=0):
+        """start sırasından itibaren her desenin tüm eşleşmelerini sırayla üret (re.finditer döngüsü)."""
+        for index in range(start, len(self.patterns)):
+            for match in self.patterns[index].finditer(text):
+                yield index, match.groups()
+
+    def first_valid(self, text, convert, all_matches=False):
+        """Dönüştürülebilen ilk eşleşmeyi döndür; tek geçişli tarama başarısızsa desen döngüsüne düşer."""
+        best = self.search(text)
+        if best is None:
+            return None
+
+        index, groups = best
+        try:
+            return convert(groups)
+        except ValueError:
+            pass
+
+        if all_matches:
+            candidates = self.iter_finditer(text, start=index)
+            # İlk eşleşme zaten denendi.
+            next(candidates, None)
+        else:
+            candidates = self.iter_searches(text, start=index + 1)
+
+        for _, groups in candidates:
+            try:
+                return convert(groups)
+            except ValueError:
+                continue
+        return None
+
+
+def last_group(groups):
+    """re.Match.lastindex davranışı: katılan son grubun değeri."""
+    for value in reversed(groups):
+        if value is not None:
+            return value
+    return None
+
+
+ORDER_ID_PATTERNS = PatternSet([
+    r'(Sipariş Numarası[:#]?|Sipariş No[:#]?|Order ID[:#]?|Order Number[:#]?)[^\d]*(\d+)',
+    r'(SİPARİŞ NO[:#\.]?|Order ID[:#\.]?)[^\d]*(\d+)',
+    r'#(\d+)',
+    r'(\d+)\s+numaralı\s+siparişini\s+aldık',
+    r"Sipariş No\.?\s*(\d+-\d+-\d+)",
+    r"#(\d{3}-\d{7}-\d{7})",
+    r'(?:Sipariş|Order|Invoice|Fatura)[^0-9]*?(\d+)',
+], re.IGNORECASE)
+
+AMOUNT_PATTERNS = PatternSet([
+    r'(?:Ara toplam|Toplam|Tutar|Amount|Total)[^0-9₺TL$USD€EUR]*?([\d.,]+)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
+    r'([\d.,]+)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
+    r'[₺$€]\s*([\d.,]+)',
+    r"KDV Dahil Sipariş Toplamı:\s*([\d.,]+)\s*TL",
+    r'(?:Toplam Tutar|Ara Toplam|Total Amount)[^0-9]*?([\d.,]+)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
+], re.IGNORECASE)
+
+TRENDYOL_ORDER_ID_PATTERNS = PatternSet([
+    r"(?:Sipariş Numaranız:|Sipariş Numarası:|Sipariş No:|Order ID:) *(\d+)",
+    r"#(\d+)\s+numaralı\s+siparişi",
+], re.IGNORECASE)
+
+TRENDYOL_AMOUNT_PATTERNS = PatternSet([
+    r"(?:Sepet Tutarı|Toplam Tutar|Toplam|Ödenecek Tutar)[^\d]*?([\d.,]+)\s*(?:TL|TRY|₺|\$|USD)",
+    r'([\d.,]+)\s*(?:TL|TRY|₺|\$|USD)',
+    r'[₺$]\s*([\d.,]+)'
+], re.IGNORECASE)
+
+TRENDYOL_ORDER_CLASS = re.compile(r'order.*number|siparis.*no', re.I)
+TRENDYOL_AMOUNT_CLASS = re.compile(r'total.*amount|toplam.*tutar', re.I)
+
+BERSHKA_ORDER_ID_PATTERNS = PatternSet([
+    r'Sipariş (?:Numarası|No)\s*[:#]?\s*(\d+)',
+    r'Order (?:Number|No\.?)\s*[:#]?\s*(\d+)',
+], re.IGNORECASE)
+
+BERSHKA_AMOUNT_PATTERNS = PatternSet([
+    r'(?<!Ara )\bToplam\s*:?\s*([\d.,]+)\s*(?:TL|TRY|₺|€|EUR)',
+    r'(?<!Sub)\bTotal\s*:?\s*([\d.,]+)\s*(?:TL|TRY|₺|€|EUR)',
+], re.IGNORECASE)
+
+AMAZON_ORDER_ID = re.compile(r'\b(\d{3}-\d{7}-\d{7})\b')
+
+AMAZON_AMOUNT_PATTERNS = PatternSet([
+    r'(?:Sipariş Toplamı|Order Total|Genel Toplam|Grand Total)\s*:?\s*(?:₺|TL|\$|€|EUR|USD)?\s*([\d.,]*\d)',
+    r'(?:Sipariş Toplamı|Order Total|Genel Toplam|Grand Total)\s*:?\s*([\d.,]*\d)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
+], re.IGNORECASE)
+
+PDF_ORDER_PATTERNS = PatternSet([
+    r'Sipariş No:\s*(\d+)',
+    r'Sipariş No\s*:\s*(\d+)',
+    r'Sipariş No\s*(\d+)',
+])
+
+PDF_AMOUNT_PATTERNS = PatternSet([
+    r'Ödenecek Tutar\s*:?\s*([\d,.]+)\s*TL',
+    r'Ödenecek Tutar\s*:?\s*([\d,.]+)',
+    r'GENEL TOPLAM\s*:?\s*([\d,.]+)\s*TL',
+    r'Toplam\s*:?\s*([\d,.]+)\s*TL',
+    r'(?:^|\n)\s*Toplam\s*(?::|)\s*([\d,.]+)',
+    r'Ödenecek Tutar\s*:?\s*([\d.,]+)\s*TL',
+    r'Mal Hizmet Toplam Tutarı\s*:?\s*([\d.,]+)\s*TL',
+    r'Toplam İskonto\s*:?\s*([\d.,]+)\s*TL',
+    r'Hesaplanan KDV Matrahı\s*:?\s*([\d.,]+)\s*TL',
+    r'(?:Toplam|Ara Toplam)\s*:?\s*([\d.,]+)\s*TL'
+])
+
+# Ödenecek tutarı doğrudan veren desenler; bulunduklarında kalan sayfalar taranmaz.
+PDF_PAYABLE_PATTERNS = PatternSet([
+    r'Ödenecek Tutar\s*:?\s*([\d,.]+)',
+    r'GENEL TOPLAM\s*:?\s*([\d,.]+)',
+])
+
+PDF_LINE_AMOUNT_TL = re.compile(r'([\d,.]+)TL')
+PDF_LINE_AMOUNT = re.compile(r'([\d,.]+)')
+WHITESPACE = re.compile(r'\s+')
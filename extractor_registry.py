@@ -0,0 +1,116 @@
+import re
+from email.utils import parseaddr
+
+
+def sender_domain(sender):
+    """From başlığından küçük harfli alan adını döndür ('Trendyol <info@trendyolmail.com>' -> 'trendyolmail.com')."""
+    address = parseaddr(sender or '')[1]
+    return address.rpartition('@')[2].lower() if '@' in address else ''
+
+
+def message_headers(msg_data):
+    """Mesajın (From, Subject) başlıkları; metadata veya full biçimindeki mesajlarla çalışır."""
+    sender = subject = ''
+    for header in msg_data.get('payload', {}).get('headers', []):
+        name = header['name'].lower()
+        if name == 'from':
+            sender = header['value']
+        elif name == 'subject':
+            subject = header['value']
+    return sender, subject
+
+
+class SenderExtractor:
+    """Bir göndericiye özel çıkarım fonksiyonu ve onu seçen alan adları / konu imzası.
+
+    missing_order_id ve missing_amount, fonksiyonun sipariş numarası veya tutar
+    bulamadığında döndürdüğü yer tutuculardır; order_found() ve amount_found()
+    gövdede bulunup bulunmadıklarını buna göre söyler.
+    """
+
+    def __init__(self, name, extract, domains=(), subject=None, missing_order_id=None, missing_amount=None):
+        self.name = name
+        self.extract = extract
+        self.domains = tuple(domain.lower() for domain in domains)
+        self.subject = re.compile(subject) if isinstance(subject, str) else subject
+        self.missing_order_id = missing_order_id
+        self.missing_amount = missing_amount
+
+    def order_found(self, details):
+        order_id = details.get('order_id') if details else None
+        return bool(order_id) and order_id != self.missing_order_id
+
+    def amount_found(self, details):
+        total_amount = details.get('total_amount') if details else None
+        return bool(total_amount) and total_amount != self.missing_amount
+
+    def __repr__(self):
+        return f"SenderExtractor({self.name!r})"
+
+
+class ExtractorRegistry:
+    """Mesajları From alan adına (veya konu imzasına) göre özel çıkarıcılara yönlendiren kayıt.
+
+    Alan adı en uzun sonekten başlayarak aranır (mail.trendyolmail.com ->
+    trendyolmail.com); eşleşme yoksa konu imzaları kayıt sırasıyla denenir,
+    o da yoksa genel çıkarıcıya düşülür.
+    """
+
+    def __init__(self):
+        self._by_domain = {}
+        self._by_subject = []
+        self.fallback = None
+
+    def register(self, extractor):
+        for domain in extractor.domains:
+            self._by_domain[domain] = extractor
+        if extractor.subject is not None:
+            self._by_subject.append(extractor)
+        return extractor
+
+    def for_sender(self, sender, subject=''):
+        labels = sender_domain(sender).split('.')
+        for index in range(len(labels) - 1):
+            extractor = self._by_domain.get('.'.join(labels[index:]))
+            if extractor is not None:
+                return extractor
+        for extractor in self._by_subject:
+            if extractor.subject.search(subject or ''):
+                return extractor
+        return self.fallback
+
+    def for_message(self, msg_data):
+        return self.for_sender(*message_headers(msg_data))
+
+    def __iter__(self):
+        seen = []
+        for extractor in list(self._by_domain.values()) + self._by_subject:
+            if extractor not in seen:
+                seen.append(extractor)
+        return iter(seen)
+
+
+registry = ExtractorRegistry()
+
+
+def register_extractor(name, domains=(), subject=None, missing_order_id=None, missing_amount=None):
+    """Fonksiyonu verilen alan adları / konu imzası için çıkarıcı olarak kaydeden dekoratör."""
+    def decorator(extract):
+        registry.register(SenderExtractor(name, extract, domains, subject, missing_order_id, missing_amount))
+        return extract
+    return decorator
+
+
+def register_fallback(name, missing_order_id=None, missing_amount=None):
+    """Bilinmeyen göndericiler için kullanılacak genel çıkarıcıyı kaydeden dekoratör."""
+    def decorator(extract):
+        registry.fallback = SenderExtractor(
+            name, extract, missing_order_id=missing_order_id, missing_amount=missing_amount
+        )
+        return extract
+    return decorator
+
+
+def find_extractor(msg_data):
+    """Mesajın göndericisine kayıtlı çıkarıcıyı döndür."""
+    return registry.for_message(msg_data)
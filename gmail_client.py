@@ -0,0 +1,120 @@
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+import requests
+from google.auth.transport.requests import AuthorizedSession
+from googleapiclient.errors import HttpError
+from requests.adapters import HTTPAdapter
+
+from gmail_scheduler import get_gmail_scheduler, quota_key
+
+GMAIL_API_ROOT = os.environ.get("EXPENSELESS_GMAIL_API_ROOT", "https://gmail.googleapis.com")
+GMAIL_CONCURRENCY = int(os.environ.get("EXPENSELESS_GMAIL_CONCURRENCY", 64))
+GMAIL_REQUEST_TIMEOUT = float(os.environ.get("EXPENSELESS_GMAIL_REQUEST_TIMEOUT", 30))
+
+
+class AsyncGmailClient:
+    """Gmail REST API için asyncio arayüzlü, bağlantı havuzlu istemci.
+
+    İstekler keep-alive bağlantıları yeniden kullanan tek bir requests oturumu
+    (kimlik bilgisi verilirse AuthorizedSession) üzerinden gider; aynı anda uçuşta
+    olan istek sayısı concurrency ile sınırlıdır. Hatalar googleapiclient ile aynı
+    HttpError olarak yükseltildiğinden mevcut hata yakalama kodu değişmeden çalışır.
+
+    Senkron kod (Flask, MailboxSync) coroutine'leri run() ile istemcinin kendi
+    olay döngüsünde çalıştırır; istemci thread'ler arasında paylaşılabilir.
+    """
+
+    def __init__(self, credentials=None, base_url=GMAIL_API_ROOT, concurrency=GMAIL_CONCURRENCY,
+                 timeout=GMAIL_REQUEST_TIMEOUT, session=None, scheduler=None):
+        if session is None:
+            session = AuthorizedSession(credentials) if credentials is not None else requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+
+        self.session = session
+        self.credentials = credentials
+        # Tüm istekler kullanıcının kota kovasından geçer; 429/5xx yanıtları yeniden denenir.
+        self.scheduler = scheduler if scheduler is not None else get_gmail_scheduler()
+        self.quota_key = quota_key(self)
+        self.base_url = f"{base_url.rstrip('/')}/gmail/v1/users/me"
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # Havuz boyutu uçuştaki istek sayısının üst sınırıdır.
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='gmail-http')
+        self._loop = None
+        self._loop_lock = threading.Lock()
+
+    async def _get(self, kind, path, params=None):
+        return await self.scheduler.execute_async(self.quota_key, kind, lambda: self._send(path, params))
+
+    async def _send(self, path, params):
+        loop = asyncio.get_running_loop()
+        response = await loop.run_in_executor(
+            self._executor,
+            functools.partial(self.session.get, self.base_url + path, params=params, timeout=self.timeout)
+        )
+        if response.status_code >= 400:
+            resp = httplib2.Response({'status': response.status_code, 'reason': response.reason})
+            raise HttpError(resp, response.content, uri=response.url)
+        return response.json()
+
+    async def list_messages(self, query=None, page_token=None, max_results=None):
+        params = {'q': query, 'pageToken': page_token, 'maxResults': max_results}
+        return await self._get('list', '/messages', {key: value for key, value in params.items() if value is not None})
+
+    async def get_message(self, message_id, message_format='full', metadata_headers=None):
+        params = {'format': message_format}
+        if message_format == 'metadata' and metadata_headers:
+            params['metadataHeaders'] = list(metadata_headers)
+        return await self._get('get', f'/messages/{message_id}', params)
+
+    async def get_messages(self, message_ids, message_format='full', metadata_headers=None):
+        """Mesajları eşzamanlı çek, {id: mesaj} döndür; hata veren mesajlar atlanır (batch davranışı)."""
+        responses = await asyncio.gather(
+            *(self.get_message(msg_id, message_format, metadata_headers) for msg_id in message_ids),
+            return_exceptions=True
+        )
+        messages = {}
+        for msg_id, response in zip(message_ids, responses):
+            if isinstance(response, Exception):
+                print(f"Gmail API error when fetching message {msg_id}: {response}")
+                continue
+            messages[msg_id] = response
+        return messages
+
+    async def get_attachment(self, message_id, attachment_id):
+        return await self._get('attachment', f'/messages/{message_id}/attachments/{attachment_id}')
+
+    async def list_history(self, start_history_id, history_types=('messageAdded',), page_token=None):
+        params = {'startHistoryId': start_history_id, 'historyTypes': list(history_types)}
+        if page_token:
+            params['pageToken'] = page_token
+        return await self._get('history', '/history', params)
+
+    async def get_profile(self):
+        return await self._get('profile', '/profile')
+
+    def run(self, coroutine):
+        """Coroutine'i istemcinin arka plan olay döngüsünde çalıştırıp sonucunu bekle."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._event_loop()).result()
+
+    def _event_loop(self):
+        with self._loop_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='gmail-client-loop', daemon=True).start()
+            return self._loop
+
+    def close(self):
+        with self._loop_lock:
+            if self._loop is not None:
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._loop = None
+        self._executor.shutdown(wait=False)
+        self.session.close()
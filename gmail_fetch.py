@@ -0,0 +1,179 @@
+import os
+import time
+
+from google_auth_httplib2 import AuthorizedHttp
+from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+
+from gmail_client import AsyncGmailClient
+from gmail_scheduler import QUOTA_UNITS, get_gmail_scheduler, is_retryable, quota_key
+
+# Gmail batch istekleri en fazla 100 alt istek kabul eder; 50 önerilen üst sınır.
+BATCH_SIZE = 50
+
+# Listeleme aşamasında yalnızca bu başlıklar gerekir (format=metadata).
+METADATA_HEADERS = ['Subject', 'From', 'Date']
+
+# "discovery": googleapiclient servisi; "async": bağlantı havuzlu AsyncGmailClient.
+GMAIL_CLIENT = os.environ.get("EXPENSELESS_GMAIL_CLIENT", "discovery")
+
+
+def build_gmail_service(credentials):
+    """Yapılandırmaya göre Gmail servisini veya AsyncGmailClient'ı oluştur.
+
+    Bu modüldeki yardımcılar ikisini de kabul eder; çağıranların farkı bilmesi gerekmez.
+    """
+    if GMAIL_CLIENT == 'async':
+        return AsyncGmailClient(credentials)
+    return build('gmail', 'v1', credentials=credentials)
+
+
+def close_gmail_service(service):
+    """AsyncGmailClient'ın bağlantı havuzunu ve olay döngüsünü kapat; discovery servisinde bir şey yapmaz."""
+    if isinstance(service, AsyncGmailClient):
+        service.close()
+
+
+def execute_request(service, kind, request, http=None, units=None):
+    """googleapiclient isteğini kullanıcının kota kovası ve yeniden deneme politikasıyla çalıştır."""
+    return get_gmail_scheduler().execute(
+        quota_key(service), kind, lambda: request.execute(http=http), units=units
+    )
+
+
+def list_messages(service, query, page_token=None, max_results=None, http=None):
+    """messages.list sayfasını döndür; http yalnızca googleapiclient servisinde kullanılır."""
+    if isinstance(service, AsyncGmailClient):
+        return service.run(service.list_messages(query, page_token, max_results))
+    request = service.users().messages().list(
+        userId='me', q=query, maxResults=max_results, pageToken=page_token
+    )
+    return execute_request(service, 'list', request, http=http)
+
+
+def list_history(service, start_history_id, page_token=None):
+    """history.list sayfasını (yalnızca messageAdded kayıtları) döndür."""
+    if isinstance(service, AsyncGmailClient):
+        return service.run(service.list_history(start_history_id, page_token=page_token))
+    request = service.users().history().list(
+        userId='me',
+        startHistoryId=start_history_id,
+        historyTypes=['messageAdded'],
+        pageToken=page_token
+    )
+    return execute_request(service, 'history', request)
+
+
+def get_profile(service):
+    if isinstance(service, AsyncGmailClient):
+        return service.run(service.get_profile())
+    return execute_request(service, 'profile', service.users().getProfile(userId='me'))
+
+
+def fetch_messages(service, message_ids, message_format='full', batch_size=BATCH_SIZE, cache=None,
+                   metadata_headers=None):
+    """Mesajları Gmail batch istekleriyle tek geçişte çek, {id: mesaj} olarak döndür."""
+    requested_ids = list(dict.fromkeys(message_ids))
+    message_ids = requested_ids
+    messages = {}
+
+    if cache is not None:
+        for msg_id in message_ids:
+            cached = cache.get_message(msg_id, message_format)
+            if cached is not None:
+                messages[msg_id] = cached
+        message_ids = [msg_id for msg_id in message_ids if msg_id not in messages]
+
+    retryable = {}
+
+    def callback(request_id, response, exception):
+        if exception is not None:
+            # 429 / rateLimitExceeded alt istekleri atlanmaz, sonraki turda yeniden istenir.
+            if isinstance(exception, HttpError) and is_retryable(exception):
+                retryable[request_id] = exception
+                return
+            print(f"Gmail API error when fetching message {request_id}: {exception}")
+            return
+        messages[request_id] = response
+        if cache is not None:
+            cache.put_message(request_id, response, message_format)
+
+    if isinstance(service, AsyncGmailClient):
+        # Tüm mesajlar istemcinin eşzamanlılık sınırı içinde aynı anda istenir.
+        fetched = service.run(service.get_messages(message_ids, message_format, metadata_headers or METADATA_HEADERS))
+        for msg_id, response in fetched.items():
+            callback(msg_id, response, None)
+        message_ids = []
+
+    scheduler = get_gmail_scheduler()
+    attempt = 0
+    while message_ids:
+        for start in range(0, len(message_ids), batch_size):
+            chunk = message_ids[start:start + batch_size]
+            batch = service.new_batch_http_request(callback=callback)
+            for msg_id in chunk:
+                if message_format == 'metadata':
+                    request = service.users().messages().get(
+                        userId='me', id=msg_id, format='metadata',
+                        metadataHeaders=metadata_headers or METADATA_HEADERS
+                    )
+                else:
+                    request = service.users().messages().get(userId='me', id=msg_id, format=message_format)
+                batch.add(request, request_id=msg_id)
+            try:
+                # Batch'in kota maliyeti alt istek sayısı kadardır.
+                execute_request(service, 'get', batch, units=QUOTA_UNITS['get'] * len(chunk))
+            except HttpError as e:
+                print(f"Gmail API batch error: {e}")
+                continue
+
+        if not retryable:
+            break
+        delay = scheduler.retry_delay(list(retryable.values()), attempt)
+        if delay is None:
+            for msg_id, exception in retryable.items():
+                print(f"Gmail API error when fetching message {msg_id}, giving up: {exception}")
+            break
+        message_ids = list(retryable)
+        retryable.clear()
+        time.sleep(delay)
+        attempt += 1
+
+    # Sonuçlar istek sırasıyla döner; önbellekten gelenler öne geçmez.
+    return {msg_id: messages[msg_id] for msg_id in requested_ids if msg_id in messages}
+
+
+def fetch_attachment(service, message_id, attachment_id, cache=None):
+    """Ekin base64 verisini döndür; önbellekte varsa API çağrısı yapılmaz."""
+    if cache is not None:
+        cached = cache.get_attachment(message_id, attachment_id)
+        if cached is not None:
+            return cached
+
+    if isinstance(service, AsyncGmailClient):
+        attachment = service.run(service.get_attachment(message_id, attachment_id))
+    else:
+        attachment = execute_request(service, 'attachment', service.users().messages().attachments().get(
+            userId='me', messageId=message_id, id=attachment_id
+        ))
+    data = attachment.get('data', '')
+
+    if cache is not None and data:
+        cache.put_attachment(message_id, attachment_id, data)
+    return data
+
+
+def build_thread_http(service):
+    """Servisin kimlik bilgileriyle ayrı bir HTTP nesnesi oluştur; httplib2 thread'ler arasında paylaşılamaz."""
+    if isinstance(service, AsyncGmailClient):
+        return None
+    return AuthorizedHttp(service._http.credentials, http=build_http())
+
+
+def build_thread_service(service):
+    """Başka bir thread'de kullanılmak üzere, kendi HTTP nesnesine sahip bir Gmail servisi oluştur."""
+    if isinstance(service, AsyncGmailClient):
+        # İstemci thread'ler arasında paylaşılabilir.
+        return service
+    return build('gmail', 'v1', http=build_thread_http(service), cache_discovery=False)
@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import os
+import random
+import threading
+import time
+
+from googleapiclient.errors import HttpError
+
+from metrics import timed
+
+# Gmail API kota birimleri (çağrı türü başına); batch içindeki her alt istek ayrı sayılır.
+QUOTA_UNITS = {
+    'list': 5,
+    'get': 5,
+    'attachment': 5,
+    'history': 2,
+    'profile': 1,
+}
+
+# Gmail kullanıcı başına dakikada 15.000 kota birimine (saniyede 250) izin verir.
+USER_QUOTA_PER_SECOND = float(os.environ.get("EXPENSELESS_GMAIL_QUOTA_PER_SECOND", 250))
+USER_QUOTA_BURST = float(os.environ.get("EXPENSELESS_GMAIL_QUOTA_BURST", USER_QUOTA_PER_SECOND))
+MAX_RETRIES = int(os.environ.get("EXPENSELESS_GMAIL_MAX_RETRIES", 6))
+BACKOFF_BASE = float(os.environ.get("EXPENSELESS_GMAIL_BACKOFF_BASE", 0.5))
+BACKOFF_MAX = float(os.environ.get("EXPENSELESS_GMAIL_BACKOFF_MAX", 32))
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+RATE_LIMIT_REASONS = (b'ratelimitexceeded', b'userratelimitexceeded', b'quotaexceeded')
+
+
+def is_rate_limited(error):
+    """429 veya 403 (rateLimitExceeded / userRateLimitExceeded) hatası mı?"""
+    status = error.resp.status
+    if status == 429:
+        return True
+    content = (error.content or b'').lower()
+    return status == 403 and any(reason in content for reason in RATE_LIMIT_REASONS)
+
+
+def is_retryable(error):
+    return error.resp.status in RETRYABLE_STATUSES or is_rate_limited(error)
+
+
+def quota_key(service):
+    """Servis veya istemcinin kimlik bilgisinden kullanıcıya özgü kota anahtarı üret.
+
+    Aynı hesabın farklı istek ve thread'lerde oluşturulan servisleri aynı kovayı paylaşır.
+    """
+    credentials = getattr(service, 'credentials', None)
+    if credentials is None:
+        http = getattr(service, '_http', None)
+        credentials = getattr(http, 'credentials', None)
+    identity = getattr(credentials, 'refresh_token', None) or getattr(credentials, 'token', None)
+    if identity is None:
+        return 'default'
+    return hashlib.sha256(identity.encode('utf-8')).hexdigest()[:16]
+
+
+class TokenBucket:
+    """Saniyede rate birim dolan, en fazla capacity birim biriktiren kova.
+
+    reserve() birimleri hemen ayırır (kova eksiye düşebilir) ve çağıranın
+    beklemesi gereken süreyi döndürür; böylece bekleme thread'de time.sleep,
+    coroutine'de asyncio.sleep ile yapılabilir.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, units):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= units
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class GmailScheduler:
+    """Gmail çağrılarını kullanıcı başına kota kovasıyla sınırlayıp geçici hataları yeniden deneyen zamanlayıcı.
+
+    429 / rateLimitExceeded ve 5xx yanıtları rastgele gecikmeli (full jitter) üstel
+    geri çekilmeyle max_retries kez yeniden denenir; kalıcı hatalar çağırana iletilir.
+    Sayaçlar stats() ile okunur.
+    """
+
+    def __init__(self, rate=USER_QUOTA_PER_SECOND, burst=USER_QUOTA_BURST, max_retries=MAX_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX):
+        self.rate = rate
+        self.burst = burst
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._counters = {
+            'requests': 0,
+            'quota_units': 0,
+            'throttled': 0,
+            'throttle_seconds': 0.0,
+            'rate_limited': 0,
+            'retries': 0,
+            'failures': 0,
+        }
+
+    def _bucket(self, key):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = TokenBucket(self.rate, self.burst)
+            return bucket
+
+    def _count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self._counters[name] += value
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters)
+
+    def backoff(self, attempt, error=None):
+        """attempt. deneme için bekleme süresi; Retry-After başlığı varsa ona uyulur."""
+        retry_after = error.resp.get('retry-after') if error is not None else None
+        if retry_after:
+            try:
+                return min(self.backoff_max, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def _acquire_delay(self, key, kind, units):
+        units = units if units is not None else QUOTA_UNITS[kind]
+        delay = self._bucket(key).reserve(units)
+        self._count(requests=1, quota_units=units)
+        if delay > 0:
+            self._count(throttled=1, throttle_seconds=delay)
+        return delay
+
+    def _should_retry(self, error, attempt):
+        if not isinstance(error, HttpError) or not is_retryable(error):
+            self._count(failures=1)
+            return False
+        if is_rate_limited(error):
+            self._count(rate_limited=1)
+        if attempt >= self.max_retries:
+            self._count(failures=1)
+            return False
+        self._count(retries=1)
+        return True
+
+    def retry_delay(self, errors, attempt):
+        """Batch alt isteklerinden dönen yeniden denenebilir hatalar için bekleme süresi; deneme hakkı bittiyse None."""
+        self._count(rate_limited=sum(1 for error in errors if is_rate_limited(error)))
+        if attempt >= self.max_retries:
+            self._count(failures=len(errors))
+            return None
+        self._count(retries=len(errors))
+        return self.backoff(attempt, errors[0])
+
+    def execute(self, key, kind, call, units=None):
+        """call() çağrısını kota kovası ve yeniden deneme ile çalıştır (senkron)."""
+        attempt = 0
+        while True:
+            delay = self._acquire_delay(key, kind, units)
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                with timed(f'gmail_{kind}'):
+                    return call()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self.backoff(attempt, e))
+                attempt += 1
+
+    async def execute_async(self, key, kind, call, units=None):
+        """call() coroutine fabrikasını kota kovası ve yeniden deneme ile çalıştır."""
+        attempt = 0
+        while True:
+            delay = self._acquire_delay(key, kind, units)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                with timed(f'gmail_{kind}'):
+                    return await call()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self.backoff(attempt, e))
+                attempt += 1
+
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+
+def get_gmail_scheduler():
+    """Uygulama genelinde paylaşılan zamanlayıcıyı döndür (ilk kullanımda oluşturulur)."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = GmailScheduler()
+        return _default_scheduler
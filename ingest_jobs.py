@@ -0,0 +1,134 @@
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+INGEST_JOB_WORKERS = int(os.environ.get("EXPENSELESS_INGEST_JOB_WORKERS", 4))
+# Biten işler bu süre boyunca /jobs/<id> üzerinden sorgulanabilir kalır.
+INGEST_JOB_TTL = float(os.environ.get("EXPENSELESS_INGEST_JOB_TTL", 15 * 60))
+
+
+class IngestJob:
+    """Arka planda çalışan bir senkronizasyon işinin durumu ve ilerleme sayaçları."""
+
+    def __init__(self, key, months):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = 'running'
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self.months_total = months
+        self.months_done = 0
+        self.emails_processed = 0
+        self.orders_found = 0
+        self._reporters = {}
+        self._lock = threading.Lock()
+
+    def progress(self, emails=0, orders=0, months=0):
+        """MailboxSync ilerleme geri çağrısı; her parça ve tamamlanan ay için çağrılır."""
+        with self._lock:
+            self.emails_processed += emails
+            self.orders_found += orders
+            self.months_done += months
+
+    def attach(self, name, reporter):
+        """reporter() sonucunu to_dict çıktısına name anahtarıyla ekle (ör. sorgu planı raporu)."""
+        with self._lock:
+            self._reporters[name] = reporter
+
+    @property
+    def running(self):
+        return self.status == 'running'
+
+    def to_dict(self):
+        with self._lock:
+            reporters = dict(self._reporters)
+            state = {
+                'id': self.id,
+                'status': self.status,
+                'error': self.error,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'months_total': self.months_total,
+                'months_done': self.months_done,
+                'emails_processed': self.emails_processed,
+                'orders_found': self.orders_found,
+            }
+        state.update((name, reporter()) for name, reporter in reporters.items())
+        return state
+
+
+class IngestJobManager:
+    """Senkronizasyon işlerini thread havuzunda çalıştırır ve id ile sorgulanabilir tutar.
+
+    Aynı anahtar (ör. kullanıcı + dönem) için çalışan bir iş varsa yeni iş
+    başlatılmaz; istek mevcut işe bağlanır.
+    """
+
+    def __init__(self, max_workers=INGEST_JOB_WORKERS, ttl=INGEST_JOB_TTL):
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ingest-job')
+        self._jobs = {}
+        self._running = {}
+        self._lock = threading.Lock()
+
+    def start(self, key, target, months=1):
+        """target(job) fonksiyonunu arka planda çalıştır; aynı anahtarlı çalışan iş varsa onu döndür."""
+        with self._lock:
+            self._prune()
+            job = self._running.get(key)
+            if job is not None:
+                return job
+
+            job = IngestJob(key, months)
+            self._jobs[job.id] = job
+            self._running[key] = job
+
+        self._executor.submit(self._run, job, target)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job, target):
+        try:
+            target(job)
+            job.status = 'done'
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._running.get(job.key) is job:
+                    del self._running[job.key]
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_ingest_job_manager():
+    """Uygulama genelinde paylaşılan iş yöneticisini döndür (ilk kullanımda oluşturulur)."""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = IngestJobManager()
+        return _default_manager
@@ -0,0 +1,218 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from googleapiclient.errors import HttpError
+
+from gmail_fetch import fetch_messages, build_thread_service, get_profile, list_history
+from order_store import MISSING_ORDER_ID
+from web_scraping import (
+    iter_emails_with_month, iter_full_emails, parse_message_headers, get_message_text, extract_email_orders
+)
+
+TEMU_SENDER = "temu@orders.temu.com"
+INGEST_CHUNK_SIZE = 100
+MONTH_SYNC_WORKERS = int(os.environ.get("EXPENSELESS_MONTH_SYNC_WORKERS", 4))
+
+
+def get_user_id(service):
+    """Senkronizasyon durumunu anahtarlamak için hesabın e-posta adresini döndür."""
+    return get_profile(service)['emailAddress']
+
+
+class MailboxSync:
+    """Gmail history id'leri ile yalnızca yeni gelen mesajları işleyip sipariş deposunu güncel tutar.
+
+    Bir ay ilk kez istendiğinde tam ay sorgusuyla doldurulur; sonraki isteklerde
+    users.history.list ile sadece son historyId'den beri eklenen mesajlar çekilir.
+    """
+
+    def __init__(self, service, store, user, keywords, cache=None, pool=None, pdf_cache=None, progress=None,
+                 plan=None, prefilter=None):
+        self.service = service
+        self.store = store
+        self.user = user
+        self.keywords = keywords
+        self.cache = cache
+        self.pool = pool
+        self.pdf_cache = pdf_cache
+        # progress(emails=..., orders=..., months=...) her parça ve tamamlanan ay için çağrılır.
+        self.progress = progress
+        # plan (query_planner.QueryPlan) verilirse aylar anahtar kelime sorgusu yerine planla taranır.
+        self.plan = plan
+        # prefilter (prefilter.MessagePrefilter) verilirse makbuz olmadığı belli mesajlar tam çekilmez.
+        # Atlanan mesajlar ay taranmış sayıldıktan sonra yeniden incelenmez; ön filtre kapalı bir
+        # senkronizasyon, ön filtreyle taranmış ayları bir kez daha tam tarar.
+        self.prefilter = prefilter
+
+    def sync_month(self, year, month):
+        self.sync_months([(year, month)])
+
+    def sync_months(self, months, max_workers=MONTH_SYNC_WORKERS):
+        """Verilen (yıl, ay) listesini güncelle; henüz taranmamış aylar eşzamanlı doldurulur."""
+        # Tam tarama sırasında gelen mesajlar kaçmasın diye historyId taramadan önce alınır.
+        if self.store.get_history_id(self.user) is None:
+            self._reset_history_id()
+        else:
+            self.sync_history()
+
+        pending = [
+            (year, month) for year, month in months
+            if not self.store.is_month_synced(self.user, year, month, allow_prefiltered=self.prefilter is not None)
+        ]
+        self._report(months=len(months) - len(pending))
+        if len(pending) <= 1 or max_workers <= 1:
+            for year, month in pending:
+                self._backfill_month(year, month)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as executor:
+            for future in [executor.submit(self._backfill_month_in_thread, year, month) for year, month in pending]:
+                future.result()
+
+    def _backfill_month(self, year, month):
+        self.ingest(iter_emails_with_month(self.service, self.keywords, year, month, cache=self.cache, plan=self.plan))
+        self.store.mark_month_synced(self.user, year, month, prefiltered=self.prefilter is not None)
+        self._report(months=1)
+
+    def _backfill_month_in_thread(self, year, month):
+        # httplib2 thread güvenli olmadığından her ay kendi servis nesnesiyle taranır.
+        worker = MailboxSync(
+            build_thread_service(self.service), self.store, self.user, self.keywords,
+            cache=self.cache, pool=self.pool, pdf_cache=self.pdf_cache, progress=self.progress, plan=self.plan,
+            prefilter=self.prefilter
+        )
+        worker._backfill_month(year, month)
+
+    def sync_history(self):
+        start_history_id = self.store.get_history_id(self.user)
+        if start_history_id is None:
+            self._reset_history_id()
+            return []
+
+        message_ids = []
+        latest_history_id = start_history_id
+        page_token = None
+        try:
+            while True:
+                response = list_history(self.service, start_history_id, page_token)
+
+                for record in response.get('history', []):
+                    for added in record.get('messagesAdded', []):
+                        message = added.get('message', {})
+                        if 'DRAFT' not in message.get('labelIds', []):
+                            message_ids.append(message['id'])
+
+                latest_history_id = response.get('historyId', latest_history_id)
+                page_token = response.get('nextPageToken')
+                if not page_token:
+                    break
+        except HttpError as e:
+            if e.resp.status == 404:
+                # historyId çok eski: depodaki aylar tam taramayla yeniden doldurulacak.
+                print(f"History id {start_history_id} expired for {self.user}, resetting sync")
+                self.store.reset_sync(self.user)
+                self._reset_history_id()
+                return []
+            print(f"Gmail API error: {e}")
+            return []
+
+        fetched = fetch_messages(self.service, message_ids, cache=self.cache)
+        emails = [
+            parse_message_headers(msg_data)
+            for msg_data in fetched.values()
+            if self._matches_query(msg_data)
+        ]
+        orders = self.ingest(emails, full_messages=True)
+        self.store.set_history_id(self.user, latest_history_id)
+        return orders
+
+    def ingest(self, emails, full_messages=False):
+        """E-postaları çıkarım hattından geçirip depoya parça parça yaz.
+
+        full_messages=False ise e-postalar metadata ile listelenmiştir; gövdeler burada çekilir.
+        Ön filtre her iki durumda da uygulanır; tam mesajlarda çekimi değil çıkarımı atlatır.
+        """
+        if self.prefilter is not None:
+            emails = self._prefiltered(emails)
+        if not full_messages:
+            emails = iter_full_emails(self.service, emails, cache=self.cache)
+
+        emails = iter(emails)
+        orders = []
+        while True:
+            chunk = list(islice(emails, INGEST_CHUNK_SIZE))
+            if not chunk:
+                break
+
+            # Parçadaki tüm PDF ekleri işçi havuzuna birlikte dağıtılır.
+            chunk_orders = extract_email_orders(self.service, chunk, self.cache, self.pool, self.pdf_cache)
+            if chunk_orders:
+                self.store.upsert_orders(self.user, chunk_orders)
+            if self.plan is not None:
+                self._record_clause_orders(chunk, chunk_orders)
+            if self.prefilter is not None:
+                self._record_prefilter(chunk, chunk_orders)
+            orders.extend(chunk_orders)
+            self._report(emails=len(chunk), orders=len(chunk_orders))
+        return orders
+
+    def _prefiltered(self, emails):
+        """Ön filtreden geçen e-postaları ve atlananlardan denetim örneğini üret.
+
+        Üretilen e-postalara filtrenin kararı 'prefiltered' alanıyla eklenir; denetlenmeden
+        atlananlar defterdeki siparişlerle karşılaştırılır.
+        """
+        skipped = []
+        for email in emails:
+            keep = self.prefilter.wants(email['message'])
+            if keep or self.prefilter.audited(email['id']):
+                yield {**email, 'prefiltered': keep}
+                continue
+            skipped.append(email['id'])
+            if len(skipped) >= INGEST_CHUNK_SIZE:
+                self._record_skipped(skipped)
+                skipped = []
+        self._record_skipped(skipped)
+
+    def _record_skipped(self, message_ids):
+        if message_ids:
+            missed = self.store.order_message_ids(self.user, message_ids)
+            self.prefilter.stats.record_skipped(len(message_ids), missed=len(missed))
+
+    def _record_prefilter(self, emails, orders):
+        found = {order['id'] for order in orders if order.get('order_id') != MISSING_ORDER_ID}
+        for email in emails:
+            if 'prefiltered' in email:
+                self.prefilter.stats.record(email['prefiltered'], email['id'] in found)
+
+    def _record_clause_orders(self, emails, orders):
+        clauses = {email['id']: email.get('clause') for email in emails}
+        for order in orders:
+            if order.get('order_id') != MISSING_ORDER_ID:
+                self.plan.record(clauses.get(order['id']), orders=1)
+
+    def _report(self, **counts):
+        if self.progress is not None:
+            self.progress(**counts)
+
+    def _reset_history_id(self):
+        profile = get_profile(self.service)
+        self.store.set_history_id(self.user, profile['historyId'])
+
+    def _matches_query(self, msg_data):
+        """Ay sorgusunun (plan veya anahtar kelimeler) tam mesaj üzerindeki yerel karşılığı."""
+        if self.plan is not None:
+            return self.plan.matches(msg_data, get_message_text(msg_data, self.cache)) is not None
+        return self._matches_keywords(msg_data)
+
+    def _matches_keywords(self, msg_data):
+        """Anahtar kelime sorgusunun yerel karşılığı."""
+        headers = msg_data.get('payload', {}).get('headers', [])
+        sender = next((h['value'] for h in headers if h['name'] == 'From'), '')
+        if TEMU_SENDER in sender:
+            return False
+
+        subject = next((h['value'] for h in headers if h['name'] == 'Subject'), '')
+        text = f"{subject} {msg_data.get('snippet', '')} {get_message_text(msg_data, self.cache)}".lower()
+        return any(keyword.lower() in text for keyword in self.keywords)
@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+
+from sqlite_lru import SqliteLru
+
+CACHE_PATH = os.environ.get("EXPENSELESS_CACHE_PATH", os.path.join("cache", "messages.db"))
+MAX_CACHE_BYTES = int(os.environ.get("EXPENSELESS_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+
+class MessageCache(SqliteLru):
+    """Gmail mesajları, ekleri ve çıkarım sonuçları için SQLite tabanlı kalıcı önbellek.
+
+    Gmail mesajları değişmediği için kayıtlar mesaj id (ve ek id) ile anahtarlanır;
+    toplam boyut max_bytes'ı aşınca en uzun süredir kullanılmayan kayıtlar silinir.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_CACHE_BYTES):
+        super().__init__(path, 'entries', ('kind', 'key'), {'value': 'TEXT NOT NULL'}, max_bytes)
+
+    def _get(self, kind, key):
+        row = self.lookup((kind, key))
+        return json.loads(row[0]) if row is not None else None
+
+    def _put(self, kind, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        self.store((kind, key), (encoded,), len(encoded.encode('utf-8')))
+
+    def get_message(self, message_id, message_format='full'):
+        return self._get(f"message:{message_format}", message_id)
+
+    def put_message(self, message_id, message, message_format='full'):
+        self._put(f"message:{message_format}", message_id, message)
+
+    def get_text(self, message_id):
+        return self._get("text", message_id)
+
+    def put_text(self, message_id, text):
+        self._put("text", message_id, text)
+
+    def get_details(self, message_id, extractor, attachment_id=None):
+        key = f"{message_id}/{attachment_id}" if attachment_id else message_id
+        return self._get(f"details:{extractor}", key)
+
+    def put_details(self, message_id, extractor, details, attachment_id=None):
+        key = f"{message_id}/{attachment_id}" if attachment_id else message_id
+        self._put(f"details:{extractor}", key, details)
+
+    def get_attachment(self, message_id, attachment_id):
+        return self._get("attachment", f"{message_id}/{attachment_id}")
+
+    def put_attachment(self, message_id, attachment_id, data):
+        self._put("attachment", f"{message_id}/{attachment_id}", data)
+
+    def get_listing(self, query):
+        return self._get("listing", query)
+
+    def put_listing(self, query, message_ids):
+        self._put("listing", query, message_ids)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_message_cache():
+    """Uygulama genelinde paylaşılan önbelleği döndür (ilk kullanımda oluşturulur)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = MessageCache()
+        return _default_cache
@@ -0,0 +1,166 @@
+import bisect
+import contextvars
+import os
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+# Gmail çağrılarından OCR'a kadar tüm aşamaları kapsayan saniye cinsinden kova sınırları.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Açıksa her yanıta Server-Timing başlığıyla aşama dökümü eklenir (?timing=1 ile istek bazında da açılır).
+TIMING_HEADER = os.environ.get("EXPENSELESS_TIMING_HEADER", "0") == "1"
+
+_request_timings = contextvars.ContextVar('request_timings', default=None)
+_captured = contextvars.ContextVar('captured_observations', default=None)
+
+
+class StageHistogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds, error=False):
+        index = bisect.bisect_left(self.buckets, seconds)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+
+class MetricsRegistry:
+    """Aşama başına gecikme histogramı ve hata sayacı tutan, Prometheus metin biçiminde dışa veren kayıt."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._stages = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, error=False):
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = StageHistogram(self.buckets)
+            histogram.observe(seconds, error)
+
+    def snapshot(self):
+        """{aşama: (çağrı sayısı, toplam saniye, hata sayısı)}; iki anlık görüntünün farkı bir işin aşama dökümüdür."""
+        with self._lock:
+            return {stage: (h.count, h.sum, h.errors) for stage, h in self._stages.items()}
+
+    def render(self, counters=None):
+        """Prometheus metin biçimi; counters ek {ad: değer} sayaçlarıdır."""
+        lines = [
+            '# HELP expenseless_stage_duration_seconds Pipeline stage latency.',
+            '# TYPE expenseless_stage_duration_seconds histogram',
+        ]
+        errors = [
+            '# HELP expenseless_stage_errors_total Pipeline stage calls that raised.',
+            '# TYPE expenseless_stage_errors_total counter',
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._stages.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'expenseless_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'expenseless_stage_duration_seconds_bucket{{stage="{stage}",le="+Inf"}} {histogram.count}')
+                lines.append(f'expenseless_stage_duration_seconds_sum{{stage="{stage}"}} {histogram.sum}')
+                lines.append(f'expenseless_stage_duration_seconds_count{{stage="{stage}"}} {histogram.count}')
+                errors.append(f'expenseless_stage_errors_total{{stage="{stage}"}} {histogram.errors}')
+
+        lines.extend(errors)
+        for name, value in sorted((counters or {}).items()):
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def observe(stage, seconds, error=False):
+    registry.observe(stage, seconds, error)
+
+    timings = _request_timings.get()
+    if timings is not None:
+        total, count = timings.get(stage, (0.0, 0))
+        timings[stage] = (total + seconds, count + 1)
+
+    captured = _captured.get()
+    if captured is not None:
+        captured.append((stage, seconds, error))
+
+
+@contextmanager
+def timed(stage):
+    """Bloğun süresini stage aşamasına kaydet; istisna yükselirse hata olarak sayılır."""
+    started = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started, error)
+
+
+def instrumented(stage):
+    """Fonksiyonun her çağrısını stage aşamasına kaydeden dekoratör."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timed(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def start_request_timing():
+    """Geçerli bağlamda (istek thread'i) aşama sürelerini toplamaya başla."""
+    return _request_timings.set({})
+
+
+def finish_request_timing(token):
+    timings = _request_timings.get()
+    _request_timings.reset(token)
+    return timings or {}
+
+
+def server_timing_header(timings):
+    """{aşama: (toplam saniye, çağrı sayısı)} sözlüğünü Server-Timing başlık değerine çevir."""
+    return ', '.join(
+        f'{stage};dur={total * 1000:.1f};desc="{count}x"'
+        for stage, (total, count) in sorted(timings.items())
+    )
+
+
+@contextmanager
+def capture():
+    """Blok içindeki gözlemleri listede de topla; ayrı süreçte ölçülenleri ana sürece taşımak için."""
+    observations = []
+    token = _captured.set(observations)
+    try:
+        yield observations
+    finally:
+        _captured.reset(token)
+
+
+def replay(observations):
+    for stage, seconds, error in observations:
+        observe(stage, seconds, error)
+
+
+def snapshot():
+    return registry.snapshot()
+
+
+def render_metrics(counters=None):
+    return registry.render(counters)
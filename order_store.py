@@ -0,0 +1,437 @@
+import os
+import sqlite3
+import threading
+
+STORE_PATH = os.environ.get("EXPENSELESS_STORE_PATH", os.path.join("data", "orders.db"))
+
+ORDER_COLUMNS = ['message_id', 'order_id', 'subject', 'sender', 'date', 'timestamp', 'total_amount', 'source']
+
+# Sipariş numarası bulunamayan kayıtlar tekilleştirmede ve toplamlarda sayılmaz.
+MISSING_ORDER_ID = "(Sipariş Numarası Yok)"
+
+# Aynı sipariş numarasına sahip kayıtlardan yalnızca kullanıcının en yeni kaydı kullanılır;
+# sipariş, en yeni kaydının ayına aittir. Böylece aylık toplamlar aralık boyunca
+# toplandığında aynı sipariş iki kez sayılmaz. Parametreler: unique_params().
+UNIQUE_ORDERS_SQL = f"""
+    SELECT {', '.join(ORDER_COLUMNS)} FROM (
+        SELECT *, ROW_NUMBER() OVER (PARTITION BY order_id ORDER BY timestamp DESC) AS row_rank
+        FROM orders
+        WHERE user = ? AND order_id IN (
+            SELECT order_id FROM orders WHERE user = ? AND timestamp >= ? AND timestamp < ?
+        )
+    )
+    WHERE row_rank = 1 AND order_id != ? AND timestamp >= ? AND timestamp < ?
+"""
+
+# Toplam tablolarının hesaplanma biçimi değiştiğinde artırılır; eski defterler açılışta yeniden hesaplanır.
+ROLLUP_VERSION = 2
+
+
+def unique_params(user, start, end):
+    return (user, user, start, end, MISSING_ORDER_ID, start, end)
+
+
+def month_bounds(year, month):
+    """Ayın [başlangıç, bitiş) aralığını depo zaman damgası biçiminde döndür."""
+    start = f"{year}-{month:02d}-01"
+    end = f"{year + 1}-01-01" if month == 12 else f"{year}-{month + 1:02d}-01"
+    return start, end
+
+
+class OrderStore:
+    """Çıkarılmış siparişleri ve kullanıcı başına Gmail senkronizasyon durumunu tutan SQLite defteri.
+
+    Dashboard ve GmailAnalyzer ay, aralık ve gönderici sorgularını ve toplamları
+    posta kutusuna gitmeden buradan okur.
+    """
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS orders (
+                user TEXT NOT NULL,
+                message_id TEXT NOT NULL,
+                order_id TEXT,
+                subject TEXT,
+                sender TEXT,
+                date TEXT,
+                timestamp TEXT,
+                total_amount REAL,
+                source TEXT,
+                PRIMARY KEY (user, message_id)
+            );
+            CREATE INDEX IF NOT EXISTS idx_orders_user_timestamp ON orders (user, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_orders_user_sender ON orders (user, sender);
+            CREATE INDEX IF NOT EXISTS idx_orders_user_order_id ON orders (user, order_id);
+            CREATE TABLE IF NOT EXISTS rollup_months (
+                user TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user, year, month)
+            );
+            CREATE TABLE IF NOT EXISTS rollup_daily (
+                user TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                day INTEGER NOT NULL,
+                total REAL NOT NULL,
+                PRIMARY KEY (user, year, month, day)
+            );
+            CREATE TABLE IF NOT EXISTS rollup_senders (
+                user TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                sender TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user, year, month, sender)
+            );
+            CREATE TABLE IF NOT EXISTS rollup_sources (
+                user TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                source TEXT NOT NULL,
+                total REAL NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user, year, month, source)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                user TEXT PRIMARY KEY,
+                history_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS synced_months (
+                user TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                month INTEGER NOT NULL,
+                prefiltered INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user, year, month)
+            );
+            """
+        )
+        # prefiltered sütunundan önce oluşturulmuş defterler.
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(synced_months)")}
+        if 'prefiltered' not in columns:
+            self._conn.execute("ALTER TABLE synced_months ADD COLUMN prefiltered INTEGER NOT NULL DEFAULT 0")
+        self._conn.commit()
+
+        # Toplam tabloları sonradan eklendiyse veya hesaplanma biçimi değiştiyse mevcut siparişlerden doldurulur.
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] < ROLLUP_VERSION:
+            self.rebuild_rollups()
+            with self._lock:
+                self._conn.execute(f"PRAGMA user_version = {ROLLUP_VERSION}")
+                self._conn.commit()
+
+    def upsert_orders(self, user, orders):
+        rows = [
+            (
+                user,
+                order['id'],
+                order['order_id'],
+                order['subject'],
+                order['sender'],
+                order['date'],
+                order['timestamp'].strftime('%Y-%m-%d %H:%M:%S') if order.get('timestamp') else None,
+                order['total_amount'],
+                order['source'],
+            )
+            for order in orders
+        ]
+        touched_months = {(int(row[6][:4]), int(row[6][5:7])) for row in rows if row[6]}
+        order_ids = {row[2] for row in rows if row[2]}
+        with self._lock:
+            # Güncellenen mesajların eski ayları da yeniden hesaplanmalı.
+            for row in rows:
+                previous = self._conn.execute(
+                    "SELECT timestamp, order_id FROM orders WHERE user = ? AND message_id = ?", (user, row[1])
+                ).fetchone()
+                if previous and previous[0]:
+                    touched_months.add((int(previous[0][:4]), int(previous[0][5:7])))
+                if previous and previous[1]:
+                    order_ids.add(previous[1])
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO orders "
+                "(user, message_id, order_id, subject, sender, date, timestamp, total_amount, source) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            # Sipariş en yeni kaydının ayına ait olduğundan aynı numaralı diğer kayıtların ayları da değişir.
+            order_ids.discard(MISSING_ORDER_ID)
+            touched_months.update(self._order_months(user, order_ids))
+            for year, month in touched_months:
+                self._refresh_rollup(user, year, month)
+            self._conn.commit()
+
+    def _order_months(self, user, order_ids):
+        months = set()
+        order_ids = list(order_ids)
+        for index in range(0, len(order_ids), 500):
+            chunk = order_ids[index:index + 500]
+            rows = self._conn.execute(
+                "SELECT DISTINCT CAST(substr(timestamp, 1, 4) AS INTEGER), CAST(substr(timestamp, 6, 2) AS INTEGER) "
+                f"FROM orders WHERE user = ? AND timestamp IS NOT NULL AND order_id IN ({', '.join('?' * len(chunk))})",
+                (user, *chunk)
+            ).fetchall()
+            months.update(rows)
+        return months
+
+    def _refresh_rollup(self, user, year, month):
+        """Bir kullanıcı-ayın toplam tablolarını o ayın tekil siparişlerinden yeniden yaz."""
+        params = unique_params(user, *month_bounds(year, month))
+        key = (user, year, month)
+
+        for table in ('rollup_months', 'rollup_daily', 'rollup_senders', 'rollup_sources'):
+            self._conn.execute(f"DELETE FROM {table} WHERE user = ? AND year = ? AND month = ?", key)
+
+        self._conn.execute(
+            "INSERT INTO rollup_months (user, year, month, total, count) "
+            f"SELECT ?, ?, ?, COALESCE(SUM(total_amount), 0), COUNT(*) FROM ({UNIQUE_ORDERS_SQL})",
+            key + params
+        )
+        self._conn.execute(
+            "INSERT INTO rollup_daily (user, year, month, day, total) "
+            "SELECT ?, ?, ?, CAST(strftime('%d', timestamp) AS INTEGER) AS day, COALESCE(SUM(total_amount), 0) "
+            f"FROM ({UNIQUE_ORDERS_SQL}) GROUP BY day",
+            key + params
+        )
+        self._conn.execute(
+            "INSERT INTO rollup_senders (user, year, month, sender, total, count) "
+            "SELECT ?, ?, ?, sender, COALESCE(SUM(total_amount), 0), COUNT(*) "
+            f"FROM ({UNIQUE_ORDERS_SQL}) GROUP BY sender",
+            key + params
+        )
+        self._conn.execute(
+            "INSERT INTO rollup_sources (user, year, month, source, total, count) "
+            "SELECT ?, ?, ?, COALESCE(source, 'Other'), COALESCE(SUM(total_amount), 0), COUNT(*) "
+            f"FROM ({UNIQUE_ORDERS_SQL}) GROUP BY COALESCE(source, 'Other')",
+            key + params
+        )
+
+    def rebuild_rollups(self):
+        """Tüm kullanıcı-ayların toplam tablolarını sipariş tablosundan yeniden oluştur."""
+        with self._lock:
+            for table in ('rollup_months', 'rollup_daily', 'rollup_senders', 'rollup_sources'):
+                self._conn.execute(f"DELETE FROM {table}")
+            months = self._conn.execute(
+                "SELECT DISTINCT user, CAST(substr(timestamp, 1, 4) AS INTEGER), "
+                "CAST(substr(timestamp, 6, 2) AS INTEGER) FROM orders WHERE timestamp IS NOT NULL"
+            ).fetchall()
+            for user, year, month in months:
+                self._refresh_rollup(user, year, month)
+            self._conn.commit()
+
+    def month_rollup(self, user, year, month):
+        """Ayın önceden hesaplanmış toplam tutarı ve sipariş sayısı."""
+        rows = self._query(
+            "SELECT total, count FROM rollup_months WHERE user = ? AND year = ? AND month = ?",
+            (user, year, month)
+        )
+        total, count = rows[0] if rows else (0, 0)
+        return {'total': total, 'count': count}
+
+    def daily_rollup(self, user, year, month):
+        """Ayın önceden hesaplanmış günlük toplamları: [(gün, toplam), ...]."""
+        return self._query(
+            "SELECT day, total FROM rollup_daily WHERE user = ? AND year = ? AND month = ? ORDER BY day",
+            (user, year, month)
+        )
+
+    def sender_rollup(self, user, year, month):
+        """Ayın önceden hesaplanmış gönderici toplamları, büyükten küçüğe."""
+        rows = self._query(
+            "SELECT sender, total FROM rollup_senders WHERE user = ? AND year = ? AND month = ? "
+            "ORDER BY total DESC",
+            (user, year, month)
+        )
+        return [{'sender': sender, 'total_amount': total} for sender, total in rows]
+
+    def monthly_rollups(self, user, start_year, start_month, end_year, end_month):
+        """[başlangıç, bitiş] ay aralığındaki aylık toplamlar; maliyet ay sayısıyla orantılıdır."""
+        rows = self._query(
+            "SELECT year, month, total, count FROM rollup_months "
+            "WHERE user = ? AND (year * 12 + month) BETWEEN ? AND ? ORDER BY year, month",
+            (user, start_year * 12 + start_month, end_year * 12 + end_month)
+        )
+        return [{'year': year, 'month': month, 'total': total, 'count': count} for year, month, total, count in rows]
+
+    def sender_rollups(self, user, start_year, start_month, end_year, end_month):
+        """Ay aralığı boyunca gönderici toplamları, aylık gönderici tablosundan."""
+        rows = self._query(
+            "SELECT sender, SUM(total) AS total FROM rollup_senders "
+            "WHERE user = ? AND (year * 12 + month) BETWEEN ? AND ? GROUP BY sender ORDER BY total DESC",
+            (user, start_year * 12 + start_month, end_year * 12 + end_month)
+        )
+        return [{'sender': sender, 'total_amount': total} for sender, total in rows]
+
+    def source_rollups(self, user, start_year, start_month, end_year, end_month):
+        """Ay aralığındaki aylık kaynak toplamları: [{'year', 'month', 'source', 'total'}, ...]."""
+        rows = self._query(
+            "SELECT year, month, source, total FROM rollup_sources "
+            "WHERE user = ? AND (year * 12 + month) BETWEEN ? AND ? ORDER BY year, month",
+            (user, start_year * 12 + start_month, end_year * 12 + end_month)
+        )
+        return [
+            {'year': year, 'month': month, 'source': source, 'total': total}
+            for year, month, source, total in rows
+        ]
+
+    def _query(self, sql, params):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def orders_between(self, user, start, end):
+        """[start, end) aralığındaki tüm kayıtlar, en yeniden eskiye."""
+        rows = self._query(
+            f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders "
+            "WHERE user = ? AND timestamp >= ? AND timestamp < ? ORDER BY timestamp DESC",
+            (user, start, end)
+        )
+        return [dict(zip(ORDER_COLUMNS, row)) for row in rows]
+
+    def orders_for_month(self, user, year, month):
+        return self.orders_between(user, *month_bounds(year, month))
+
+    def orders_for_sender(self, user, sender, start=None, end=None):
+        sql = f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders WHERE user = ? AND sender = ?"
+        params = [user, sender]
+        if start is not None:
+            sql += " AND timestamp >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND timestamp < ?"
+            params.append(end)
+        rows = self._query(sql + " ORDER BY timestamp DESC", params)
+        return [dict(zip(ORDER_COLUMNS, row)) for row in rows]
+
+    def order_message_ids(self, user, message_ids):
+        """Verilen mesajlardan defterde geçerli sipariş numarasıyla kayıtlı olanların id kümesi."""
+        message_ids = list(message_ids)
+        if not message_ids:
+            return set()
+        placeholders = ', '.join('?' * len(message_ids))
+        rows = self._query(
+            f"SELECT message_id FROM orders WHERE user = ? AND message_id IN ({placeholders}) "
+            "AND order_id IS NOT NULL AND order_id != ?",
+            [user, *message_ids, MISSING_ORDER_ID]
+        )
+        return {message_id for message_id, in rows}
+
+    def find_order(self, user, order_id):
+        rows = self._query(
+            f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders WHERE user = ? AND order_id = ? "
+            "ORDER BY timestamp DESC",
+            (user, order_id)
+        )
+        return [dict(zip(ORDER_COLUMNS, row)) for row in rows]
+
+    def unique_orders(self, user, start, end, limit=None):
+        """Aralıktaki sipariş numarasına göre tekilleştirilmiş kayıtlar, en yeniden eskiye."""
+        sql = UNIQUE_ORDERS_SQL + " ORDER BY timestamp DESC"
+        params = unique_params(user, start, end)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params += (limit,)
+        rows = self._query(sql, params)
+        return [dict(zip(ORDER_COLUMNS, row)) for row in rows]
+
+    def summary(self, user, start, end):
+        """Aralıktaki tekil siparişlerin toplam tutarı ve sayısı."""
+        total, count = self._query(
+            f"SELECT COALESCE(SUM(total_amount), 0), COUNT(*) FROM ({UNIQUE_ORDERS_SQL})",
+            unique_params(user, start, end)
+        )[0]
+        return {'total': total, 'count': count}
+
+    def daily_totals(self, user, start, end):
+        """Aralıktaki tekil siparişlerin ayın gününe göre toplamları: [(gün, toplam), ...]."""
+        return self._query(
+            "SELECT CAST(strftime('%d', timestamp) AS INTEGER) AS day, COALESCE(SUM(total_amount), 0) "
+            f"FROM ({UNIQUE_ORDERS_SQL}) GROUP BY day ORDER BY day",
+            unique_params(user, start, end)
+        )
+
+    def sender_totals(self, user, start, end):
+        """Aralıktaki tekil siparişlerin göndericiye göre toplamları, büyükten küçüğe."""
+        rows = self._query(
+            "SELECT sender, SUM(total_amount) AS total "
+            f"FROM ({UNIQUE_ORDERS_SQL}) GROUP BY sender ORDER BY total DESC",
+            unique_params(user, start, end)
+        )
+        return [{'sender': sender, 'total_amount': total} for sender, total in rows]
+
+    def order_senders(self, user, limit=None):
+        """Geçerli sipariş numarası üretmiş göndericiler, sipariş sayısına göre büyükten küçüğe.
+
+        Eski sürümlerin defterlere yazdığı '... bulunamadı' yer tutucuları sipariş sayılmaz.
+        """
+        sql = (
+            "SELECT sender, COUNT(DISTINCT order_id) AS orders FROM orders "
+            "WHERE user = ? AND order_id IS NOT NULL AND order_id != ? "
+            "AND LOWER(order_id) NOT LIKE '%bulunamadı%' "
+            "GROUP BY sender ORDER BY orders DESC, sender"
+        )
+        params = [user, MISSING_ORDER_ID]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [{'sender': sender, 'orders': orders} for sender, orders in self._query(sql, params)]
+
+    def get_history_id(self, user):
+        with self._lock:
+            row = self._conn.execute("SELECT history_id FROM sync_state WHERE user = ?", (user,)).fetchone()
+        return row[0] if row else None
+
+    def set_history_id(self, user, history_id):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state (user, history_id) VALUES (?, ?)",
+                (user, str(history_id))
+            )
+            self._conn.commit()
+
+    def is_month_synced(self, user, year, month, allow_prefiltered=True):
+        """Ay taranmış mı; allow_prefiltered=False ise ön filtreyle taranan aylar taranmamış sayılır."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM synced_months WHERE user = ? AND year = ? AND month = ? AND (? OR prefiltered = 0)",
+                (user, year, month, allow_prefiltered)
+            ).fetchone()
+        return row is not None
+
+    def mark_month_synced(self, user, year, month, prefiltered=False):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO synced_months (user, year, month, prefiltered) VALUES (?, ?, ?, ?)",
+                (user, year, month, prefiltered)
+            )
+            self._conn.commit()
+
+    def reset_sync(self, user):
+        """History zinciri koptuğunda aylar yeniden tam taramayla doldurulsun."""
+        with self._lock:
+            self._conn.execute("DELETE FROM synced_months WHERE user = ?", (user,))
+            self._conn.execute("DELETE FROM sync_state WHERE user = ?", (user,))
+            self._conn.commit()
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_order_store():
+    """Uygulama genelinde paylaşılan sipariş deposunu döndür (ilk kullanımda oluşturulur)."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = OrderStore()
+        return _default_store
@@ -0,0 +1,52 @@
+import hashlib
+import json
+import os
+import threading
+
+from sqlite_lru import SqliteLru
+
+PDF_CACHE_PATH = os.environ.get("EXPENSELESS_PDF_CACHE_PATH", os.path.join("cache", "pdf.db"))
+MAX_PDF_CACHE_BYTES = int(os.environ.get("EXPENSELESS_PDF_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def pdf_hash(pdf_bytes):
+    return hashlib.sha256(pdf_bytes).hexdigest()
+
+
+class PdfCache(SqliteLru):
+    """PDF içeriğinin SHA-256 özetine göre anahtarlanan metin ve sipariş detayı önbelleği.
+
+    Aynı fatura farklı mesajlarla tekrar geldiğinde pdfplumber ve OCR yeniden çalışmaz.
+    Toplam boyut max_bytes'ı aşınca en uzun süredir kullanılmayan kayıtlar silinir (LRU).
+    """
+
+    def __init__(self, path=PDF_CACHE_PATH, max_bytes=MAX_PDF_CACHE_BYTES):
+        super().__init__(
+            path, 'pdf_results', ('sha256',),
+            {'text': 'TEXT NOT NULL', 'source': 'TEXT', 'details': 'TEXT NOT NULL'}, max_bytes
+        )
+
+    def get(self, digest):
+        """Kayıt varsa {'text', 'source', 'details'} döndür."""
+        row = self.lookup((digest,))
+        if row is None:
+            return None
+        return {'text': row[0], 'source': row[1], 'details': json.loads(row[2])}
+
+    def put(self, digest, text, source, details):
+        encoded = json.dumps(details, ensure_ascii=False)
+        size = len(text.encode('utf-8')) + len(encoded.encode('utf-8'))
+        self.store((digest,), (text, source, encoded), size)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_pdf_cache():
+    """Uygulama genelinde paylaşılan PDF önbelleğini döndür (ilk kullanımda oluşturulur)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = PdfCache()
+        return _default_cache
@@ -1,11 +1,24 @@
-import pdfplumber
-import re
 import base64
-import tempfile
+import io
 import os
-from pdf2image import convert_from_path
+
+import pdfplumber
+from pdf2image import convert_from_bytes
 import pytesseract
 
+from metrics import instrumented, timed
+from extraction_engine import (
+    PDF_ORDER_PATTERNS, PDF_AMOUNT_PATTERNS, PDF_PAYABLE_PATTERNS, PDF_LINE_AMOUNT_TL, PDF_LINE_AMOUNT
+)
+
+# extract_pdf_order_details sipariş numarası bulamadığında bu yer tutucuyu döndürür.
+MISSING_PDF_ORDER_ID = "Sipariş Numarası Bulunamadı"
+MISSING_PDF_AMOUNT = "Tutar Bulunamadı"
+
+# OCR çözünürlüğü; pdf2image varsayılanı 200 DPI'dır.
+OCR_DPI = int(os.environ.get("EXPENSELESS_OCR_DPI", 150))
+
+
 def clean_currency(value):
     try:
         value = value.strip()
@@ -19,78 +32,39 @@ def clean_currency(value):
         return "Hatalı Tutar Formatı"
 
 
+def _convert_pdf_amount(groups):
+    amount_str = groups[0].strip()
+    if '.' in amount_str and ',' in amount_str:
+        amount_str = amount_str.replace('.', '').replace(',', '.')
+    elif ',' in amount_str:
+        amount_str = amount_str.replace(',', '.')
+    return float(amount_str)
+
+
+@instrumented('regex_extract')
 def extract_pdf_order_details(text_content):
 
-    details = {}
-
-    order_patterns = [
-        r'Sipariş No:\s*(\d+)',
-        r'Sipariş No\s*:\s*(\d+)',
-        r'Sipariş No\s*(\d+)',
-    ]
-
-    amount_patterns = [
-        r'Ödenecek Tutar\s*:?\s*([\d,.]+)\s*TL',
-        r'Ödenecek Tutar\s*:?\s*([\d,.]+)',
-        r'GENEL TOPLAM\s*:?\s*([\d,.]+)\s*TL',
-        r'Toplam\s*:?\s*([\d,.]+)\s*TL',
-        r'(?:^|\n)\s*Toplam\s*(?::|)\s*([\d,.]+)',
-        r'Ödenecek Tutar\s*:?\s*([\d.,]+)\s*TL',
-        r'Mal Hizmet Toplam Tutarı\s*:?\s*([\d.,]+)\s*TL',
-        r'Toplam İskonto\s*:?\s*([\d.,]+)\s*TL',
-        r'Hesaplanan KDV Matrahı\s*:?\s*([\d.,]+)\s*TL',
-        r'(?:Toplam|Ara Toplam)\s*:?\s*([\d.,]+)\s*TL'
-    ]
-
-    order_id = None
-    for pattern in order_patterns:
-        match = re.search(pattern, text_content)
-        if match:
-            order_id = match.group(1)
-            break
+    match = PDF_ORDER_PATTERNS.search(text_content)
+    order_id = match[1][0] if match else None
 
-    amount = None
-    for pattern in amount_patterns:
-        match = re.search(pattern, text_content)
-        if match:
-            amount_str = match.group(1).strip()
-            try:
-                if '.' in amount_str and ',' in amount_str:
-                    amount_str = amount_str.replace('.', '').replace(',', '.')
-                elif ',' in amount_str:
-                    amount_str = amount_str.replace(',', '.')
-
-                amount = float(amount_str)
-                break
-            except ValueError:
-                continue
+    amount = PDF_AMOUNT_PATTERNS.first_valid(text_content, _convert_pdf_amount)
 
     if not amount:
         try:
             lines = text_content.split('\n')
             for i, line in enumerate(lines):
                 if 'Ödenecek Tutar' in line:
-                    amount_match = re.search(r'([\d,.]+)TL', line)
+                    amount_match = PDF_LINE_AMOUNT_TL.search(line)
                     if amount_match:
-                        amount_str = amount_match.group(1)
-                        if '.' in amount_str and ',' in amount_str:
-                            amount_str = amount_str.replace('.', '').replace(',', '.')
-                        elif ',' in amount_str:
-                            amount_str = amount_str.replace(',', '.')
-                        amount = float(amount_str)
+                        amount = _convert_pdf_amount(amount_match.groups())
                         break
 
                     # If not found on same line, check next line
                     elif i + 1 < len(lines):
                         next_line = lines[i + 1]
-                        amount_match = re.search(r'([\d,.]+)', next_line)
+                        amount_match = PDF_LINE_AMOUNT.search(next_line)
                         if amount_match:
-                            amount_str = amount_match.group(1)
-                            if '.' in amount_str and ',' in amount_str:
-                                amount_str = amount_str.replace('.', '').replace(',', '.')
-                            elif ',' in amount_str:
-                                amount_str = amount_str.replace(',', '.')
-                            amount = float(amount_str)
+                            amount = _convert_pdf_amount(amount_match.groups())
                             break
         except Exception as e:
             print(f"Error in secondary amount extraction: {e}")
@@ -99,27 +73,63 @@ def extract_pdf_order_details(text_content):
     formatted_amount = f"{amount:.2f}" if amount is not None else None
 
     return {
-        'order_id': order_id or "Sipariş Numarası Bulunamadı",
-        'total_amount': formatted_amount or "Tutar Bulunamadı"
+        'order_id': order_id or MISSING_PDF_ORDER_ID,
+        'total_amount': formatted_amount or MISSING_PDF_AMOUNT
     }
 
 
-def extract_pdf_content(pdf_data):
+def decode_attachment_data(data):
+    """Gmail'in urlsafe base64 ek verisini bayta çevir (standart base64 ile de uyumlu)."""
+    if isinstance(data, (bytes, bytearray)):
+        return bytes(data)
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
 
-    try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_pdf:
-            pdf_bytes = base64.b64decode(pdf_data)
-            temp_pdf.write(pdf_bytes)
-            temp_pdf.flush()
 
-            text_content = []
+def has_pdf_order_details(text_content):
+    """Sipariş numarası ve ödenecek tutar bulunduysa kalan sayfalara gerek yoktur."""
+    return (
+        PDF_ORDER_PATTERNS.search(text_content) is not None
+        and PDF_PAYABLE_PATTERNS.search(text_content) is not None
+    )
+
 
-            with pdfplumber.open(temp_pdf.name) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text(x_tolerance=2, y_tolerance=3)
+@instrumented('ocr')
+def ocr_pages(pdf_bytes, page_numbers, known_text="", dpi=OCR_DPI):
+    """Yalnızca verilen sayfaları düşük DPI ve gri tonlamayla OCR'la; detaylar bulununca dur."""
+    ocr_text = []
+    for page_number in page_numbers:
+        images = convert_from_bytes(
+            pdf_bytes, dpi=dpi, grayscale=True, first_page=page_number, last_page=page_number
+        )
+        for image in images:
+            ocr_text.append(pytesseract.image_to_string(image, lang='tur'))
+
+        if has_pdf_order_details("\n".join([known_text] + ocr_text)):
+            break
+    return ocr_text
+
+
+def extract_pdf_content_with_source(pdf_data, ocr_dpi=OCR_DPI):
+    """PDF metnini ve onu üreten yolu ('text', 'tables', 'ocr') döndür.
+
+    Sayfalar sırayla okunur ve sipariş numarası ile ödenecek tutar bulunduğunda durulur.
+    OCR yalnızca metin katmanı olmayan sayfalara uygulanır.
+    """
+    try:
+        pdf_bytes = decode_attachment_data(pdf_data)
+        text_content = []
+        source = 'text'
+        textless_pages = []
+
+        with timed('pdfplumber'):
+            with pdfplumber.open(io.BytesIO(pdf_bytes)) as pdf:
+                page_count = len(pdf.pages)
+                for page_number, page in enumerate(pdf.pages, start=1):
+                    page_text = page.extract_text(x_tolerance=2, y_tolerance=3) or ''
                     if page_text:
                         text_content.append(page_text)
 
+                    table_rows = 0
                     if len(page_text.strip()) < 100:
                         tables = page.extract_tables()
                         for table in tables:
@@ -127,25 +137,38 @@ def extract_pdf_content(pdf_data):
                                 row_text = ' '.join(str(cell) for cell in row if cell)
                                 if row_text.strip():
                                     text_content.append(row_text)
+                                    table_rows += 1
+                                    source = 'tables'
 
-            extracted_text = "\n".join(text_content)
+                    if not page_text.strip() and not table_rows:
+                        textless_pages.append(page_number)
 
-            if not any(keyword in extracted_text for keyword in ['Ödenecek Tutar', 'Sipariş No', 'TL']):
-                images = convert_from_path(temp_pdf.name)
-                ocr_text = []
-                for image in images:
-                    text = pytesseract.image_to_string(image, lang='tur')
-                    ocr_text.append(text)
+                    if has_pdf_order_details("\n".join(text_content)):
+                        break
+
+        extracted_text = "\n".join(text_content)
+
+        if not any(keyword in extracted_text for keyword in ['Ödenecek Tutar', 'Sipariş No', 'TL']):
+            if textless_pages:
+                # Metin katmanı olan sayfaların metni korunur, yalnızca eksik sayfalar OCR'lanır.
+                ocr_text = ocr_pages(pdf_bytes, textless_pages, known_text=extracted_text, dpi=ocr_dpi)
+                extracted_text = "\n".join(text_content + ocr_text)
+            else:
+                # Metin katmanı var ama işe yaramıyor (ör. bozuk katmanlı tarama): tüm belge OCR'lanır.
+                ocr_text = ocr_pages(pdf_bytes, range(1, page_count + 1), dpi=ocr_dpi)
                 extracted_text = "\n".join(ocr_text)
+            source = 'ocr'
 
-            return extracted_text
+        return extracted_text, source
 
     except Exception as e:
         print(f"PDF processing error: {e}")
-        return ""
-    finally:
-        if 'temp_pdf' in locals() and os.path.exists(temp_pdf.name):
-            os.unlink(temp_pdf.name)
+        return "", None
+
+
+def extract_pdf_content(pdf_data):
+    """PDF metnini bellekte çıkar; pdf_data ham bayt ya da base64 dizgesi olabilir."""
+    return extract_pdf_content_with_source(pdf_data)[0]
 
 
 def process_email_attachments(message):
@@ -178,7 +201,6 @@ def process_email_attachments(message):
 
 if __name__ == "__main__":
     with open('BE02024005049284.pdf', 'rb') as f:
-        pdf_data = base64.b64encode(f.read()).decode()
-    text_content = extract_pdf_content(pdf_data)
+        text_content = extract_pdf_content(f.read())
     order_details = extract_pdf_order_details(text_content)
     print(order_details)
\ No newline at end of file
@@ -0,0 +1,215 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from metrics import capture, replay
+from pdf_cache import pdf_hash
+from pdf_processor import extract_pdf_content_with_source, extract_pdf_order_details
+
+PDF_WORKERS = int(os.environ.get("EXPENSELESS_PDF_WORKERS", os.cpu_count() or 2))
+PDF_JOB_TIMEOUT = float(os.environ.get("EXPENSELESS_PDF_JOB_TIMEOUT", 60))
+# Havuz yenilendiğinde yarıda kalan bir iş en fazla bu kadar kez çalıştırılır.
+MAX_JOB_ATTEMPTS = 3
+POLL_INTERVAL = 0.25
+
+_started_queue = None
+
+
+def process_pdf(pdf_bytes):
+    """İşçi süreçte çalışır: PDF metnini, metni üreten yolu ve sipariş detaylarını döndür."""
+    text, source = extract_pdf_content_with_source(pdf_bytes)
+    return text, source, extract_pdf_order_details(text)
+
+
+def process_pdf_in_worker(pdf_bytes):
+    """process_pdf'i çalıştırıp işçi süreçte ölçülen aşama sürelerini de döndür."""
+    with capture() as observations:
+        outcome = process_pdf(pdf_bytes)
+    return outcome, observations
+
+
+def init_worker(started_queue):
+    """İşçi süreç başlangıcı: iş başlangıçlarının bildirileceği kuyruğu sakla."""
+    global _started_queue
+    _started_queue = started_queue
+
+
+def process_pdf_job(token, pdf_bytes):
+    """İşin başladığını havuza bildirip process_pdf_in_worker'ı çalıştır."""
+    if _started_queue is not None:
+        _started_queue.put((token, os.getpid(), time.time()))
+    return process_pdf_in_worker(pdf_bytes)
+
+
+def extract_pdfs(jobs, pool=None, pdf_cache=None):
+    """{anahtar: pdf_bytes} işlerini çalıştır, {anahtar: (metin, yol, detaylar) veya None} döndür.
+
+    Aynı içerikli PDF'ler bir kez işlenir; sonuçlar SHA-256 özetiyle pdf_cache'e yazılır.
+    """
+    digests = {key: pdf_hash(pdf_bytes) for key, pdf_bytes in jobs.items()}
+    outcomes = {}
+    pending = {}
+    for key, digest in digests.items():
+        if digest in outcomes or digest in pending:
+            continue
+
+        cached = pdf_cache.get(digest) if pdf_cache is not None else None
+        if cached is not None:
+            outcomes[digest] = (cached['text'], cached['source'], cached['details'])
+        else:
+            pending[digest] = jobs[key]
+
+    if pool is not None:
+        processed = pool.map(pending)
+    else:
+        processed = {digest: process_pdf(pdf_bytes) for digest, pdf_bytes in pending.items()}
+
+    for digest, outcome in processed.items():
+        # Başarısız ayrıştırmalar (yol None) önbelleğe yazılmaz, sonraki istekte yeniden denenir.
+        if outcome is not None and outcome[1] is not None and pdf_cache is not None:
+            pdf_cache.put(digest, *outcome)
+        outcomes[digest] = outcome
+
+    return {key: outcomes.get(digest) for key, digest in digests.items()}
+
+
+class PdfWorkerPool:
+    """pdfplumber ve OCR işlerini Flask thread'i dışında, ayrı süreçlerde çalıştıran havuz.
+
+    Zaman aşımı her iş için işçide başladığı andan ölçülür; kuyrukta bekleyen iş
+    süresinden yemez. Süresi dolan işin işçisi sonlandırılır; bu, havuzun kalanını
+    da bozduğundan havuz yenilenir ve bitmemiş işler yeni havuzda tekrar çalıştırılır.
+    """
+
+    def __init__(self, max_workers=PDF_WORKERS, timeout=PDF_JOB_TIMEOUT):
+        self.max_workers = max_workers
+        self.timeout = timeout
+        # Thread'li sunucuda fork güvenli olmadığı için işçiler spawn ile başlatılır.
+        self._context = multiprocessing.get_context('spawn')
+        # İşçiler başlattıkları işi (belirteç, pid, başlangıç) olarak bu kuyruğa bildirir.
+        self._started_queue = self._context.Queue()
+        self._started = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._executor = self._new_executor()
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=self._context,
+            initializer=init_worker,
+            initargs=(self._started_queue,)
+        )
+
+    def map(self, jobs):
+        """{anahtar: pdf_bytes} işlerini paralel çalıştır, {anahtar: (metin, yol, detaylar) veya None} döndür."""
+        results = {}
+        pending = dict(jobs)
+        attempts = dict.fromkeys(jobs, 0)
+        while pending:
+            with self._lock:
+                executor, generation = self._executor, self._generation
+            futures = {}
+            for key, pdf_bytes in pending.items():
+                token = uuid.uuid4().hex
+                futures[executor.submit(process_pdf_job, token, pdf_bytes)] = (key, token)
+                attempts[key] += 1
+
+            retry = {}
+            while futures:
+                done, _ = wait(futures, timeout=POLL_INTERVAL)
+                for future in done:
+                    key, token = futures.pop(future)
+                    self._forget(token)
+                    try:
+                        outcome, observations = future.result()
+                        # pdfplumber/OCR süreleri işçi süreçte ölçülür; ana sürecin metriklerine aktarılır.
+                        replay(observations)
+                        results[key] = outcome
+                    except BrokenProcessPool:
+                        # Havuz başka bir işin zaman aşımıyla yenilendi; iş yeni havuzda tekrar denenir.
+                        if attempts[key] < MAX_JOB_ATTEMPTS:
+                            retry[key] = pending[key]
+                        else:
+                            print("PDF job failed: worker pool was restarted")
+                            results[key] = None
+                    except Exception as e:
+                        print(f"PDF worker error: {e}")
+                        results[key] = None
+
+                # Havuz yenilenirken (bu veya başka bir thread'de) kuyrukta bekleyen işler iptal edilir;
+                # wait() bunları hiç bitmiş saymaz. Hiç çalışmadıklarından deneme sayılmadan yeniden gönderilir.
+                for future in [future for future in futures if future.cancelled()]:
+                    key, token = futures.pop(future)
+                    self._forget(token)
+                    attempts[key] -= 1
+                    retry[key] = pending[key]
+
+                expired = self._expired(futures)
+                if expired:
+                    for future, pid in expired:
+                        key, token = futures.pop(future)
+                        self._forget(token)
+                        print(f"PDF job timed out after {self.timeout} seconds")
+                        results[key] = None
+                    self._recycle(generation, [pid for _, pid in expired])
+            pending = retry
+        return results
+
+    def _expired(self, futures):
+        """Çalışmaya başlayıp süresi dolan işler: [(future, işçi pid), ...]."""
+        now = time.time()
+        with self._lock:
+            while True:
+                try:
+                    token, pid, started_at = self._started_queue.get_nowait()
+                except queue.Empty:
+                    break
+                self._started[token] = (pid, started_at)
+            return [
+                (future, self._started[token][0])
+                for future, (_, token) in futures.items()
+                if token in self._started and now - self._started[token][1] > self.timeout
+            ]
+
+    def _forget(self, token):
+        with self._lock:
+            self._started.pop(token, None)
+
+    def _recycle(self, generation, pids):
+        """Takılan işçileri sonlandır ve havuzu yenile; başka bir thread zaten yenilediyse yalnızca sonlandır."""
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except OSError:
+                pass
+        with self._lock:
+            if self._generation != generation:
+                return
+            # Bir işçinin ölümü havuzu bozar; concurrent.futures kalan işçileri kendisi kapatır.
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+            self._generation += 1
+
+    def shutdown(self, wait=True):
+        with self._lock:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_pdf_worker_pool():
+    """Uygulama genelinde paylaşılan PDF işçi havuzunu döndür (ilk kullanımda oluşturulur)."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = PdfWorkerPool()
+        return _default_pool
@@ -1,29 +1,35 @@
-from googleapiclient.discovery import build
 from google.oauth2.credentials import Credentials
 import pandas as pd
 import matplotlib.pyplot as plt
 import random
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 
-from web_scraping import list_emails_with_month, get_deepest_text_payload, extract_order_details
+from gmail_fetch import build_gmail_service
+from mailbox_sync import MailboxSync, get_user_id
+from order_store import OrderStore
+from web_scraping import iter_emails_with_month, iter_full_emails, get_message_document, extract_message_details
 
 
 class GmailAnalyzer:
     """A class to analyze spending patterns from Gmail emails."""
 
-    def __init__(self, credentials_path: str):
+    def __init__(self, credentials_path: str, store: Optional[OrderStore] = None):
         """
         Initialize the Gmail analyzer with credentials.
 
         Args:
             credentials_path: Path to the Gmail API credentials file
+            store: Optional order ledger; when given, monthly data is synced into it
+                and sender totals are read from it instead of re-parsing the mailbox
         """
         self.credentials = Credentials.from_authorized_user_file(
             credentials_path,
             ["https://www.googleapis.com/auth/gmail.readonly"]
         )
-        self.service = build('gmail', 'v1', credentials=self.credentials)
+        self.service = build_gmail_service(self.credentials)
+        self.store = store
+        self.user = get_user_id(self.service) if store is not None else None
         self.logger = self.setup_logger()
 
     @staticmethod
@@ -49,24 +55,21 @@ class GmailAnalyzer:
         Returns:
             DataFrame containing sender and amount information
         """
+        if self.store is not None:
+            return self.fetch_ledger_data(keywords, year, month)
+
         try:
-            emails, _ = list_emails_with_month(self.service, keywords, year, month)
+            emails = iter_full_emails(self.service, iter_emails_with_month(self.service, keywords, year, month))
             email_data = []
 
             for email in emails:
                 try:
-                    msg_data = self.service.users().messages().get(
-                        userId='me',
-                        id=email['id']
-                    ).execute()
-
-                    payload = msg_data.get('payload', {})
                     sender = email.get('sender', '(Unknown Sender)')
-                    body_content = get_deepest_text_payload(payload)
-                    extracted_details = extract_order_details(body_content)
+                    document = get_message_document(email['message'])
+                    extractor, extracted_details = extract_message_details(email['message'], document)
                     total_amount = extracted_details['total_amount']
 
-                    if total_amount != "Tutar bulunamadı":
+                    if extractor.amount_found(extracted_details):
                         email_data.append({
                             'sender': sender,
                             'total_amount': float(total_amount)
@@ -81,6 +84,30 @@ class GmailAnalyzer:
             self.logger.error(f"Failed to fetch email data: {str(e)}")
             raise
 
+    def fetch_ledger_data(self, keywords: List[str], year: int, month: int) -> pd.DataFrame:
+        """
+        Sync the month into the order ledger and read per-sender totals from it.
+
+        Args:
+            keywords: List of keywords to filter emails
+            year: Year to analyze
+            month: Month to analyze
+
+        Returns:
+            DataFrame containing sender and amount information
+        """
+        try:
+            MailboxSync(self.service, self.store, self.user, keywords).sync_month(year, month)
+            sender_totals = self.store.sender_rollup(self.user, year, month)
+            return pd.DataFrame(
+                [row for row in sender_totals if row['total_amount']],
+                columns=['sender', 'total_amount']
+            )
+
+        except Exception as e:
+            self.logger.error(f"Failed to fetch ledger data: {str(e)}")
+            raise
+
     def visualize_by_sender(self, data: pd.DataFrame,
                             save_path: str = None,
                             min_percentage: float = 1.0) -> None:
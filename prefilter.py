@@ -0,0 +1,142 @@
+import hashlib
+import os
+import threading
+from email.utils import parseaddr
+
+from extractor_registry import message_headers, sender_domain
+from metrics import instrumented
+from query_planner import fold, known_sender_domains, learned_senders
+
+# Bu puanın altındaki mesajlar tam olarak çekilmez.
+PREFILTER_THRESHOLD = float(os.environ.get("EXPENSELESS_PREFILTER_THRESHOLD", 2))
+# Atlanan mesajların bu oranı yine de tam çekilir; kaçırılan siparişler bu örnekle ölçülür.
+PREFILTER_AUDIT_RATE = float(os.environ.get("EXPENSELESS_PREFILTER_AUDIT_RATE", 0.05))
+
+# Konu ve snippet'te aranan ifadeler ve ağırlıkları (Türkçe küçük harfe çevrilmiş metinde alt dizgi).
+RECEIPT_TERMS = {
+    'sipariş': 1, 'siparişini aldık': 2, 'siparişiniz': 1, 'sipariş özeti': 2, 'sipariş no': 2,
+    'order': 1, 'fatura': 1, 'e-fatura': 2, 'e-arşiv': 2, 'invoice': 1, 'receipt': 2, 'makbuz': 2,
+    'e-ticket': 2, 'bilet': 1, 'ödeme': 1, 'tutar': 1, 'kargoya verildi': 1,
+}
+PROMOTION_TERMS = {
+    'kampanya': 2, 'indirim': 2, 'fırsat': 2, 'kupon': 2, 'hediye': 1, 'yeni sezon': 2, 'sepetin': 2,
+    'bülten': 2, 'newsletter': 2, 'digest': 2, 'unsubscribe': 2, 'abonelik': 1, '%': 1,
+}
+CATEGORY_SCORES = {'CATEGORY_PROMOTIONS': -2, 'CATEGORY_SOCIAL': -3, 'CATEGORY_FORUMS': -3}
+KNOWN_SENDER_SCORE = 2
+# metadata yanıtında ekler görünmez; multipart/mixed gövde ek olabileceğine işaret eder.
+ATTACHMENT_SCORE = 1
+
+
+def term_score(text, terms):
+    return sum(weight for term, weight in terms.items() if term in text)
+
+
+class PrefilterStats:
+    """Ön filtre kararlarının defterdeki siparişlere göre karmaşıklık matrisi.
+
+    Geçirilen mesajlar (tp, fp) ve atlanıp denetim için yine de çekilenler (fn, tn)
+    çıkarım sonucuyla sayılır. Denetlenmeden atlananların gerçeği bilinmediğinden
+    recall, denetim örneğindeki kaçırma oranının (audit_miss_rate) tüm atlananlara
+    ölçeklenmesiyle (estimated_fn) hesaplanır; örnek yoksa ve atlanan varsa None'dır.
+    Denetlenmeden atlanıp defterde siparişi olanlar ledger_missed olarak ayrıca raporlanır.
+    """
+
+    def __init__(self):
+        self.kept = 0
+        self.skipped = 0
+        self.audited = 0
+        self.ledger_missed = 0
+        self.tp = self.fp = self.fn = self.tn = 0
+        self._lock = threading.Lock()
+
+    def record(self, predicted, actual):
+        with self._lock:
+            if predicted:
+                self.kept += 1
+                if actual:
+                    self.tp += 1
+                else:
+                    self.fp += 1
+            else:
+                self.audited += 1
+                if actual:
+                    self.fn += 1
+                else:
+                    self.tn += 1
+
+    def record_skipped(self, count, missed=0):
+        with self._lock:
+            self.skipped += count
+            self.ledger_missed += missed
+
+    def report(self):
+        with self._lock:
+            miss_rate = self.fn / self.audited if self.audited else None
+            if miss_rate is not None:
+                estimated_fn = miss_rate * (self.audited + self.skipped)
+            else:
+                estimated_fn = 0 if not self.skipped else None
+            recall = None
+            if estimated_fn is not None and self.tp + estimated_fn:
+                recall = self.tp / (self.tp + estimated_fn)
+            return {
+                'kept': self.kept,
+                'skipped': self.skipped,
+                'audited': self.audited,
+                'tp': self.tp, 'fp': self.fp, 'fn': self.fn, 'tn': self.tn,
+                'ledger_missed': self.ledger_missed,
+                'audit_miss_rate': miss_rate,
+                'estimated_fn': estimated_fn,
+                'precision': self.tp / (self.tp + self.fp) if self.tp + self.fp else None,
+                'recall': recall,
+            }
+
+
+class MessagePrefilter:
+    """Başlıklar ve snippet üzerinden, tam mesaj çekilmeden makbuz olasılığını puanlar.
+
+    Gmail'in metadata yanıtı (From, Subject, snippet, labelIds, mimeType) yeterlidir;
+    bilinen göndericiler, makbuz ifadeleri ve ek işareti puanı artırır, kampanya
+    ifadeleri ve Promosyonlar/Sosyal kategorileri düşürür.
+    """
+
+    def __init__(self, known_senders=(), threshold=PREFILTER_THRESHOLD, audit_rate=PREFILTER_AUDIT_RATE):
+        known_senders = [fold(sender) for sender in known_senders]
+        self.known_domains = {sender for sender in known_senders if '.' in sender and ' ' not in sender}
+        self.known_names = set(known_senders)
+        self.threshold = threshold
+        self.audit_rate = audit_rate
+        self.stats = PrefilterStats()
+
+    def is_known_sender(self, sender):
+        name = fold(parseaddr(sender)[0]).strip()
+        if name and name in self.known_names:
+            return True
+        labels = sender_domain(sender).split('.')
+        return any('.'.join(labels[index:]) in self.known_domains for index in range(len(labels) - 1))
+
+    def score(self, msg_data):
+        sender, subject = message_headers(msg_data)
+        text = fold(f"{subject}\n{msg_data.get('snippet', '')}")
+        score = term_score(text, RECEIPT_TERMS) - term_score(text, PROMOTION_TERMS)
+        score += sum(CATEGORY_SCORES.get(label, 0) for label in msg_data.get('labelIds', []))
+        if self.is_known_sender(sender):
+            score += KNOWN_SENDER_SCORE
+        if msg_data.get('payload', {}).get('mimeType') == 'multipart/mixed':
+            score += ATTACHMENT_SCORE
+        return score
+
+    @instrumented('prefilter')
+    def wants(self, msg_data):
+        return self.score(msg_data) >= self.threshold
+
+    def audited(self, message_id):
+        """Atlanan mesajın denetim örneğine girip girmediği; aynı mesaj için her zaman aynı karar."""
+        digest = hashlib.sha1(message_id.encode('utf-8')).digest()
+        return int.from_bytes(digest[:4], 'big') < self.audit_rate * 2 ** 32
+
+
+def build_prefilter(store, user):
+    """Kayıtlı alan adları ve defterden öğrenilen göndericilerle ön filtre oluştur."""
+    return MessagePrefilter(known_sender_domains() + learned_senders(store, user))
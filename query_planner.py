@@ -0,0 +1,187 @@
+import os
+import re
+import threading
+
+from extractor_registry import message_headers, registry
+
+# Öğrenilmiş gönderici listesi Gmail sorgu uzunluğu sınırına takılmasın diye kısıtlanır.
+ALLOWLIST_LIMIT = int(os.environ.get("EXPENSELESS_QUERY_ALLOWLIST_LIMIT", 40))
+
+# Makbuz içermeyen Gmail sekmeleri; bu kategorilerdeki mesajlar hiçbir cümlede listelenmez.
+EXCLUDED_CATEGORIES = ['promotions', 'social', 'forums']
+EXCLUDED_SENDERS = ['temu@orders.temu.com']
+PDF_ATTACHMENT_QUERY = 'has:attachment filename:pdf'
+
+# Bilinen göndericilerin yalnızca bu ifadeleri içeren mesajları listelenir; bültenleri elenir.
+RECEIPT_KEYWORDS = [
+    'sipariş', 'siparişin', 'siparişini', 'siparişiniz', 'order', 'fatura', 'e-fatura', 'e-arşiv',
+    'invoice', 'receipt', 'makbuz',
+]
+
+UNSAFE_QUERY_CHARS = re.compile(r'["()<>{}]')
+
+
+def fold(text):
+    """Türkçe büyük harfleri doğru eşleyerek küçük harfe çevir ('SİPARİŞ' -> 'sipariş')."""
+    return (text or '').replace('İ', 'i').replace('I', 'ı').lower()
+
+
+def quote_term(value):
+    """Boşluk içeren değerleri Gmail ifadesi olarak tırnakla."""
+    value = UNSAFE_QUERY_CHARS.sub(' ', value).strip()
+    return f'"{value}"' if ' ' in value or ':' in value else value
+
+
+def any_of(operator, values):
+    """[a, b] -> '(from:a OR from:b)'"""
+    prefix = f"{operator}:" if operator else ''
+    terms = [f"{prefix}{quote_term(value)}" for value in values if value]
+    if not terms:
+        return None
+    return terms[0] if len(terms) == 1 else f"({' OR '.join(terms)})"
+
+
+def all_of(*parts):
+    """Boş olmayan parçaları VE'le; biri boşsa cümle hiçbir şeyle eşleşmez (None)."""
+    return ' '.join(parts) if all(parts) else None
+
+
+def message_text(msg_data, body=''):
+    """Küçük harfe çevrilmiş konu ve snippet; tam mesajlarda body ile gövde metni de eklenir."""
+    _, subject = message_headers(msg_data)
+    return fold(f"{subject}\n{msg_data.get('snippet', '')}\n{body}")
+
+
+def contains_any(terms):
+    terms = [fold(term) for term in terms if term]
+    return lambda msg_data, text: any(term in text for term in terms)
+
+
+def from_any(senders):
+    senders = [fold(sender) for sender in senders if sender]
+    return lambda msg_data, text: any(sender in fold(message_headers(msg_data)[0]) for sender in senders)
+
+
+def iter_parts(payload):
+    yield payload
+    for part in payload.get('parts', []):
+        yield from iter_parts(part)
+
+
+def has_pdf_attachment(msg_data, text):
+    # metadata yanıtında ekler görünmez; multipart/mixed gövde ek olabileceğine işaret eder.
+    payload = msg_data.get('payload', {})
+    if 'parts' not in payload:
+        return payload.get('mimeType') == 'multipart/mixed'
+    return any(part.get('filename', '').lower().endswith('.pdf') for part in iter_parts(payload))
+
+
+class QueryClause:
+    """Planın tek bir Gmail sorgu parçası ve yerel karşılığı: matches(msg_data, message_text(...))."""
+
+    def __init__(self, name, query, matches):
+        self.name = name
+        self.query = query
+        self.matches = matches
+
+    def __repr__(self):
+        return f"QueryClause({self.name!r}, {self.query!r})"
+
+
+class QueryPlan:
+    """Gevşek anahtar kelime sorgusu yerine çalıştırılan, birbirini tamamlayan Gmail sorgu cümleleri.
+
+    Cümleler tek sorguda OR'lanır ve dışlamalar hepsine uygulanır; ay başına tek
+    listeleme çağrısı yapılır. Cümlelerin katkısı listelenen mesajların metadata'sı
+    üzerinde yerel olarak ölçülür: bir mesaj eşleşen ilk cümleye atfedilir, hiçbirine
+    uymuyorsa (Gmail gövdede de arar) son cümleye. report() cümle başına eşleşen
+    (matched), atfedilen (listed) ve sipariş çıkan (orders) mesaj sayılarını döndürür.
+    """
+
+    def __init__(self, clauses, excluded_senders=(), excluded_categories=()):
+        self.clauses = [clause for clause in clauses if clause.query]
+        self.excluded_senders = [fold(sender) for sender in excluded_senders]
+        self.excluded_labels = {f"CATEGORY_{category.upper()}" for category in excluded_categories}
+        self.exclusions = [f"-from:{sender}" for sender in excluded_senders]
+        self.exclusions += [f"-category:{category}" for category in excluded_categories]
+        self._counts = {clause.name: {'matched': 0, 'listed': 0, 'orders': 0} for clause in self.clauses}
+        self._lock = threading.Lock()
+
+    def query(self, query=None):
+        """Planın tek Gmail sorgusu; query dönem gibi ortak kısıtlardır."""
+        if not self.clauses:
+            return None
+        clauses = ' OR '.join(f"({clause.query})" for clause in self.clauses)
+        return ' '.join(part for part in [f"({clauses})", query] + self.exclusions if part)
+
+    def attribute(self, msg_data):
+        """Listelenen mesajı bir cümleye atfedip say; cümlenin adını döndür."""
+        if not self.clauses:
+            return None
+        text = message_text(msg_data)
+        matched = [clause.name for clause in self.clauses if clause.matches(msg_data, text)]
+        clause = matched[0] if matched else self.clauses[-1].name
+        with self._lock:
+            for name in matched:
+                self._counts[name]['matched'] += 1
+            self._counts[clause]['listed'] += 1
+        return clause
+
+    def matches(self, msg_data, body=''):
+        """Sorgunun tam mesaj üzerindeki yerel karşılığı (ör. history ile gelen mesajlar için).
+
+        Dışlananlara None, aksi halde eşleşen ilk cümlenin adını döndürür; sayaçlar değişmez.
+        """
+        sender = fold(message_headers(msg_data)[0])
+        if any(excluded in sender for excluded in self.excluded_senders):
+            return None
+        if self.excluded_labels.intersection(msg_data.get('labelIds', [])):
+            return None
+        text = message_text(msg_data, body)
+        return next((clause.name for clause in self.clauses if clause.matches(msg_data, text)), None)
+
+    def record(self, clause, orders=0):
+        if clause not in self._counts:
+            return
+        with self._lock:
+            self._counts[clause]['orders'] += orders
+
+    def report(self):
+        with self._lock:
+            return {
+                clause.name: {'query': clause.query, **self._counts[clause.name]}
+                for clause in self.clauses
+            }
+
+
+def learned_senders(store, user, limit=ALLOWLIST_LIMIT):
+    """Defterde geçerli sipariş üretmiş gönderici adları."""
+    return [
+        row['sender'] for row in store.order_senders(user, limit)
+        if row['sender'] and not row['sender'].startswith('(')
+    ]
+
+
+def known_sender_domains():
+    """Özel çıkarıcısı kayıtlı göndericilerin alan adları."""
+    return [domain for extractor in registry for domain in extractor.domains]
+
+
+def build_query_plan(store, user, keywords):
+    """Kayıtlı alan adları, defterden öğrenilen göndericiler, PDF ekleri ve anahtar kelimelerden plan oluştur."""
+    senders = list(dict.fromkeys(known_sender_domains() + learned_senders(store, user)))
+    receipt_terms = list(dict.fromkeys(keywords + RECEIPT_KEYWORDS))
+    from_sender, receipt = from_any(senders), contains_any(receipt_terms)
+    return QueryPlan(
+        [
+            QueryClause(
+                'known_senders', all_of(any_of('from', senders), any_of(None, receipt_terms)),
+                lambda msg_data, text: from_sender(msg_data, text) and receipt(msg_data, text)
+            ),
+            QueryClause('pdf_attachments', PDF_ATTACHMENT_QUERY, has_pdf_attachment),
+            # Çok kelimeli anahtarlar tırnaklanır; aksi halde Gmail OR'u kelimeler arasına bağlar.
+            QueryClause('keywords', any_of(None, keywords), contains_any(keywords)),
+        ],
+        excluded_senders=EXCLUDED_SENDERS,
+        excluded_categories=EXCLUDED_CATEGORIES
+    )
@@ -0,0 +1,128 @@
+import os
+import sqlite3
+import threading
+import time
+
+# Okumalarda biriken erişim zamanları bu sayıya ulaşınca toplu yazılır.
+TOUCH_BATCH = int(os.environ.get("EXPENSELESS_CACHE_TOUCH_BATCH", 256))
+
+
+class SqliteLru:
+    """Toplam boyutu max_bytes ile sınırlı, en uzun süredir kullanılmayanı silen SQLite tablosu.
+
+    MessageCache, PdfCache ve ChartCache bunun üzerine kuruludur. Toplam boyut bellekte
+    tutulur; her yazmada tablo taranmaz, yalnızca sınır aşıldığında diskteki gerçek
+    toplam okunup en eski kayıtlar silinir. Okumalar diske yazmaz: erişim zamanları
+    bellekte biriktirilir ve bir sonraki yazmada, TOUCH_BATCH dolduğunda veya close()
+    ile topluca güncellenir. Süreç kapanmadan yazılmayanlar LRU sırasını yalnızca yaklaşık kılar.
+
+    keys anahtar sütunlarının adları, values {sütun adı: SQL tipi} sözlüğüdür; anahtarlar
+    lookup/store'a sütun sırasıyla tuple olarak verilir.
+    """
+
+    def __init__(self, path, table, keys, values, max_bytes):
+        self.path = path
+        self.table = table
+        self.keys = tuple(keys)
+        self.values = tuple(values)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._touched = {}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        columns = [f"{key} TEXT NOT NULL" for key in self.keys]
+        columns += [f"{name} {sql_type}" for name, sql_type in values.items()]
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            f"{', '.join(columns)}, size INTEGER NOT NULL, accessed_at REAL NOT NULL, "
+            f"PRIMARY KEY ({', '.join(self.keys)}))"
+        )
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_accessed ON {table} (accessed_at)")
+        self._conn.commit()
+
+        self._where = ' AND '.join(f"{key} = ?" for key in self.keys)
+        self._total = self._stored_bytes()
+
+    def lookup(self, key):
+        """Anahtarın değer sütunlarını tuple olarak döndür; yoksa None."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(self.values)} FROM {self.table} WHERE {self._where}", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._touch(key)
+        return row
+
+    def touch(self, key):
+        """Kaydı diske uğramadan kullanılmış say (ör. üstteki bellek katmanında bulunduğunda)."""
+        with self._lock:
+            self._touch(key)
+
+    def store(self, key, values, size):
+        """Kaydı ekle veya değiştir; sınır aşılırsa en eski kayıtları sil."""
+        with self._lock:
+            previous = self._conn.execute(
+                f"SELECT size FROM {self.table} WHERE {self._where}", key
+            ).fetchone()
+            self._touched.pop(key, None)
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                f"({', '.join(self.keys + self.values)}, size, accessed_at) "
+                f"VALUES ({', '.join('?' * (len(self.keys) + len(self.values) + 2))})",
+                (*key, *values, size, time.time())
+            )
+            self._total += size - (previous[0] if previous else 0)
+            self._flush_touches()
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _touch(self, key):
+        self._touched[key] = time.time()
+        if len(self._touched) >= TOUCH_BATCH:
+            self._flush_touches()
+            self._conn.commit()
+
+    def _stored_bytes(self):
+        return self._conn.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+
+    def _flush_touches(self):
+        if not self._touched:
+            return
+        self._conn.executemany(
+            f"UPDATE {self.table} SET accessed_at = ? WHERE {self._where}",
+            [(accessed_at, *key) for key, accessed_at in self._touched.items()]
+        )
+        self._touched.clear()
+
+    def _evict(self):
+        # Aynı dosyayı başka süreçler de yazabildiğinden silmeden önce gerçek toplam okunur.
+        self._total = self._stored_bytes()
+        if self._total <= self.max_bytes:
+            return
+
+        expired = []
+        rows = self._conn.execute(f"SELECT {', '.join(self.keys)}, size FROM {self.table} ORDER BY accessed_at")
+        for *key, size in rows:
+            if self._total <= self.max_bytes:
+                break
+            expired.append(tuple(key))
+            self._total -= size
+        self._conn.executemany(f"DELETE FROM {self.table} WHERE {self._where}", expired)
+
+    def flush(self):
+        """Biriken erişim zamanlarını diske yaz."""
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_touches()
+            self._conn.commit()
+            self._conn.close()
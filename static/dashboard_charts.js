@@ -0,0 +1,246 @@
+// /api/summary çıktısından dashboard grafiklerini tarayıcıda çizer (sunucuda matplotlib çalışmaz).
+(function () {
+    const COLORS = [
+        '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40',
+        '#C9CBCF', '#8BC34A', '#FF5722', '#795548', '#00BCD4', '#E91E63'
+    ];
+
+    function setupCanvas(canvas) {
+        const ratio = window.devicePixelRatio || 1;
+        const width = canvas.clientWidth;
+        const height = canvas.clientHeight;
+        canvas.width = width * ratio;
+        canvas.height = height * ratio;
+        const ctx = canvas.getContext('2d');
+        ctx.scale(ratio, ratio);
+        return { ctx, width, height };
+    }
+
+    // visualization.render_pie_chart ile aynı: %2'nin altındaki dilimler "Diğer" altında toplanır.
+    function groupSenders(senders) {
+        const total = senders.reduce((sum, row) => sum + row.total_amount, 0);
+        if (total <= 0) {
+            return [];
+        }
+        const slices = [];
+        let other = 0;
+        senders
+            .slice()
+            .sort((a, b) => b.total_amount - a.total_amount)
+            .forEach((row) => {
+                if (row.total_amount / total * 100 < 2) {
+                    other += row.total_amount;
+                } else {
+                    slices.push({ label: row.sender, value: row.total_amount });
+                }
+            });
+        if (other > 0) {
+            slices.push({ label: 'Diğer', value: other });
+        }
+        return slices.map((slice) => ({ ...slice, percent: slice.value / total * 100 }));
+    }
+
+    function drawPie(canvas, senders) {
+        const slices = groupSenders(senders);
+        if (!slices.length) {
+            return;
+        }
+        const { ctx, width, height } = setupCanvas(canvas);
+        const cx = width / 2;
+        const cy = height / 2 + 10;
+        const radius = Math.min(width, height) / 2 - 60;
+
+        ctx.fillStyle = '#1e293b';
+        ctx.font = 'bold 14px Arial';
+        ctx.textAlign = 'center';
+        ctx.fillText('Göndericiye Göre Harcama Dağılımı', cx, 20);
+
+        let angle = -Math.PI / 2;
+        slices.forEach((slice, i) => {
+            const sweep = slice.percent / 100 * Math.PI * 2;
+            ctx.beginPath();
+            ctx.moveTo(cx, cy);
+            ctx.arc(cx, cy, radius, angle, angle + sweep);
+            ctx.closePath();
+            ctx.fillStyle = COLORS[i % COLORS.length];
+            ctx.fill();
+            ctx.strokeStyle = 'white';
+            ctx.lineWidth = 2;
+            ctx.stroke();
+
+            const middle = angle + sweep / 2;
+            const x = Math.cos(middle);
+            const y = Math.sin(middle);
+            ctx.font = 'bold 10px Arial';
+            ctx.textAlign = 'center';
+            ctx.fillStyle = slice.percent > 10 ? 'white' : 'black';
+            ctx.fillText(`${slice.percent.toFixed(1)}%`, cx + x * radius * 0.6, cy + y * radius * 0.6);
+
+            ctx.font = '10px Arial';
+            ctx.textAlign = x > 0 ? 'left' : 'right';
+            ctx.fillStyle = '#1e293b';
+            ctx.fillText(slice.label, cx + x * radius * 1.1, cy + y * radius * 1.1);
+            angle += sweep;
+        });
+    }
+
+    function drawLines(canvas, title, labels, series) {
+        if (!labels.length) {
+            return;
+        }
+        const { ctx, width, height } = setupCanvas(canvas);
+        const pad = { left: 60, right: 20, top: 40, bottom: 50 };
+        const plotWidth = width - pad.left - pad.right;
+        const plotHeight = height - pad.top - pad.bottom;
+        const maxValue = Math.max(1, ...series.flatMap((line) => line.values));
+        const xAt = (i) => pad.left + (labels.length > 1 ? i / (labels.length - 1) : 0.5) * plotWidth;
+        const yAt = (value) => pad.top + plotHeight - value / maxValue * plotHeight;
+
+        ctx.fillStyle = '#1e293b';
+        ctx.font = '14px Arial';
+        ctx.textAlign = 'center';
+        ctx.fillText(title, width / 2, 20);
+
+        ctx.strokeStyle = '#e2e8f0';
+        ctx.lineWidth = 1;
+        ctx.font = '10px Arial';
+        ctx.textAlign = 'right';
+        for (let step = 0; step <= 4; step++) {
+            const value = maxValue * step / 4;
+            ctx.beginPath();
+            ctx.moveTo(pad.left, yAt(value));
+            ctx.lineTo(width - pad.right, yAt(value));
+            ctx.stroke();
+            ctx.fillText(value.toFixed(0), pad.left - 6, yAt(value) + 3);
+        }
+        ctx.textAlign = 'center';
+        const every = Math.ceil(labels.length / 12);
+        labels.forEach((label, i) => {
+            if (i % every === 0) {
+                ctx.fillText(label, xAt(i), height - pad.bottom + 16);
+            }
+        });
+
+        series.forEach((line, index) => {
+            ctx.strokeStyle = line.color;
+            ctx.fillStyle = line.color;
+            ctx.lineWidth = index === 0 ? 2.5 : 1.5;
+            ctx.setLineDash(index === 0 ? [] : [6, 4]);
+            ctx.beginPath();
+            line.values.forEach((value, i) => {
+                if (i === 0) {
+                    ctx.moveTo(xAt(i), yAt(value));
+                } else {
+                    ctx.lineTo(xAt(i), yAt(value));
+                }
+            });
+            ctx.stroke();
+            ctx.setLineDash([]);
+            line.values.forEach((value, i) => {
+                ctx.beginPath();
+                ctx.arc(xAt(i), yAt(value), 3, 0, Math.PI * 2);
+                ctx.fill();
+            });
+            ctx.textAlign = 'left';
+            ctx.fillText(line.label, pad.left + index * 90, height - 10);
+        });
+    }
+
+    function renderSummary(summary) {
+        const pie = document.getElementById('pieChart');
+        const line = document.getElementById('lineChart');
+        if (pie) {
+            drawPie(pie, summary.senders);
+        }
+        if (!line) {
+            return;
+        }
+        if (summary.monthly) {
+            const labels = summary.monthly.map((row) => row.month);
+            const series = [{ label: 'Toplam', color: COLORS[1], values: summary.monthly.map((row) => row.total) }];
+            Object.entries(summary.source_trend || {}).forEach(([source, values], i) => {
+                series.push({ label: source, color: COLORS[(i + 2) % COLORS.length], values });
+            });
+            drawLines(line, `Aylık Harcama Trendi - ${summary.period}`, labels, series);
+        } else {
+            const labels = summary.daily.map((row) => String(row.day));
+            const series = [{ label: 'Toplam', color: COLORS[1], values: summary.daily.map((row) => row.total) }];
+            drawLines(line, `Harcama Trendleri - ${summary.period}`, labels, series);
+        }
+    }
+
+    function formatMoney(value) {
+        return '₺' + value.toLocaleString('en-US', { minimumFractionDigits: 2, maximumFractionDigits: 2 });
+    }
+
+    function setText(id, text) {
+        const element = document.getElementById(id);
+        if (element) {
+            element.textContent = text;
+        }
+    }
+
+    function renderOrders(orders) {
+        const list = document.getElementById('expensesList');
+        if (!list || !orders.length) {
+            return;
+        }
+        list.replaceChildren(...orders.map((order) => {
+            const item = document.createElement('li');
+            [['Sender', order.sender], ['Date', order.date],
+             ['Total Amount', order.total_amount ? order.total_amount : 'Amount not available']]
+                .forEach(([label, value], i) => {
+                    if (i > 0) {
+                        item.appendChild(document.createElement('br'));
+                    }
+                    const strong = document.createElement('strong');
+                    strong.textContent = `${label}:`;
+                    item.append(strong, ` ${value}`);
+                });
+            return item;
+        }));
+    }
+
+    // Senkronizasyon işi sürerken defterdeki kısmi sonuçlarla KPI'ları, listeyi ve grafikleri günceller.
+    function updateFromSummary(summary) {
+        setText('kpiTotal', formatMoney(summary.kpis.total));
+        setText('kpiCount', String(summary.kpis.count));
+        setText('kpiDaily', formatMoney(summary.kpis.daily_average));
+        if (summary.kpis.monthly_average !== undefined) {
+            setText('kpiMonthly', formatMoney(summary.kpis.monthly_average));
+        }
+        renderOrders(summary.orders);
+
+        if (!summary.orders.length) {
+            return;
+        }
+        const noData = document.getElementById('noData');
+        if (noData) {
+            noData.style.display = 'none';
+        }
+        document.querySelectorAll('.summary-chart').forEach((box) => {
+            box.style.display = '';
+        });
+        renderSummary(summary);
+    }
+
+    function pollIngestJob(url, intervalMs = 2000) {
+        fetch(url, { headers: { Accept: 'application/json' } })
+            .then((response) => (response.ok ? response.json() : Promise.reject(response.status)))
+            .then(({ job, summary }) => {
+                updateFromSummary(summary);
+                if (job.status === 'running') {
+                    setText('jobStatus',
+                        `Syncing mailbox… ${job.months_done}/${job.months_total} months, ` +
+                        `${job.emails_processed} emails, ${job.orders_found} orders`);
+                    setTimeout(() => pollIngestJob(url, intervalMs), intervalMs);
+                } else {
+                    setText('jobStatus', job.status === 'done' ? 'Mailbox is up to date.' : `Sync failed: ${job.error}`);
+                }
+            })
+            .catch((error) => setText('jobStatus', `Sync status unavailable (${error})`));
+    }
+
+    window.renderDashboardSummary = renderSummary;
+    window.pollIngestJob = pollIngestJob;
+})();
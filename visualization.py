@@ -1,17 +1,39 @@
-import matplotlib
-
-matplotlib.use('Agg')
-import matplotlib.pyplot as plt
 import io
 import base64
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from chart_cache import chart_key
+from metrics import instrumented
+
+CHART_RENDER_WORKERS = int(os.environ.get("EXPENSELESS_CHART_RENDER_WORKERS", 4))
 
 VIBRANT_COLORS = [
     '#FF6384', '#36A2EB', '#FFCE56', '#4BC0C0', '#9966FF', '#FF9F40',
     '#C9CBCF', '#8BC34A', '#FF5722', '#795548', '#00BCD4', '#E91E63'
 ]
 
-def generate_pie_chart(data):
+
+def _new_figure(figsize):
+    """pyplot durum makinesine dokunmadan, kendi Agg tuvaline bağlı bir Figure oluştur.
+
+    Her çağrı kendi Figure nesnesiyle çalıştığından grafikler thread'ler arasında
+    paralel çizilebilir.
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig, fig.subplots()
+
+
+@instrumented('chart_render')
+def render_pie_chart(data):
+    """Gönderici dağılımı pasta grafiğini PNG baytları olarak çiz."""
     try:
         if data.empty or 'sender' not in data.columns or 'total_amount' not in data.columns:
             return None
@@ -29,8 +51,7 @@ def generate_pie_chart(data):
             grouped_data['Diğer'] = other_amount
             percentages['Diğer'] = small_segments.sum()
 
-        plt.clf()
-        fig, ax = plt.subplots(figsize=(8, 8))
+        fig, ax = _new_figure(figsize=(8, 8))
 
         wedges, texts = ax.pie(
             grouped_data.values,
@@ -58,15 +79,15 @@ def generate_pie_chart(data):
             ax.text(label_x, label_y, f'{grouped_data.index[i]}',
                     ha=ha, va='center', fontsize=10)
 
-        plt.title('Göndericiye Göre Harcama Dağılımı', pad=20, size=14, weight='bold')
+        ax.set_title('Göndericiye Göre Harcama Dağılımı', pad=20, size=14, weight='bold')
 
         fig.patch.set_facecolor('none')
         fig.patch.set_alpha(0)
         ax.axis('equal')
 
-        plt.tight_layout(pad=2.0)
+        fig.tight_layout(pad=2.0)
         buffer = io.BytesIO()
-        plt.savefig(
+        fig.savefig(
             buffer,
             format='png',
             bbox_inches='tight',
@@ -77,18 +98,19 @@ def generate_pie_chart(data):
         buffer.seek(0)
         image_png = buffer.getvalue()
         buffer.close()
-        plt.close()
 
-        return base64.b64encode(image_png).decode('utf-8')
+        return image_png
 
     except Exception as e:
         print(f"Error generating pie chart: {e}")
         return None
 
-def generate_line_chart(daily_expenses, month_name):
+
+@instrumented('chart_render')
+def render_line_chart(daily_expenses, month_name):
+    """Ayın günlük harcama grafiğini PNG baytları olarak çiz."""
     try:
-        plt.clf()
-        fig, ax = plt.subplots(figsize=(8, 4))
+        fig, ax = _new_figure(figsize=(8, 4))
 
         ax.plot(
             daily_expenses.index,
@@ -108,7 +130,7 @@ def generate_line_chart(daily_expenses, month_name):
             spine.set_visible(False)
 
         buffer = io.BytesIO()
-        plt.savefig(
+        fig.savefig(
             buffer,
             format='png',
             bbox_inches='tight',
@@ -118,12 +140,131 @@ def generate_line_chart(daily_expenses, month_name):
         buffer.seek(0)
         image_png = buffer.getvalue()
         buffer.close()
-        plt.close()
 
-        return base64.b64encode(image_png).decode('utf-8')
+        return image_png
 
     except Exception as e:
         print(f"Error generating line chart: {e}")
         return None
 
 
+@instrumented('chart_render')
+def render_trend_chart(monthly, source_trend):
+    """Aylık toplam harcamayı ve kaynak bazında aylık harcamaları tek bir çizgi grafikte göster."""
+    try:
+        if monthly.empty:
+            return None
+
+        fig, ax = _new_figure(figsize=(8, 4))
+
+        labels = [period.strftime('%Y-%m') for period in monthly.index]
+        positions = np.arange(len(labels))
+
+        ax.plot(
+            positions,
+            monthly['total'].to_numpy(),
+            marker='o',
+            linestyle='-',
+            linewidth=2.5,
+            color='#36A2EB',
+            label='Toplam'
+        )
+        for i, source in enumerate(source_trend.columns):
+            ax.plot(
+                positions,
+                source_trend[source].to_numpy(),
+                marker='.',
+                linestyle='--',
+                color=VIBRANT_COLORS[(i + 2) % len(VIBRANT_COLORS)],
+                label=source
+            )
+
+        ax.set_xticks(positions)
+        ax.set_xticklabels(labels, rotation=45, ha='right')
+        ax.set_title(f'Aylık Harcama Trendi - {labels[0]} / {labels[-1]}', pad=20)
+        ax.set_xlabel('Ay')
+        ax.set_ylabel('Harcama Tutarı (TL)')
+        ax.grid(True)
+        ax.legend()
+
+        fig.patch.set_facecolor('none')
+        fig.patch.set_alpha(0)
+        for spine in ax.spines.values():
+            spine.set_visible(False)
+
+        buffer = io.BytesIO()
+        fig.savefig(
+            buffer,
+            format='png',
+            bbox_inches='tight',
+            dpi=80,
+            transparent=True
+        )
+        buffer.seek(0)
+        image_png = buffer.getvalue()
+        buffer.close()
+
+        return image_png
+
+    except Exception as e:
+        print(f"Error generating trend chart: {e}")
+        return None
+
+
+def _encode(png):
+    return base64.b64encode(png).decode('utf-8') if png is not None else None
+
+
+def generate_pie_chart(data):
+    return _encode(render_pie_chart(data))
+
+
+def generate_line_chart(daily_expenses, month_name):
+    return _encode(render_line_chart(daily_expenses, month_name))
+
+
+class ChartRenderPool:
+    """Grafikleri thread havuzunda paralel çizen havuz; çizimler global pyplot durumu kullanmaz."""
+
+    def __init__(self, max_workers=CHART_RENDER_WORKERS):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chart-render')
+
+    def map(self, jobs):
+        """[(render, girdiler), ...] işlerini paralel çiz, PNG baytlarını aynı sırada döndür."""
+        # İstek bağlamı kopyalanır; çizim süreleri isteğin zamanlama dökümüne de yazılır.
+        futures = [self._executor.submit(contextvars.copy_context().run, render, *inputs) for render, inputs in jobs]
+        return [future.result() for future in futures]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+def render_cached_charts(cache, pool, jobs):
+    """[(tür, render, girdiler), ...] için önbellekte olmayanları havuzda birlikte çiz; özet anahtarlarını döndür.
+
+    Çizimi başarısız olan grafiklerin anahtarı None olur.
+    """
+    digests = [chart_key(kind, *inputs) for kind, _, inputs in jobs]
+    missing = [i for i, digest in enumerate(digests) if cache.get(digest) is None]
+    rendered = pool.map([(jobs[i][1], jobs[i][2]) for i in missing])
+
+    for i, png in zip(missing, rendered):
+        if png is None:
+            digests[i] = None
+        else:
+            cache.put(digests[i], png)
+    return digests
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_chart_render_pool():
+    """Uygulama genelinde paylaşılan grafik çizim havuzunu döndür (ilk kullanımda oluşturulur)."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = ChartRenderPool()
+        return _default_pool
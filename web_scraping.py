@@ -1,109 +1,161 @@
-import base64
 import calendar
 import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from itertools import islice
 
 from bs4 import BeautifulSoup
 from google.oauth2.credentials import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from pdf_processor import extract_pdf_content, process_email_attachments, extract_pdf_order_details
+from extraction_engine import (
+    ORDER_ID_PATTERNS, AMOUNT_PATTERNS, TRENDYOL_ORDER_ID_PATTERNS, TRENDYOL_AMOUNT_PATTERNS,
+    TRENDYOL_ORDER_CLASS, TRENDYOL_AMOUNT_CLASS, BERSHKA_ORDER_ID_PATTERNS, BERSHKA_AMOUNT_PATTERNS,
+    AMAZON_ORDER_ID, AMAZON_AMOUNT_PATTERNS, WHITESPACE, last_group
+)
+from email_document import EmailDocument, SOUP_PARSER
+from extractor_registry import find_extractor, register_extractor, register_fallback
+from metrics import timed
+from gmail_fetch import BATCH_SIZE, fetch_messages, fetch_attachment, build_thread_http, list_messages
+from order_store import MISSING_ORDER_ID
+from pdf_processor import (
+    MISSING_PDF_ORDER_ID, MISSING_PDF_AMOUNT, process_email_attachments, decode_attachment_data,
+    extract_pdf_order_details
+)
+from pdf_cache import get_pdf_cache
+from pdf_workers import extract_pdfs, get_pdf_worker_pool
+
+# messages.list tek sayfada en fazla 500 sonuç döndürür.
+PAGE_SIZE = 100
 
 
 def get_deepest_text_payload(payload):
-    texts = []
-
-    def extract_text(part):
-        if 'parts' in part:
-            for subpart in part['parts']:
-                extract_text(subpart)
-        else:
-            mime_type = part.get('mimeType')
-            data = part.get('body', {}).get('data')
-            if mime_type in ['text/plain', 'text/html'] and data:
-                try:
-                    decoded = base64.urlsafe_b64decode(data).decode('utf-8', errors='replace')
-                    texts.append((mime_type, decoded))
-                except Exception:
-                    pass
-
-    extract_text(payload)
-
-    plain_texts = [text for mime, text in texts if mime == 'text/plain']
-    html_texts = [text for mime, text in texts if mime == 'text/html']
-
-    if plain_texts:
-        full_text = ' '.join(plain_texts)
-    elif html_texts:
-        soup = BeautifulSoup(html_texts[0], 'html.parser')
-        full_text = soup.get_text(separator=' ', strip=True)
-    else:
-        return ""
+    return EmailDocument(payload).text
 
-    full_text = re.sub(r'\s+', ' ', full_text).strip()
-    return full_text
 
+def get_message_document(msg_data, cache=None):
+    """Mesaj için paylaşılan EmailDocument'i üret; düz metin mesaj id'sine göre önbelleklenir."""
+    msg_id = msg_data.get('id')
+    text = cache.get_text(msg_id) if cache is not None and msg_id else None
 
+    document = EmailDocument(msg_data.get('payload', {}), text=text)
+    if text is None and cache is not None and msg_id:
+        cache.put_text(msg_id, document.text)
+    return document
 
-def extract_order_id(full_text):
-    order_id_patterns = [
-        r'(Sipariş Numarası[:#]?|Sipariş No[:#]?|Order ID[:#]?|Order Number[:#]?)[^\d]*(\d+)',
-        r'(SİPARİŞ NO[:#\.]?|Order ID[:#\.]?)[^\d]*(\d+)',
-        r'#(\d+)',
-        r'(\d+)\s+numaralı\s+siparişini\s+aldık',
-        r"Sipariş No\.?\s*(\d+-\d+-\d+)",
-        r"#(\d{3}-\d{7}-\d{7})",
-        r'(?:Sipariş|Order|Invoice|Fatura)[^0-9]*?(\d+)',
-    ]
 
-    for pattern in order_id_patterns:
-        match = re.search(pattern, full_text, re.IGNORECASE)
-        if match:
-            if match.lastindex >= 2:
-                return match.group(2)
-            else:
-                return match.group(1)
-    return None
+def get_message_text(msg_data, cache=None):
+    """get_deepest_text_payload sonucunu mesaj id'sine göre önbellekten döndür."""
+    return get_message_document(msg_data, cache).text
 
 
-def extract_amount(full_text):
-    text = full_text.replace('\n', ' ').replace('\r', ' ')
-    text = re.sub(r'\s+', ' ', text)
+def get_cached_details(extractor, content, message_id=None, cache=None):
+    """Çıkarım fonksiyonunu çalıştır; sonucu mesaj id ve fonksiyon adına göre önbellekle."""
+    if cache is None or not message_id:
+        return extractor(content)
 
-    general_patterns = [
-        r'(?:Ara toplam|Toplam|Tutar|Amount|Total)[^0-9₺TL$USD€EUR]*?([\d.,]+)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
-        r'([\d.,]+)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
-        r'[₺$€]\s*([\d.,]+)',
-        r"KDV Dahil Sipariş Toplamı:\s*([\d.,]+)\s*TL",
-        r'(?:Toplam Tutar|Ara Toplam|Total Amount)[^0-9]*?([\d.,]+)\s*(?:TL|TRY|₺|\$|USD|€|EUR)',
-    ]
+    details = cache.get_details(message_id, extractor.__name__)
+    if details is None:
+        details = extractor(content)
+        cache.put_details(message_id, extractor.__name__, details)
+    return details
 
-    for pattern in general_patterns:
-        matches = re.finditer(pattern, text, re.IGNORECASE)
-        for match in matches:
-            amount_str = match.group(1).strip()
-            try:
-                if '.' in amount_str and ',' in amount_str:
-                    amount_str = amount_str.replace('.', '').replace(',', '.')
-                elif ',' in amount_str:
-                    amount_str = amount_str.replace(',', '.')
-                amount = float(amount_str)
-                if amount < 10 and '.' in amount_str:
-                    amount *= 1000
-                return f"{amount:.2f}"
-            except ValueError:
+
+def extract_attachments_order_details(service, attachments, cache=None, pool=None, pdf_cache=None):
+    """(mesaj id, ek id) çiftlerinin PDF detaylarını çıkar; pool verilirse işler paralel dağıtılır.
+
+    İndirme ve ayrıştırma önbelleklenir. {(mesaj id, ek id): detaylar veya None} döndürür.
+    """
+    results = {}
+    jobs = {}
+    for message_id, attachment_id in attachments:
+        key = (message_id, attachment_id)
+        if cache is not None:
+            details = cache.get_details(message_id, 'extract_pdf_order_details', attachment_id)
+            if details is not None:
+                results[key] = details
                 continue
+
+        try:
+            pdf_data = fetch_attachment(service, message_id, attachment_id, cache=cache)
+        except HttpError as e:
+            print(f"Gmail API error when fetching attachment {attachment_id} of {message_id}: {e}")
+            pdf_data = None
+
+        if not pdf_data:
+            results[key] = None
+            continue
+        jobs[key] = decode_attachment_data(pdf_data)
+
+    outcomes = extract_pdfs(jobs, pool=pool, pdf_cache=pdf_cache)
+
+    for (message_id, attachment_id), outcome in outcomes.items():
+        details = outcome[2] if outcome else None
+        if details is not None and cache is not None:
+            cache.put_details(message_id, 'extract_pdf_order_details', details, attachment_id)
+        results[(message_id, attachment_id)] = details
+
+    return results
+
+
+def extract_attachment_order_details(service, message_id, attachment_id, cache=None, pool=None, pdf_cache=None):
+    """PDF ekini indirip sipariş detaylarını çıkar; indirme ve ayrıştırma önbelleklenir."""
+    results = extract_attachments_order_details(service, [(message_id, attachment_id)], cache, pool, pdf_cache)
+    return results[(message_id, attachment_id)]
+
+
+def extract_order_id(full_text):
+    match = ORDER_ID_PATTERNS.search(full_text)
+    if match:
+        return last_group(match[1])
     return None
 
 
+def _convert_amount(groups):
+    amount_str = groups[0].strip()
+    if '.' in amount_str and ',' in amount_str:
+        amount_str = amount_str.replace('.', '').replace(',', '.')
+    elif ',' in amount_str:
+        amount_str = amount_str.replace(',', '.')
+    amount = float(amount_str)
+    if amount < 10 and '.' in amount_str:
+        amount *= 1000
+    return f"{amount:.2f}"
+
+
+def extract_amount(full_text, normalized=False):
+    text = full_text
+    if not normalized:
+        text = full_text.replace('\n', ' ').replace('\r', ' ')
+        text = WHITESPACE.sub(' ', text)
+    return AMOUNT_PATTERNS.first_valid(text, _convert_amount, all_matches=True)
+
 
+def _convert_price(groups):
+    """Ondalık ayırıcıyı konumundan belirleyerek tutarı çevir ('1.234,56', '1,234.56', '1.234' -> 1234)."""
+    amount_str = groups[0].strip()
+    decimal = max(amount_str.rfind(','), amount_str.rfind('.'))
+    if decimal != -1 and len(amount_str) - decimal - 1 not in (1, 2):
+        # Ayırıcıdan sonra 3 hane varsa binlik ayırıcıdır.
+        decimal = -1
+    whole = amount_str[:decimal] if decimal != -1 else amount_str
+    fraction = amount_str[decimal + 1:] if decimal != -1 else '0'
+    return f"{float(whole.replace('.', '').replace(',', '') + '.' + fraction):.2f}"
+
+
+@register_fallback('generic', missing_order_id="Sipariş Numarası bulunamadı", missing_amount="Tutar bulunamadı")
 def extract_order_details(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    full_text = ' '.join(soup.get_text(separator=' ', strip=True).split())
+    if isinstance(html_content, EmailDocument):
+        full_text = html_content.text
+    else:
+        with timed('html_parse'):
+            soup = BeautifulSoup(html_content, SOUP_PARSER)
+            full_text = ' '.join(soup.get_text(separator=' ', strip=True).split())
 
-    order_id_ = extract_order_id(full_text)
-    total_amount_ = extract_amount(full_text)
+    with timed('regex_extract'):
+        order_id_ = extract_order_id(full_text)
+        total_amount_ = extract_amount(full_text, normalized=isinstance(html_content, EmailDocument))
 
     print(f"Extracted Order ID: {order_id_}")
     print(f"Extracted Total Amount: {total_amount_}")
@@ -114,39 +166,21 @@ def extract_order_details(html_content):
     }
 
 
+@register_extractor('trendyol', domains=['trendyolmail.com', 'trendyol.com'],
+                    missing_order_id="Trendyol Sipariş Numarası Bulunamadı",
+                    missing_amount="Trendyol Tutar Bulunamadı")
 def extract_trendyol_order_details(html_content):
-    soup = BeautifulSoup(html_content, 'html.parser')
-    full_text = ' '.join(soup.get_text(separator=' ', strip=True).split())
+    document = html_content if isinstance(html_content, EmailDocument) else EmailDocument.from_html(html_content)
+    full_text = document.text
 
-    order_id_patterns = [
-        r"(?:Sipariş Numaranız:|Sipariş Numarası:|Sipariş No:|Order ID:) *(\d+)",
-        r"#(\d+)\s+numaralı\s+siparişi",
-    ]
-    order_id_ = None
-    for pattern in order_id_patterns:
-        match = re.search(pattern, full_text, re.IGNORECASE)
-        if match:
-            order_id_ = match.group(1)
-            break
+    with timed('regex_extract'):
+        match = TRENDYOL_ORDER_ID_PATTERNS.search(full_text)
+        order_id_ = match[1][0] if match else None
 
-    amount_patterns = [
-        r"(?:Sepet Tutarı|Toplam Tutar|Toplam|Ödenecek Tutar)[^\d]*?([\d.,]+)\s*(?:TL|TRY|₺|\$|USD)",
-        r'([\d.,]+)\s*(?:TL|TRY|₺|\$|USD)',
-        r'[₺$]\s*([\d.,]+)'
-    ]
-    total_amount_ = None
-    for pattern in amount_patterns:
-        match = re.search(pattern, full_text, re.IGNORECASE)
-        if match:
-            amount_str = match.group(1).replace(',', '.')
-            try:
-                total_amount_ = f"{float(amount_str):.2f}"
-                break
-            except ValueError:
-                continue
+        total_amount_ = TRENDYOL_AMOUNT_PATTERNS.first_valid(full_text, _convert_price)
 
     if not order_id_:
-        order_elements = soup.find_all(class_=re.compile(r'order.*number|siparis.*no', re.I))
+        order_elements = document.soup.find_all(class_=TRENDYOL_ORDER_CLASS)
         for element in order_elements:
             potential_id = extract_order_id(element.get_text())
             if potential_id:
@@ -154,7 +188,7 @@ def extract_trendyol_order_details(html_content):
                 break
 
     if not total_amount_:
-        amount_elements = soup.find_all(class_=re.compile(r'total.*amount|toplam.*tutar', re.I))
+        amount_elements = document.soup.find_all(class_=TRENDYOL_AMOUNT_CLASS)
         for element in amount_elements:
             potential_amount = extract_amount(element.get_text())
             if potential_amount:
@@ -167,61 +201,210 @@ def extract_trendyol_order_details(html_content):
     }
 
 
-def list_emails_with_details(service, keywords, max_results=50, query=None):
-    keyword_query = " OR ".join(keywords)
-    temu_filter = "-from:temu@orders.temu.com"
-    merged_query = f"{keyword_query} {query} {temu_filter}" if query else f"{keyword_query} {temu_filter}"
+def _document_text(content):
+    return content.text if isinstance(content, EmailDocument) else EmailDocument.from_html(content).text
+
+
+@register_extractor('bershka', domains=['bershka.com', 'bershka.net'],
+                    missing_order_id="Bershka Sipariş Numarası Bulunamadı",
+                    missing_amount="Bershka Tutar Bulunamadı")
+def extract_bershka_order_details(html_content):
+    full_text = _document_text(html_content)
+
+    with timed('regex_extract'):
+        match = BERSHKA_ORDER_ID_PATTERNS.search(full_text)
+        total_amount_ = BERSHKA_AMOUNT_PATTERNS.first_valid(full_text, _convert_price)
+
+    return {
+        'order_id': match[1][0] if match else "Bershka Sipariş Numarası Bulunamadı",
+        'total_amount': total_amount_ or "Bershka Tutar Bulunamadı"
+    }
+
+
+@register_extractor('amazon', domains=['amazon.com.tr', 'amazon.com', 'amazon.de', 'amazon.co.uk'],
+                    subject=r'\b\d{3}-\d{7}-\d{7}\b', missing_order_id="Amazon Sipariş Numarası Bulunamadı",
+                    missing_amount="Amazon Tutar Bulunamadı")
+def extract_amazon_order_details(html_content):
+    """Amazon tarzı ###-#######-####### sipariş numaraları ve 'Sipariş Toplamı' tutarı."""
+    full_text = _document_text(html_content)
+
+    with timed('regex_extract'):
+        match = AMAZON_ORDER_ID.search(full_text)
+        total_amount_ = AMAZON_AMOUNT_PATTERNS.first_valid(full_text, _convert_price)
+
+    return {
+        'order_id': match[1] if match else "Amazon Sipariş Numarası Bulunamadı",
+        'total_amount': total_amount_ or "Amazon Tutar Bulunamadı"
+    }
+
+
+@register_extractor('boyner', domains=['boyner.com.tr'], missing_order_id=MISSING_PDF_ORDER_ID,
+                    missing_amount=MISSING_PDF_AMOUNT)
+def extract_boyner_order_details(html_content):
+    """Boyner gövdeleri e-fatura ile aynı alanları taşır; bulunamazsa detaylar PDF ekinden okunur."""
+    return extract_pdf_order_details(_document_text(html_content))
+
+
+def extract_message_details(msg_data, document, cache=None):
+    """Mesajı göndericisine kayıtlı çıkarıcıya yönlendir; (çıkarıcı, detaylar) döndür."""
+    extractor = find_extractor(msg_data)
+    return extractor, get_cached_details(extractor.extract, document, msg_data.get('id'), cache)
+
+
+def parse_message_headers(msg_data):
+    """Mesajın Subject, From ve Date başlıklarını listeleme formatına çevir."""
+    payload = msg_data.get('payload', {})
+    headers = payload.get('headers', [])
+
+    subject_ = "(No Subject)"
+    sender_ = "(Unknown Sender)"
+    formatted_date = "(Unknown Date)"
+
+    for header in headers:
+        if header['name'] == 'Subject':
+            subject_ = header['value']
+        elif header['name'] == 'From':
+            sender_match = re.match(r"^(.*?)(<.*?>)?$", header['value'])
+            sender_ = sender_match.group(1).strip() if sender_match else header['value']
+        elif header['name'] == 'Date':
+            date_match = re.search(
+                r"([A-Za-z]{3}), (\d{1,2} [A-Za-z]{3} \d{4}) (\d{2}:\d{2})",
+                header['value']
+            )
+            if date_match:
+                day = date_match.group(1)
+                date_ = date_match.group(2)
+                time_ = date_match.group(3)
+                formatted_date = f"{day}, {date_} {time_}"
+
+    return {
+        'id': msg_data['id'],
+        'subject': subject_,
+        'sender': sender_,
+        'date': formatted_date,
+        'message': msg_data
+    }
+
+
+def iter_message_pages(service, query, max_results=None, page_size=PAGE_SIZE, prefetch=False):
+    """messages.list sonuçlarını nextPageToken'ı izleyerek sayfa sayfa üret.
+
+    prefetch=True ise bir sonraki sayfa, mevcut sayfa işlenirken arka planda istenir.
+    """
+    def list_page(page_token, remaining, http=None):
+        return list_messages(
+            service, query, page_token,
+            max_results=min(page_size, remaining) if remaining is not None else page_size,
+            http=http
+        )
+
+    executor = ThreadPoolExecutor(max_workers=1) if prefetch else None
+    prefetch_http = build_thread_http(service) if prefetch else None
+    remaining = max_results
 
     try:
-        results = service.users().messages().list(
-            userId='me',
-            q=merged_query,
-            maxResults=max_results
-        ).execute()
-    except HttpError as e:
-        print(f"Gmail API error: {e}")
-        return []
-
-    messages = results.get('messages', [])
-    email_details = []
-    for message in messages:
         try:
-            msg_data = service.users().messages().get(userId='me', id=message['id']).execute()
-            payload = msg_data.get('payload', {})
-            headers = payload.get('headers', [])
-
-            subject_ = "(No Subject)"
-            sender_ = "(Unknown Sender)"
-            formatted_date = "(Unknown Date)"
-
-            for header in headers:
-                if header['name'] == 'Subject':
-                    subject_ = header['value']
-                elif header['name'] == 'From':
-                    sender_match = re.match(r"^(.*?)(<.*?>)?$", header['value'])
-                    sender_ = sender_match.group(1).strip() if sender_match else header['value']
-                elif header['name'] == 'Date':
-                    date_match = re.search(
-                        r"([A-Za-z]{3}), (\d{1,2} [A-Za-z]{3} \d{4}) (\d{2}:\d{2})",
-                        header['value']
-                    )
-                    if date_match:
-                        day = date_match.group(1)
-                        date_ = date_match.group(2)
-                        time_ = date_match.group(3)
-                        formatted_date = f"{day}, {date_} {time_}"
-
-            email_details.append({
-                'id': message['id'],
-                'subject': subject_,
-                'sender': sender_,
-                'date': formatted_date
-            })
+            response = list_page(None, remaining)
         except HttpError as e:
-            print(f"Gmail API error when fetching message {message['id']}: {e}")
-            continue
+            print(f"Gmail API error: {e}")
+            return
 
-    return email_details
+        while True:
+            messages = response.get('messages', [])
+            if remaining is not None:
+                messages = messages[:remaining]
+                remaining -= len(messages)
+
+            page_token = response.get('nextPageToken')
+            has_next = bool(page_token) and (remaining is None or remaining > 0)
+            next_page = None
+            if has_next and executor is not None:
+                next_page = executor.submit(list_page, page_token, remaining, prefetch_http)
+
+            if messages:
+                yield messages
+
+            if not has_next:
+                break
+
+            try:
+                response = next_page.result() if next_page is not None else list_page(page_token, remaining)
+            except HttpError as e:
+                print(f"Gmail API error: {e}")
+                return
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+def iter_emails_with_details(service, keywords, max_results=None, query=None, cache=None,
+                             cache_listing=False, prefetch=False, plan=None):
+    """Eşleşen e-postaları sayfalar geldikçe başlık detaylarıyla tek tek üret.
+
+    Mesajlar format=metadata ile çekilir; 'message' alanında gövde yoktur,
+    çıkarım öncesinde iter_full_emails ile tam mesaj alınmalıdır. plan verilirse
+    anahtar kelime sorgusu yerine planın sorgusu listelenir ve her e-postaya
+    atfedildiği cümle 'clause' alanıyla eklenir.
+    """
+    if plan is not None:
+        merged_query = plan.query(query)
+    else:
+        keyword_query = " OR ".join(keywords)
+        temu_filter = "-from:temu@orders.temu.com"
+        merged_query = f"{keyword_query} {query} {temu_filter}" if query else f"{keyword_query} {temu_filter}"
+
+    listing_key = f"{merged_query}|{max_results}"
+    cached_listing = cache.get_listing(listing_key) if cache is not None and cache_listing else None
+
+    if cached_listing is not None:
+        pages = (cached_listing[i:i + PAGE_SIZE] for i in range(0, len(cached_listing), PAGE_SIZE))
+    else:
+        pages = iter_message_pages(service, merged_query, max_results=max_results, prefetch=prefetch)
+
+    listed = []
+    for messages in pages:
+        if cached_listing is None and cache is not None and cache_listing:
+            listed.extend({'id': message['id']} for message in messages)
+
+        fetched = fetch_messages(
+            service, [message['id'] for message in messages], message_format='metadata', cache=cache
+        )
+        for message in messages:
+            msg_data = fetched.get(message['id'])
+            if msg_data is not None:
+                email = parse_message_headers(msg_data)
+                if plan is not None:
+                    email['clause'] = plan.attribute(msg_data)
+                yield email
+
+    if cached_listing is None and cache is not None and cache_listing:
+        cache.put_listing(listing_key, listed)
+
+
+def iter_full_emails(service, emails, cache=None, batch_size=BATCH_SIZE):
+    """Metadata ile listelenmiş e-postaların tam mesajlarını batch halinde çekip e-postalara ekle."""
+    emails = iter(emails)
+    while True:
+        chunk = list(islice(emails, batch_size))
+        if not chunk:
+            break
+
+        fetched = fetch_messages(service, [email['id'] for email in chunk], cache=cache)
+        for email in chunk:
+            msg_data = fetched.get(email['id'])
+            if msg_data is not None:
+                yield {**email, 'message': msg_data}
+
+
+def list_emails_with_details(service, keywords, max_results=50, query=None, cache=None, cache_listing=False):
+    return list(iter_emails_with_details(
+        service,
+        keywords,
+        max_results=max_results,
+        query=query,
+        cache=cache,
+        cache_listing=cache_listing
+    ))
 
 
 
@@ -239,21 +422,29 @@ def get_date_range_for_month(year, month):
     return start_date, end_date
 
 
-def list_emails_with_month(service, keywords, year, month, max_results=50, query=None):
-    """Belirli bir ay ve yıl için e-postaları listele."""
-    start_date = f"{year}-{month:02d}-01"
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
-    end_date = f"{next_year}-{next_month:02d}-01"
-
+def iter_emails_with_month(service, keywords, year, month, max_results=None, cache=None, prefetch=False, plan=None):
+    """Belirli bir ay ve yıl için e-postaları sayfa sayfa, sabit bellekle üret."""
+    start_date, end_date = get_date_range_for_month(year, month)
     query = f"after:{start_date} before:{end_date}"
 
-    emails = list_emails_with_details(
+    # Bitmiş ayların listesi değişmez, önbellekten okunabilir.
+    month_closed = datetime.strptime(end_date, '%Y-%m-%d') <= datetime.now()
+
+    return iter_emails_with_details(
         service,
         keywords,
         max_results=max_results,
-        query=query
+        query=query,
+        cache=cache,
+        cache_listing=month_closed,
+        prefetch=prefetch,
+        plan=plan
     )
+
+
+def list_emails_with_month(service, keywords, year, month, max_results=50, query=None, cache=None):
+    """Belirli bir ay ve yıl için e-postaları listele."""
+    emails = list(iter_emails_with_month(service, keywords, year, month, max_results=max_results, cache=cache))
     month_name = calendar.month_name[month]
     return emails, month_name
 
@@ -275,7 +466,84 @@ def is_duplicate_order(existing_orders, new_order):
     return False
 
 
-def process_all_orders(service, max_results=50):
+def get_message_timestamp(email):
+    """Mesaj tarihini döndür; Gmail internalDate yoksa Date başlığından ayrıştır."""
+    internal_date = email.get('message', {}).get('internalDate')
+    if internal_date:
+        return datetime.fromtimestamp(int(internal_date) / 1000)
+    return parse_email_date(email.get('date', ''))
+
+
+def build_email_order(email, extracted):
+    """Çıkarım sonucunu dashboard sipariş kaydına çevir."""
+    # Tutar İşleme
+    total_amount = 0
+    amount_str = extracted.get('total_amount', "0").strip()
+    try:
+        if ',' in amount_str and '.' in amount_str:
+            amount_str = amount_str.replace('.', '').replace(',', '.')
+        elif ',' in amount_str:
+            amount_str = amount_str.replace(',', '.')
+        total_amount = float(amount_str)
+    except ValueError:
+        print(f"Total Amount Parsing Error: {amount_str}")
+        total_amount = 0
+
+    return {
+        'id': email['id'],
+        'subject': email.get('subject', '(Başlık Yok)'),
+        'sender': email.get('sender', '(Bilinmeyen Gönderici)'),
+        'date': email.get('date', '(Bilinmeyen Tarih)'),
+        'timestamp': get_message_timestamp(email),
+        'total_amount': total_amount,
+        'order_id': extracted.get('order_id', '(Sipariş Numarası Yok)'),
+        'source': 'Bershka' if "Bershka" in email.get('sender', '') else 'Other'
+    }
+
+
+def extract_email_orders(service, emails, cache=None, pool=None, pdf_cache=None):
+    """E-posta grubundan dashboard sipariş kayıtlarını üret; PDF ekleri havuza birlikte dağıtılır."""
+    staged = []
+    attachments = []
+    for email in emails:
+        try:
+            msg_data = email['message']
+            document = get_message_document(msg_data, cache)
+            extractor, extracted = extract_message_details(msg_data, document, cache)
+
+            # PDF İşleme (Eklenti): gövdede sipariş numarası yoksa ekler denenir.
+            found = extractor.order_found(extracted)
+            attachment_ids = [] if found else process_email_attachments(msg_data)
+            attachments.extend((email['id'], att_id) for att_id in attachment_ids)
+            staged.append((email, extracted, found, attachment_ids))
+        except Exception as e:
+            print(f"E-posta {email['id']} işlenirken hata oluştu: {e}")
+            continue
+
+    pdf_details = extract_attachments_order_details(service, attachments, cache, pool, pdf_cache)
+
+    orders = []
+    for email, extracted, found, attachment_ids in staged:
+        for att_id in attachment_ids:
+            pdf_extracted = pdf_details.get((email['id'], att_id))
+            if pdf_extracted and pdf_extracted['order_id'] != MISSING_PDF_ORDER_ID:
+                extracted = pdf_extracted
+                found = True
+        if not found:
+            # Yer tutucu sipariş numaraları defterde tekilleştirilip toplamlara katılmasın.
+            extracted = {**extracted, 'order_id': MISSING_ORDER_ID}
+        orders.append(build_email_order(email, extracted))
+    return orders
+
+
+def extract_email_order(service, email, cache=None, pool=None, pdf_cache=None):
+    """Listelenmiş bir e-postadan (gerekirse PDF ekinden) dashboard sipariş kaydını üret."""
+    orders = extract_email_orders(service, [email], cache, pool, pdf_cache)
+    return orders[0] if orders else None
+
+
+def process_all_orders(service, max_results=50, cache=None, prefetch=False, pool=None, pdf_cache=None):
+    """Trendyol ve diğer sipariş e-postalarını sayfa sayfa işle; max_results=None tüm kutuyu tarar."""
     general_keywords = ['e-ticket', 'sipariş özeti', 'sipariş tutarı', 'fatura', 'E-FATURA HESABI | BOYNER']
 
     content_keywords = [
@@ -286,26 +554,7 @@ def process_all_orders(service, max_results=50):
     ]
 
     trendyol_query = "from:info@trendyolmail.com subject:'Siparişini aldık ✅'"
-    try:
-        trendyol_results = service.users().messages().list(
-            userId='me',
-            q=trendyol_query,
-            maxResults=max_results
-        ).execute()
-    except HttpError as e:
-        print(f"Gmail API error: {e}")
-        trendyol_results = {}
-
-    try:
-        other_query = f"({' OR '.join([f'subject:{keyword}' for keyword in general_keywords])}) -from:info@trendyolmail.com"
-        other_results = service.users().messages().list(
-            userId='me',
-            q=other_query,
-            maxResults=max_results
-        ).execute()
-    except HttpError as e:
-        print(f"Gmail API error: {e}")
-        other_results = {}
+    other_query = f"({' OR '.join([f'subject:{keyword}' for keyword in general_keywords])}) -from:info@trendyolmail.com"
 
     all_emails = []
 
@@ -313,124 +562,80 @@ def process_all_orders(service, max_results=50):
         text = text.lower()
         return any(keyword.lower() in text for keyword in content_keywords)
 
-    for msg in trendyol_results.get('messages', []):
-        msg_id = msg['id']
-        try:
-            msg_data = service.users().messages().get(userId='me', id=msg_id).execute()
-            payload = msg_data.get('payload', {})
-            headers = payload.get('headers', [])
-
-            body_content = get_deepest_text_payload(payload)
-            extracted_data = extract_trendyol_order_details(body_content)
-
-            if not check_content_keywords(body_content):
-                attachment_ids = process_email_attachments(msg_data)
-                for att_id in attachment_ids:
-                    attachment = service.users().messages().attachments().get(
-                        userId='me',
-                        messageId=msg_id,
-                        id=att_id
-                    ).execute()
-
-                    pdf_data = attachment.get('data', '')
-                    if pdf_data:
-                        pdf_text = extract_pdf_content(pdf_data)
-                        pdf_extracted_data = extract_pdf_order_details(pdf_text)
-                        if pdf_extracted_data:
-                            extracted_data = pdf_extracted_data
-                            break
+    def iter_pages(query):
+        for messages in iter_message_pages(service, query, max_results=max_results, prefetch=prefetch):
+            yield fetch_messages(service, [msg['id'] for msg in messages], cache=cache)
 
-            subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'Unknown')
-            sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
-            date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown')
+    def process_page(fetched, source):
+        staged = []
+        attachments = []
+        for msg_id, msg_data in fetched.items():
+            document = get_message_document(msg_data, cache)
+            _, extracted_data = extract_message_details(msg_data, document, cache)
+            found_in_email = check_content_keywords(document.text)
 
-            new_order = {
-                "subject": subject,
-                "sender": sender,
-                "date": date,
-                "order_id": extracted_data['order_id'],
-                "amount": extracted_data['total_amount'],
-                "source": "Trendyol",
-                "processed_from": "Email"
-            }
+            attachment_ids = [] if found_in_email else process_email_attachments(msg_data)
+            attachments.extend((msg_id, att_id) for att_id in attachment_ids)
+            staged.append((msg_data, extracted_data, found_in_email, attachment_ids))
 
-            if not is_duplicate_order(all_emails, new_order):
-                all_emails.append(new_order)
+        pdf_details = extract_attachments_order_details(service, attachments, cache, pool, pdf_cache)
 
-        except HttpError as e:
-            print(f"Gmail API error when fetching message {msg_id}: {e}")
-            continue
-
-    for msg in other_results.get('messages', []):
-        msg_id = msg['id']
-        try:
-            msg_data = service.users().messages().get(userId='me', id=msg_id).execute()
-            payload = msg_data.get('payload', {})
-            headers = payload.get('headers', [])
+        for msg_data, extracted_data, found_in_email, attachment_ids in staged:
+            for att_id in attachment_ids:
+                pdf_extracted_data = pdf_details.get((msg_data['id'], att_id))
+                if pdf_extracted_data:
+                    extracted_data = pdf_extracted_data
+                    break
 
+            headers = msg_data.get('payload', {}).get('headers', [])
             subject = next((h['value'] for h in headers if h['name'] == 'Subject'), 'Unknown')
             sender = next((h['value'] for h in headers if h['name'] == 'From'), 'Unknown')
             date = next((h['value'] for h in headers if h['name'] == 'Date'), 'Unknown')
 
-            body_content = get_deepest_text_payload(payload)
-            extracted_data = extract_order_details(body_content)
-
-            if not check_content_keywords(body_content):
-                attachment_ids = process_email_attachments(msg_data)
-                for att_id in attachment_ids:
-                    attachment = service.users().messages().attachments().get(
-                        userId='me',
-                        messageId=msg_id,
-                        id=att_id
-                    ).execute()
-
-                    pdf_data = attachment.get('data', '')
-                    if pdf_data:
-                        pdf_text = extract_pdf_content(pdf_data)
-                        pdf_extracted_data = extract_pdf_order_details(pdf_text)
-                        if pdf_extracted_data:
-                            extracted_data = pdf_extracted_data
-                            break
-
             new_order = {
                 "subject": subject,
                 "sender": sender,
                 "date": date,
                 "order_id": extracted_data['order_id'],
                 "amount": extracted_data['total_amount'],
-                "source": "Other",
-                "processed_from": "Email" if check_content_keywords(body_content) else "PDF"
+                "source": source,
+                "processed_from": "Email" if source == "Trendyol" or found_in_email else "PDF"
             }
 
             if not is_duplicate_order(all_emails, new_order):
                 all_emails.append(new_order)
 
-        except HttpError as e:
-            print(f"Gmail API error when fetching message {msg_id}: {e}")
-            continue
+    for fetched in iter_pages(trendyol_query):
+        process_page(fetched, "Trendyol")
+
+    for fetched in iter_pages(other_query):
+        process_page(fetched, "Other")
 
     return all_emails
 
-def process_emails_with_attachments(service, keywords, year, month):
+def process_emails_with_attachments(service, keywords, year, month, cache=None, pool=None, pdf_cache=None):
     """Belirtilen ay ve yıl için e-postaları işleyerek eklerini indir ve işle."""
-    emails, month_name = list_emails_with_month(service, keywords, year, month)
+    emails, month_name = list_emails_with_month(service, keywords, year, month, cache=cache)
 
-    for email in emails:
+    attachments = []
+    for email in iter_full_emails(service, emails, cache=cache):
         try:
             print(f"E-posta işleniyor: {email['subject']} ({email['id']})")
-            msg_data = service.users().messages().get(userId='me', id=email['id']).execute()
-            process_email_attachments(msg_data)
+            attachment_ids = process_email_attachments(email['message'])
+            attachments.extend((email['id'], att_id) for att_id in attachment_ids)
         except Exception as e:
             print(f"E-posta işlenirken hata: {e}")
             continue
 
+    return extract_attachments_order_details(service, attachments, cache, pool, pdf_cache)
+
 
 
 def main():
     creds = Credentials.from_authorized_user_file('token.json', ['https://www.googleapis.com/auth/gmail.readonly'])
     service = build('gmail', 'v1', credentials=creds)
 
-    orders = process_all_orders(service, max_results=100)
+    orders = process_all_orders(service, max_results=100, pool=get_pdf_worker_pool(), pdf_cache=get_pdf_cache())
 
     for order in orders:
         print(f"Sipariş ID: {order['order_id']}, Tutar: {order['amount']}, Kaynak: {order['source']}")